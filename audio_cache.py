@@ -0,0 +1,209 @@
+import collections
+import os
+import subprocess
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CACHE_FOLDER, AUDIO_CACHE_SIZE
+from model_pool import parse_size
+from result_cache import hash_file, trim_folder
+
+SAMPLE_RATE = 16000
+CHUNK_BYTES = 1024 * 1024
+# 30 seconds of 16 kHz audio, the window Whisper works on.
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+
+_locks = {}
+_locks_guard = threading.Lock()
+# Audio hashes whose cache files are memory-mapped by live PcmAudio objects.
+_mapped = collections.Counter()
+
+
+def cache_folder():
+    return os.path.join(CACHE_FOLDER, "audio")
+
+
+def pcm_path(audio_hash):
+    return os.path.join(cache_folder(), f"{audio_hash}.pcm")
+
+
+def mel_path(audio_hash, n_mels):
+    return os.path.join(cache_folder(), f"{audio_hash}.mel{n_mels}.npy")
+
+
+def _lock_for(audio_hash):
+    with _locks_guard:
+        return _locks.setdefault(audio_hash, threading.Lock())
+
+
+def _map(audio_hash):
+    with _locks_guard:
+        _mapped[audio_hash] += 1
+
+
+def _unmap(audio_hash):
+    with _locks_guard:
+        _mapped[audio_hash] -= 1
+        if _mapped[audio_hash] <= 0:
+            del _mapped[audio_hash]
+
+
+def _busy(path):
+    """True for files being written or mapped by this process.
+
+    Another process's decode is still a .tmp file too. Files it has mapped
+    cannot be seen from here; removing them is refused on Windows and leaves
+    the mapping intact elsewhere.
+    """
+    name = os.path.basename(path)
+    if ".tmp" in name:
+        return True
+    with _locks_guard:
+        return name.split(".")[0] in _mapped
+
+
+def decode_to_file(audio_file, out_path):
+    """Decode any ffmpeg-readable file to 16 kHz mono int16 PCM on disk.
+
+    ffmpeg output is copied to the file chunk by chunk, so memory use does
+    not depend on the length of the recording.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", audio_file,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "-loglevel", "error", "-",
+    ]
+    tmp_path = out_path + ".tmp"
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg was not found. Install FFmpeg and add it to PATH.")
+    with proc, open(tmp_path, "wb") as out:
+        for chunk in iter(lambda: proc.stdout.read(CHUNK_BYTES), b""):
+            out.write(chunk)
+        stderr = proc.stderr.read()
+    if proc.returncode != 0:
+        os.remove(tmp_path)
+        raise RuntimeError(f"Failed to load audio: {stderr.decode(errors='replace')}")
+    os.replace(tmp_path, out_path)
+
+
+def ensure_pcm(audio_file, audio_hash=None):
+    """Return the PCM cache path for a file, decoding it on first use."""
+    audio_hash = audio_hash or hash_file(audio_file)
+    path = pcm_path(audio_hash)
+    # Only one thread decodes a given file; others wait and reuse the result.
+    with _lock_for(audio_hash):
+        if os.path.isfile(path):
+            os.utime(path)
+            return path
+        decode_to_file(audio_file, path)
+    trim_folder(cache_folder(), parse_size(AUDIO_CACHE_SIZE), keep=(path,), busy=_busy)
+    return path
+
+
+class PcmAudio:
+    """16 kHz mono audio backed by a memory-mapped PCM cache file.
+
+    Slicing returns float32 samples in [-1, 1], converting only the part
+    asked for, so a window can be handed to the model without holding the
+    whole recording in memory.
+    """
+
+    def __init__(self, path, audio_hash=None):
+        import numpy as np
+
+        self.path = path
+        self.audio_hash = audio_hash
+        if os.path.getsize(path):
+            self._pcm = np.memmap(path, dtype=np.int16, mode="r")
+        else:
+            self._pcm = np.zeros(0, dtype=np.int16)
+        # The cache is not trimmed under a live mapping (nor its mel file).
+        key = os.path.basename(path).split(".")[0]
+        _map(key)
+        weakref.finalize(self, _unmap, key)
+
+    def __len__(self):
+        return len(self._pcm)
+
+    def __getitem__(self, index):
+        import numpy as np
+
+        return self._pcm[index].astype(np.float32) / 32768.0
+
+    @property
+    def duration(self):
+        return len(self) / SAMPLE_RATE
+
+
+def load_audio(audio_file, audio_hash=None):
+    """Decode (or reuse) a file and return it as memory-mapped PcmAudio."""
+    audio_hash = audio_hash or hash_file(audio_file)
+    return PcmAudio(ensure_pcm(audio_file, audio_hash), audio_hash)
+
+
+def load_mel(audio, n_mels):
+    """Log-mel features for PcmAudio, cached next to the PCM file.
+
+    Features are computed one 30-second window at a time, the unit Whisper
+    decodes, and the cached array is opened memory-mapped. ``n_mels`` must
+    match the model (``model.dims.n_mels``: 128 for large-v3, 80 otherwise).
+    """
+    import numpy as np
+    import torch
+    import whisper
+
+    path = mel_path(audio.audio_hash, n_mels)
+    with _lock_for(audio.audio_hash):
+        if not os.path.isfile(path):
+            frames = len(audio) // whisper.audio.HOP_LENGTH
+            tmp_path = path + ".tmp.npy"
+            mel = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16, shape=(n_mels, frames))
+            for start in range(0, len(audio), WINDOW_SAMPLES):
+                chunk = audio[start:start + WINDOW_SAMPLES]
+                features = whisper.log_mel_spectrogram(torch.from_numpy(chunk), n_mels).numpy()
+                first = start // whisper.audio.HOP_LENGTH
+                width = min(features.shape[1], frames - first)
+                mel[:, first:first + width] = features[:, :width]
+            mel.flush()
+            del mel
+            os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="r")
+
+
+class AudioPrefetcher:
+    """Decodes upcoming files in the background while the current one runs."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-prefetch")
+        self._submitted = set()
+        self._lock = threading.Lock()
+
+    def submit(self, audio_file):
+        with self._lock:
+            if audio_file in self._submitted or not os.path.isfile(audio_file):
+                return None
+            self._submitted.add(audio_file)
+        future = self._executor.submit(ensure_pcm, audio_file)
+        future.add_done_callback(lambda _: self._done(audio_file))
+        return future
+
+    def _done(self, audio_file):
+        with self._lock:
+            self._submitted.discard(audio_file)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def prefetch(audio_file):
+    """Start decoding ``audio_file`` into the cache in the background."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = AudioPrefetcher()
+    return _prefetcher.submit(audio_file)
@@ -0,0 +1,263 @@
+"""Batched inference across files.
+
+``model.transcribe`` decodes one 30-second window of one file at a time, so
+the model runs at batch size 1 even when many short clips are queued. The
+engine here cuts every file into independent 30-second windows, stacks the
+log-mel spectrograms of up to ``batch_size`` windows (from any file) and
+decodes them in a single ``whisper.decode`` call. Results are routed back
+to their file as soon as all of its windows are done.
+
+Windows are decoded independently, without the previous window's text as
+a prompt, which suits short voicemail-style clips; long recordings are
+better served by transcriber.iter_segments.
+"""
+import time
+
+from config import BATCH_SIZE, AUDIO_CACHE_MEL
+from startup import LazyModule
+
+torch = LazyModule("torch")
+whisper = LazyModule("whisper")
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30
+WINDOW_SAMPLES = WINDOW_SECONDS * SAMPLE_RATE
+# Same as whisper.audio.HOP_LENGTH and N_FRAMES.
+HOP_LENGTH = 160
+WINDOW_FRAMES = WINDOW_SAMPLES // HOP_LENGTH
+# Same silence rule as whisper.transcribe.
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+
+class _Window:
+    """One window of a file; its samples are only read when it is decoded."""
+
+    __slots__ = ("key", "index", "offset", "duration", "source", "start", "length")
+
+    def __init__(self, key, index, offset, duration, source, start, length):
+        self.key = key
+        self.index = index
+        self.offset = offset
+        self.duration = duration
+        self.source = source
+        self.start = start
+        self.length = length
+
+    @property
+    def audio(self):
+        return self.source[self.start:self.start + self.length]
+
+
+def iter_windows(key, audio, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS):
+    """Consecutive windows of at most ``window_seconds`` of ``audio``."""
+    window = int(window_seconds * sample_rate)
+    total = len(audio)
+    for index, start in enumerate(range(0, total, window)):
+        length = min(window, total - start)
+        yield _Window(key, index, start / sample_rate, length / sample_rate, audio, start, length)
+
+
+def split_windows(key, audio, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS):
+    return list(iter_windows(key, audio, sample_rate, window_seconds))
+
+
+def _is_silence(decoded):
+    return (decoded.no_speech_prob > NO_SPEECH_THRESHOLD
+            and decoded.avg_logprob < LOGPROB_THRESHOLD)
+
+
+class BatchEngine:
+    """Decodes 30-second windows of many files in shared batches."""
+
+    def __init__(self, model, batch_size=BATCH_SIZE, fp16=False, language=None, mel_cache=AUDIO_CACHE_MEL):
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.fp16 = fp16
+        self.language = language
+        self.mel_cache = mel_cache
+
+    def _mel(self, window):
+        if self.mel_cache and window.length == WINDOW_SAMPLES and getattr(window.source, "audio_hash", None):
+            # Full windows line up with the cached features, which are
+            # computed per 30-second window as well. A short last window
+            # is padded first, so it is always computed here.
+            from audio_cache import load_mel
+
+            mel = load_mel(window.source, self.model.dims.n_mels)
+            first = window.start // HOP_LENGTH
+            return torch.from_numpy(mel[:, first:first + WINDOW_FRAMES].astype("float32"))
+        audio = whisper.pad_or_trim(window.audio)
+        return whisper.log_mel_spectrogram(audio, n_mels=self.model.dims.n_mels)
+
+    def decode_batch(self, windows):
+        """Run one encoder/decoder pass over ``windows``."""
+        return self.decode_mels([self._mel(w) for w in windows])
+
+    def decode_mels(self, mels):
+        mels = torch.stack(mels).to(self.model.device)
+        options = whisper.DecodingOptions(
+            language=self.language, fp16=self.fp16, without_timestamps=True,
+        )
+        return whisper.decode(self.model, mels, options)
+
+    def transcribe(self, items, stop_evt=None):
+        """Yield ``(key, result)`` for each ``(key, audio)`` in ``items``.
+
+        A file's result is yielded once all of its windows are decoded, so
+        short files finish early even when they share batches with long
+        ones. ``stop_evt`` is checked before every batch.
+
+        A file that cannot be read or decoded yields its exception in place
+        of the result, and the other files keep being batched. ``audio``
+        may itself be the exception raised while loading the file.
+        """
+        window = int(WINDOW_SECONDS * SAMPLE_RATE)
+        # Only the windows of the batch being filled are held; files are
+        # read from ``items`` as the batches reach them.
+        pending = {}
+        batch = []
+        for key, audio in items:
+            if isinstance(audio, Exception):
+                yield key, audio
+                continue
+            total = len(audio)
+            if not total:
+                yield key, _assemble([], 0.0)
+                continue
+            pending[key] = ([None] * -(-total // window), total / SAMPLE_RATE)
+            for w in iter_windows(key, audio):
+                batch.append(w)
+                if len(batch) == self.batch_size:
+                    if stop_evt is not None and stop_evt.is_set():
+                        return
+                    yield from self._decode(batch, pending)
+                    batch = []
+        if batch and not (stop_evt is not None and stop_evt.is_set()):
+            yield from self._decode(batch, pending)
+
+    def _decode(self, batch, pending):
+        mels = []
+        for window in batch:
+            if window.key not in pending:
+                # An earlier window of the file failed.
+                continue
+            try:
+                mels.append((window, self._mel(window)))
+            except Exception as e:
+                del pending[window.key]
+                yield window.key, e
+        groups = [[(w, mel) for w, mel in mels if w.key in pending]]
+        while groups:
+            group = groups.pop(0)
+            if not group:
+                continue
+            try:
+                decoded = self.decode_mels([mel for _, mel in group])
+            except Exception as e:
+                keys = list(dict.fromkeys(w.key for w, _ in group))
+                if len(keys) > 1:
+                    # One file can break the shared batch; retry file by file.
+                    groups[:0] = [[(w, mel) for w, mel in group if w.key == key] for key in keys]
+                    continue
+                del pending[keys[0]]
+                yield keys[0], e
+                continue
+            for (window, _), result in zip(group, decoded):
+                slots, duration = pending[window.key]
+                slots[window.index] = (window, result)
+                if all(slot is not None for slot in slots):
+                    del pending[window.key]
+                    yield window.key, _assemble(slots, duration)
+
+
+def _assemble(slots, audio_duration):
+    segments = []
+    language = None
+    for window, decoded in slots:
+        language = language or decoded.language
+        text = decoded.text.strip()
+        if not text or _is_silence(decoded):
+            continue
+        segments.append({
+            "start": window.offset,
+            "end": window.offset + window.duration,
+            "text": " " + text,
+        })
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": language,
+        "audio_duration": audio_duration,
+    }
+
+
+def transcribe_files(model_name, files, device=None, precision=None, batch_size=BATCH_SIZE,
+                     use_cache=True, stop_evt=None, language=None):
+    """Batch-transcribe ``files`` with one pooled model.
+
+    Yields ``(path, result)`` as each file finishes; cached files come
+    first. ``result`` carries the same keys as a run_transcription result,
+    or is the exception that failed the file. A pinned ``language`` skips
+    Whisper's per-window detection.
+    """
+    from audio_cache import load_audio
+    from transcriber import _cache_lookup, configure_cpu_threads, select_device, select_precision
+    from model_pool import get_pool
+
+    device = select_device(device)
+    precision = select_precision(device, precision)
+    if device == "cpu":
+        configure_cpu_threads()
+    cache_options = {"precision": precision, "window": WINDOW_SECONDS, "batched": True}
+    if language:
+        cache_options["language"] = language
+
+    hashes = {}
+    todo = []
+    for path in files:
+        cache, audio_hash, cached = (None, None, None)
+        if use_cache:
+            try:
+                cache, audio_hash, cached = _cache_lookup(model_name, path, cache_options)
+            except Exception as e:
+                yield path, e
+                continue
+        if cached is not None:
+            cached["cached"] = True
+            yield path, cached
+            continue
+        hashes[path] = (cache, audio_hash)
+        todo.append(path)
+    if not todo:
+        return
+
+    def load(path):
+        try:
+            return load_audio(path, hashes[path][1])
+        except Exception as e:
+            return e
+
+    start = time.time()
+    with get_pool().using(model_name, device, precision) as model:
+        engine = BatchEngine(model, batch_size, fp16=precision == "fp16", language=language)
+        items = ((path, load(path)) for path in todo)
+        for path, result in engine.transcribe(items, stop_evt):
+            if isinstance(result, Exception):
+                yield path, result
+                continue
+            elapsed = time.time() - start
+            result["device"] = device
+            result["precision"] = precision
+            # Files share batches, so the real-time factor is for the whole
+            # batch run so far rather than for this file alone.
+            result["rtf"] = elapsed / result["audio_duration"] if result["audio_duration"] else 0.0
+            cache, audio_hash = hashes[path]
+            if audio_hash:
+                cache.put(audio_hash, model_name, cache_options, {
+                    "text": result["text"],
+                    "segments": result["segments"],
+                    "language": result["language"],
+                    "audio_duration": result["audio_duration"],
+                })
+            yield path, result
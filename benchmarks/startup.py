@@ -0,0 +1,72 @@
+"""Startup benchmark: time to window and time until transcription is ready.
+
+Usage:
+    python benchmarks/startup.py --runs 5 --output startup.json
+
+Each run starts a fresh interpreter so import costs are measured cold. When
+no display is available the window step is skipped and only the
+background warm-up is timed.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+import startup
+import ui
+startup.mark("ui_imported")
+try:
+    root = ui.create_main_window()
+except Exception:
+    startup.WarmUp().start().wait(300)
+else:
+    deadline = time.monotonic() + 300
+    while "transcription_ready" not in startup.marks and time.monotonic() < deadline:
+        root.update()
+        time.sleep(0.005)
+    root.destroy()
+print(json.dumps(startup.marks))
+"""
+
+
+def run_once():
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=ROOT)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    names = sorted({name for run in runs for name in run})
+    return {
+        name: statistics.median(run[name] for run in runs if name in run)
+        for name in names
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(args.runs)]
+    report = {"benchmark": "startup", "runs": runs, "median": summarize(runs)}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""Transcription benchmark suite with regression tracking.
+
+Usage:
+    python benchmarks/suite.py run --backend stub --backend tiny --output bench.json
+    python benchmarks/suite.py compare baseline.json bench.json --threshold 0.10
+
+Each case transcribes synthetic audio of a given length through the same
+windowed decoding path the app uses (transcriber.iter_segments) and
+records model load time, real-time factor, time to the first segment and
+peak RSS. Every case runs in a fresh interpreter so peak RSS belongs to
+that case alone.
+
+The ``stub`` backend is a deterministic stand-in for Whisper whose cost is
+proportional to the audio length; it needs neither torch nor a model
+download, so it runs offline on any CPU and tracks the pipeline's own
+overhead. The ``tiny`` backend loads the real tiny model on the CPU.
+
+``compare`` exits with status 1 when any metric got worse by more than the
+threshold.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SAMPLE_RATE = 16000
+DEFAULT_LENGTHS = [5, 30, 120]
+BACKENDS = ["stub", "tiny"]
+# Lower is better for every tracked metric.
+METRICS = ["load_seconds", "rtf", "first_segment_seconds", "peak_rss_mb"]
+
+# Stub costs: seconds of work per model load and per second of audio.
+STUB_LOAD_SECONDS = 0.05
+STUB_SECONDS_PER_AUDIO_SECOND = 0.002
+STUB_SEGMENT_SECONDS = 5
+
+
+def synthetic_audio(seconds, sample_rate=SAMPLE_RATE):
+    """A 440 Hz tone with a slow amplitude sweep, as float32 samples."""
+    n = int(seconds * sample_rate)
+    try:
+        import numpy as np
+    except ImportError:
+        from array import array
+
+        return array("f", (
+            0.5 * math.sin(2 * math.pi * 440 * i / sample_rate) * (0.5 + 0.5 * math.sin(i / sample_rate))
+            for i in range(n)
+        ))
+    t = np.arange(n, dtype=np.float32) / sample_rate
+    return (0.5 * np.sin(2 * np.pi * 440 * t) * (0.5 + 0.5 * np.sin(t))).astype(np.float32)
+
+
+class StubModel:
+    """Deterministic Whisper stand-in: one segment per five seconds."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+
+    def transcribe(self, audio, **options):
+        seconds = len(audio) / self.sample_rate
+        time.sleep(seconds * STUB_SECONDS_PER_AUDIO_SECOND)
+        segments = []
+        start = 0.0
+        while start < seconds:
+            end = min(start + STUB_SEGMENT_SECONDS, seconds)
+            segments.append({"start": start, "end": end, "text": f" segment {len(segments)}"})
+            start = end
+        return {"text": "".join(s["text"] for s in segments), "segments": segments,
+                "language": options.get("language") or "en"}
+
+
+def load_backend(backend):
+    if backend == "stub":
+        time.sleep(STUB_LOAD_SECONDS)
+        return StubModel()
+    import whisper
+    from config import MODEL_FOLDER
+
+    return whisper.load_model(backend, device="cpu", download_root=MODEL_FOLDER)
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(backend, seconds):
+    """Measure one backend on ``seconds`` of synthetic audio."""
+    from transcriber import iter_segments
+
+    audio = synthetic_audio(seconds)
+    start = time.perf_counter()
+    model = load_backend(backend)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_segment = None
+    segments = 0
+    for _ in iter_segments(model, audio, SAMPLE_RATE, fp16=False):
+        if first_segment is None:
+            first_segment = time.perf_counter() - start
+        segments += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "backend": backend,
+        "audio_seconds": seconds,
+        "load_seconds": load_seconds,
+        "rtf": elapsed / seconds,
+        "first_segment_seconds": first_segment if first_segment is not None else elapsed,
+        "peak_rss_mb": peak_rss_bytes() / (1024 * 1024),
+        "segments": segments,
+    }
+
+
+def run_isolated(backend, seconds):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "case", backend, str(seconds)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    """Median of every metric over repeated runs of one case."""
+    summary = {key: runs[0][key] for key in ("backend", "audio_seconds", "segments")}
+    for metric in METRICS:
+        summary[metric] = statistics.median(run[metric] for run in runs)
+    summary["runs"] = len(runs)
+    return summary
+
+
+def case_key(case):
+    return f"{case['backend']}/{case['audio_seconds']}s"
+
+
+def compare(baseline, current, threshold=0.10):
+    """Return one row per (case, metric) present in both reports.
+
+    A row is a regression when the current value exceeds the baseline by
+    more than ``threshold`` (a fraction).
+    """
+    base_cases = {case_key(c): c for c in baseline["cases"]}
+    rows = []
+    for case in current["cases"]:
+        base = base_cases.get(case_key(case))
+        if base is None:
+            continue
+        for metric in METRICS:
+            old, new = base[metric], case[metric]
+            change = (new - old) / old if old else 0.0
+            rows.append({
+                "case": case_key(case),
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": change,
+                "regression": change > threshold,
+            })
+    return rows
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def cmd_run(args):
+    lengths = [_number(x) for x in args.lengths.split(",")] if args.lengths else DEFAULT_LENGTHS
+    cases = []
+    for backend in args.backend or ["stub"]:
+        for seconds in lengths:
+            runs = [run_isolated(backend, seconds) for _ in range(args.runs)]
+            cases.append(summarize(runs))
+            print(json.dumps(cases[-1]), file=sys.stderr)
+    report = {
+        "benchmark": "suite",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": cases,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+def cmd_compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"{row['case']:<14} {row['metric']:<22} {row['baseline']:>10.4f} -> "
+              f"{row['current']:>10.4f} ({row['change']:+.1%}) {flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+def cmd_case(args):
+    print(json.dumps(run_case(args.backend, args.seconds)))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmark cases")
+    run.add_argument("--backend", action="append", choices=BACKENDS,
+                     help="Backend to measure; repeat for several (default: stub)")
+    run.add_argument("--lengths", help="Comma-separated audio lengths in seconds")
+    run.add_argument("--runs", type=int, default=3)
+    run.add_argument("--output", help="Write the results to this JSON file")
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="Flag regressions between two result files")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--threshold", type=float, default=0.10,
+                      help="Allowed slowdown as a fraction (default 0.10)")
+    cmp_.set_defaults(func=cmd_compare)
+
+    # Used internally to run one case in a fresh interpreter.
+    case = sub.add_parser("case")
+    case.add_argument("backend", choices=BACKENDS)
+    case.add_argument("seconds", type=_number)
+    case.set_defaults(func=cmd_case)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
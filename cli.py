@@ -0,0 +1,418 @@
+"""Headless command-line interface.
+
+Usage:
+    python cli.py transcribe PATH [PATH ...] --model small --workers 2 --format json
+    python cli.py transcribe FOLDER --model small --processes 4
+    python cli.py transcribe voicemails/ --model small --batch 16
+    python cli.py transcribe calls/ --language auto --folder-language calls/istanbul=tr
+    python cli.py convert large-v3 --fp16
+    python cli.py monitor --interval 1 --count 10
+
+Only the standard library, config and events are imported up front. tkinter
+is never imported; torch and whisper load only once the transcribe command
+starts, psutil and GPUtil only for the monitor command or --metrics.
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from config import (
+    MODEL_LIST,
+    BATCH_SIZE,
+    MAX_WORKERS,
+    MONITOR_INTERVAL,
+    PROCESS_WORKERS,
+    TRANSCRIPT_FOLDER,
+    TRANSCRIBE_LANGUAGE,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_MAX_PENDING,
+)
+from events import Log, Warn, Error, Metrics
+
+OUTPUT_FORMATS = ["json", "txt", "srt", "vtt", "tsv"]
+
+
+def output_bases(files, roots):
+    """Output name without extension for each file, unique in the output folder.
+
+    Files found in a folder keep their path below it, so ``a/call.wav`` and
+    ``b/call.wav`` under one root do not meet. Names that still clash (two
+    roots with the same file, or ``call.wav`` next to ``call.mp3``) get the
+    source extension and, if needed, a counter appended.
+    """
+    folders = [os.path.abspath(root) for root in roots if os.path.isdir(root)]
+    bases = {}
+    for path in files:
+        full = os.path.abspath(path)
+        parents = [folder for folder in folders if full.startswith(folder.rstrip(os.sep) + os.sep)]
+        rel = os.path.relpath(full, max(parents, key=len)) if parents else os.path.basename(path)
+        bases[path] = os.path.splitext(rel)[0]
+    counts = {}
+    for base in bases.values():
+        counts[os.path.normcase(base)] = counts.get(os.path.normcase(base), 0) + 1
+    used = set()
+    for path in files:
+        base = bases[path]
+        if counts[os.path.normcase(base)] > 1:
+            base += "_" + os.path.splitext(path)[1].lstrip(".").lower()
+        candidate, n = base, 2
+        while os.path.normcase(candidate) in used:
+            candidate, n = f"{base}_{n}", n + 1
+        used.add(os.path.normcase(candidate))
+        bases[path] = candidate
+    return bases
+
+
+def output_path(audio_file, output_dir, fmt, base=None):
+    base = base or os.path.splitext(os.path.basename(audio_file))[0]
+    return os.path.join(output_dir, f"{base}.{fmt}")
+
+
+def write_result(result, audio_file, output_dir, fmt, model_name, base=None):
+    """Write one transcription and return the path it was written to.
+
+    ``base`` is the output name from output_bases; by default the input's
+    file name is used.
+    """
+    path = output_path(audio_file, output_dir, fmt, base)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    if fmt in ("srt", "vtt", "tsv"):
+        from exporters import WRITERS
+
+        writer = WRITERS[fmt](tmp_path)
+        writer.open()
+        for segment in result.get("segments", []):
+            writer.write(segment)
+        writer.close()
+        os.replace(tmp_path, path)
+        return path
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        if fmt == "json":
+            json.dump({
+                "file": os.path.abspath(audio_file),
+                "model": model_name,
+                "text": result.get("text", ""),
+                "language": result.get("language"),
+                "segments": result.get("segments", []),
+                "audio_duration": result.get("audio_duration"),
+                "rtf": result.get("rtf"),
+                "cached": bool(result.get("cached")),
+            }, f, ensure_ascii=False, indent=2)
+        else:
+            f.write(result.get("text", "").strip() + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def file_languages(args, files):
+    """Pinned language per file (None = detect) from --language and --folder-language."""
+    from language import language_for
+
+    folders = dict(args.folder_language or [])
+    return {path: language_for(path, folders) or language_for(path, args.language) for path in files}
+
+
+def _language(value):
+    from language import normalize
+
+    try:
+        normalize(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def _folder_language(value):
+    folder, sep, code = value.rpartition("=")
+    if not sep or not folder or not code:
+        raise argparse.ArgumentTypeError("expected FOLDER=LANGUAGE")
+    return folder, _language(code)
+
+
+def _drain(q, verbose, registry=None):
+    """Print log messages from the workers to stderr and collect metrics."""
+    while True:
+        try:
+            msg = q.get(timeout=0.2)
+        except queue.Empty:
+            return
+        if registry is not None and isinstance(msg, Metrics):
+            registry.record(msg.metrics)
+        if verbose and isinstance(msg, (Log, Warn, Error)):
+            prefix = f"[{msg.job_id}] " if msg.job_id is not None else ""
+            print(f"{prefix}{type(msg).__name__}: {msg.text}", file=sys.stderr)
+
+
+def cmd_transcribe(args):
+    from scheduler import JobScheduler, collect_audio_files, DONE
+    from transcriber import run_transcription
+    from language import detect_jobs
+
+    files = collect_audio_files(args.paths)
+    if not files:
+        print("No audio files found.", file=sys.stderr)
+        return 2
+    if args.metrics and args.batch is not None and args.processes is None:
+        # Files share every model call, so there are no per-file stage timings.
+        print("--metrics cannot be used with --batch.", file=sys.stderr)
+        return 2
+    registry = None
+    if args.metrics:
+        from metrics import MetricsRegistry
+        from system_monitor import get_sampler
+
+        registry = MetricsRegistry(args.metrics, sampler=get_sampler().start())
+    languages = file_languages(args, files)
+    args.bases = output_bases(files, args.paths)
+    if args.processes is not None:
+        return _transcribe_processes(args, files, languages, registry)
+    if args.batch is not None:
+        return _transcribe_batched(args, files, languages)
+
+    written = {}
+    lock = threading.Lock()
+
+    def on_finish(job, result):
+        if job.status == DONE and result is not None:
+            path = write_result(result, job.path, args.output, args.format, job.model_name,
+                                args.bases[job.path])
+            with lock:
+                written[job.id] = path
+
+    def runner(q, stop_evt, model_name, audio_file, device, precision, language=None):
+        run_transcription(q, stop_evt, model_name, audio_file, device, precision,
+                          stream=False, use_cache=not args.no_cache, language=language)
+
+    q = queue.Queue()
+    scheduler = JobScheduler(q, workers=args.workers, state_file=None, runner=runner, on_finish=on_finish,
+                             detector=detect_jobs)
+    for path in files:
+        scheduler.add(path, args.model, device=args.device, precision=args.precision,
+                      language=languages[path])
+    scheduler.start()
+    while not scheduler.join(timeout=0.5):
+        _drain(q, args.verbose, registry)
+    scheduler.shutdown()
+    _drain(q, args.verbose, registry)
+    if registry is not None:
+        registry.export()
+
+    failed = 0
+    for job in scheduler.jobs():
+        if job.status != DONE:
+            failed += 1
+        print(json.dumps({
+            "file": job.path,
+            "status": job.status,
+            "output": written.get(job.id),
+            "error": job.error,
+            "duration": job.duration,
+        }, ensure_ascii=False))
+    return 1 if failed else 0
+
+
+def _transcribe_processes(args, files, languages, registry=None):
+    """Shard ``files`` across worker processes, one model per process."""
+    from process_pool import ProcessPool
+
+    outcomes = {}
+
+    def on_finish(job_id, path, result):
+        output = None
+        if result is not None:
+            output = write_result(result, path, args.output, args.format, args.model, args.bases[path])
+        outcomes[job_id] = (path, output)
+
+    q = queue.Queue()
+    pool = ProcessPool(q, args.model, processes=args.processes or None, device=args.device or "cpu",
+                       precision=args.precision, on_finish=on_finish)
+    pool.start()
+    ids = [pool.submit(path, languages[path]) for path in files]
+    try:
+        while not pool.join(timeout=0.5):
+            _drain(q, args.verbose, registry)
+    finally:
+        pool.shutdown()
+    _drain(q, args.verbose, registry)
+    if registry is not None:
+        registry.export()
+
+    failed = 0
+    for job_id in ids:
+        path, output = outcomes.get(job_id, (None, None))
+        if output is None:
+            failed += 1
+        print(json.dumps({
+            "file": path,
+            "status": "done" if output else "failed",
+            "output": output,
+            "error": pool.error(job_id),
+        }, ensure_ascii=False))
+    return 1 if failed else 0
+
+
+def _transcribe_batched(args, files, languages):
+    """Decode windows of several files together in one model call."""
+    from batch_engine import transcribe_files
+
+    outputs = {}
+    errors = {}
+    # Files sharing a batch share its decoding options, so batch per language.
+    groups = {}
+    for path in files:
+        groups.setdefault(languages[path], []).append(path)
+    try:
+        for language, group in groups.items():
+            for path, result in transcribe_files(args.model, group, args.device, args.precision,
+                                                 batch_size=args.batch, use_cache=not args.no_cache,
+                                                 language=language):
+                if isinstance(result, Exception):
+                    errors[path] = str(result)
+                    continue
+                try:
+                    outputs[path] = write_result(result, path, args.output, args.format, args.model,
+                                                 args.bases[path])
+                except OSError as e:
+                    errors[path] = str(e)
+    except Exception as e:
+        # The model itself failed; files not reported yet fail with it.
+        for path in files:
+            errors.setdefault(path, str(e))
+
+    failed = 0
+    for path in files:
+        output = outputs.get(path)
+        if output is None:
+            failed += 1
+        print(json.dumps({
+            "file": path,
+            "status": "done" if output else "failed",
+            "output": output,
+            "error": None if output else errors.get(path),
+        }, ensure_ascii=False))
+    return 1 if failed else 0
+
+
+def cmd_convert(args):
+    """Convert downloaded checkpoints to memory-mapped files and report load cost."""
+    from model_pool import convert_model, measure_load_isolated
+
+    for model_name in args.models:
+        report = {"model": model_name, "fp16": args.fp16}
+        if args.compare:
+            report["before"] = measure_load_isolated(model_name)
+        report["path"] = convert_model(model_name, fp16=args.fp16)
+        report["size_bytes"] = os.path.getsize(report["path"])
+        if args.compare:
+            report["after"] = measure_load_isolated(model_name, mapped=True, fp16=args.fp16)
+        print(json.dumps(report, ensure_ascii=False), flush=True)
+    return 0
+
+
+def cmd_models(args):
+    """Print the model registry, one JSON line per installed model."""
+    from downloader import MODEL_URLS, expected_sha256
+    from model_registry import get_registry
+
+    registry = get_registry()
+    for name in registry.installed():
+        entry = registry.get(name)
+        if args.verify:
+            url = MODEL_URLS.get(name)
+            entry["verified"] = registry.verify(name, expected_sha256(url) if url else None)
+            entry["sha256"] = registry.get(name)["sha256"]
+        print(json.dumps({"model": name, **entry}, ensure_ascii=False))
+    return 0
+
+
+def cmd_monitor(args):
+    """Print one JSON line per system sample, as the window's sampler sees it."""
+    from system_monitor import SystemSampler
+
+    sampler = SystemSampler(interval=args.interval, history=1)
+    # The first CPU reading only sets the baseline for the next one.
+    sampler.sample()
+    taken = 0
+    try:
+        while args.count is None or taken < args.count:
+            time.sleep(args.interval)
+            print(json.dumps(sampler.sample().to_dict(), ensure_ascii=False), flush=True)
+            taken += 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_serve(args):
+    from server import serve
+
+    serve(args.host, args.port, args.workers, args.max_pending)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Whisper-GUI headless batch transcription")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    tr = sub.add_parser("transcribe", help="Transcribe files and folders")
+    tr.add_argument("paths", nargs="+", help="Audio files or folders")
+    tr.add_argument("--model", default="small", choices=MODEL_LIST)
+    tr.add_argument("--workers", type=int, default=MAX_WORKERS)
+    tr.add_argument("--processes", type=int, nargs="?", const=0, default=PROCESS_WORKERS or None,
+                    help="Run each worker in its own process; without a number the count "
+                         "follows CPU cores and free RAM")
+    tr.add_argument("--batch", type=int, nargs="?", const=BATCH_SIZE, default=None,
+                    help="Decode 30-second windows of several files in one batch "
+                         f"(default size {BATCH_SIZE}); best for many short clips")
+    tr.add_argument("--format", default="json", choices=OUTPUT_FORMATS)
+    tr.add_argument("--output", default=TRANSCRIPT_FOLDER, help="Output folder")
+    tr.add_argument("--device", default=None, choices=["auto", "cuda", "cpu"])
+    tr.add_argument("--precision", default=None, choices=["fp32", "fp16", "int8"])
+    tr.add_argument("--language", default=TRANSCRIBE_LANGUAGE, type=_language,
+                    help="Spoken language code such as tr or en, or auto to detect it per file")
+    tr.add_argument("--folder-language", metavar="FOLDER=LANGUAGE", type=_folder_language, action="append",
+                    help="Pin the language of every file below FOLDER; may be repeated")
+    tr.add_argument("--no-cache", action="store_true", help="Ignore stored results")
+    tr.add_argument("--metrics", metavar="PATH",
+                    help="Write per-stage timings as JSON here (and Prometheus text next to it)")
+    tr.add_argument("-v", "--verbose", action="store_true")
+    tr.set_defaults(func=cmd_transcribe)
+
+    cv = sub.add_parser("convert", help="Rewrite downloaded models as memory-mapped files for fast loading")
+    cv.add_argument("models", nargs="+", choices=MODEL_LIST)
+    cv.add_argument("--fp16", action="store_true", help="Store FP16 weights (used for FP16 runs on the GPU)")
+    cv.add_argument("--no-compare", dest="compare", action="store_false",
+                    help="Skip measuring load time and RSS before and after")
+    cv.set_defaults(func=cmd_convert)
+
+    md = sub.add_parser("models", help="List installed models with size, variants, last use and load time")
+    md.add_argument("--verify", action="store_true", help="Hash every checkpoint and check it")
+    md.set_defaults(func=cmd_models)
+
+    mo = sub.add_parser("monitor", help="Print CPU, RAM, GPU and worker usage samples as JSON lines")
+    mo.add_argument("--interval", type=float, default=MONITOR_INTERVAL, help="Seconds between samples")
+    mo.add_argument("--count", type=int, default=None, help="Stop after this many samples")
+    mo.set_defaults(func=cmd_monitor)
+
+    sv = sub.add_parser("serve", help="Run the local HTTP transcription service")
+    sv.add_argument("--host", default=SERVER_HOST)
+    sv.add_argument("--port", type=int, default=SERVER_PORT)
+    sv.add_argument("--workers", type=int, default=MAX_WORKERS)
+    sv.add_argument("--max-pending", type=int, default=SERVER_MAX_PENDING)
+    sv.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import importlib.util
 import os
 import warnings
 
@@ -81,11 +82,143 @@ MODEL_REQUIREMENTS = {
     }
 }
 
+# 🔹 Model havuzu bellek bütçesi
+# Bellekte tutulacak modellerin toplam boyutu (ör. "8GB"). Aşılırsa en uzun
+# süredir kullanılmayan model boşaltılır.
+MODEL_POOL_BUDGET = os.environ.get("WHISPER_GUI_MODEL_BUDGET", "8GB")
+
+# 🔹 Son kullanılan modeli önceden yükle
+# Açılışta model kayıt defterindeki en son kullanılan model arka planda
+# havuza yüklenir
+PRELOAD_LAST_MODEL = os.environ.get("WHISPER_GUI_PRELOAD", "1") != "0"
+
+# 🔹 Bellek eşlemeli model dosyaları
+# "cli.py convert" ile dönüştürülen modeller (<ad>.mmap, <ad>.fp16.mmap)
+# varsa ağırlıklar tamamen okunmadan dosyadan eşlenerek yüklenir
+MODEL_MMAP = os.environ.get("WHISPER_GUI_MODEL_MMAP", "1") != "0"
+
+# 🔹 CPU çıkarım ayarları
+# intra-op: tek bir işlem içindeki paralel iş parçacıkları
+# inter-op: bağımsız işlemleri aynı anda çalıştıran iş parçacıkları
+CPU_THREADS = int(os.environ.get("WHISPER_GUI_CPU_THREADS", os.cpu_count() or 1))
+CPU_INTEROP_THREADS = int(os.environ.get("WHISPER_GUI_CPU_INTEROP_THREADS", 2))
+
+# 🔹 İş kuyruğu ayarları
+# Desteklenen ses uzantıları, eş zamanlı çalışan iş sayısı ve kuyruğun
+# yeniden başlatmalarda korunduğu dosya
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".flac", ".m4a", ".ogg", ".mp4"}
+MAX_WORKERS = int(os.environ.get("WHISPER_GUI_WORKERS", 2))
+QUEUE_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_queue.json")
+
+# 🔹 Akış modu
+# Ses her zaman 30 saniyelik pencerelerle çözülür (Durdur her pencerede
+# kontrol edilir). Açıkken segmentler çözülür çözülmez arayüze gönderilir.
+STREAM_SEGMENTS = os.environ.get("WHISPER_GUI_STREAM", "1") != "0"
+STREAM_WINDOW_SECONDS = 30
+
+# 🔹 Taslak ve iyileştirme
+# Açıkken önce hızlı PREVIEW_MODEL bir taslak çıkarır; ardından seçilen model
+# aynı çözülmüş ses üzerinde çalışır ve taslak segmentleri yerinde değiştirir
+PREVIEW_MODEL = os.environ.get("WHISPER_GUI_PREVIEW_MODEL", "base")
+
+# 🔹 Sessizlik atlama (VAD)
+# Model yalnızca enerjisi eşiği aşan (konuşma içeren) bölümlere çalışır;
+# zaman damgaları orijinal kayda göre düzeltilir
+VAD_ENABLED = os.environ.get("WHISPER_GUI_VAD", "1") != "0"
+VAD_THRESHOLD_DB = float(os.environ.get("WHISPER_GUI_VAD_THRESHOLD_DB", -45.0))
+VAD_MARGIN_DB = 10.0
+VAD_MIN_SPEECH_MS = 250
+VAD_MIN_SILENCE_MS = 500
+VAD_PAD_MS = 200
+
+# 🔹 Sonuç önbelleği
+# Aynı ses dosyası aynı model ve ayarlarla tekrar işlenirse kayıtlı sonuç
+# kullanılır. Önbellek boyutu aşılırsa en eski kayıtlar silinir.
+CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cache")
+RESULT_CACHE_SIZE = os.environ.get("WHISPER_GUI_RESULT_CACHE_SIZE", "512MB")
+
+# 🔹 Ses önbelleği
+# Çözülen 16 kHz PCM bellek eşlemeli dosyalarda tutulur. AUDIO_CACHE_MEL açıksa
+# toplu çıkarım log-mel özelliklerini de (modelin mel sayısıyla) önbelleğe yazar
+# ve tam 30 saniyelik pencerelerde oradan okur
+AUDIO_CACHE_SIZE = os.environ.get("WHISPER_GUI_AUDIO_CACHE_SIZE", "4GB")
+AUDIO_CACHE_MEL = os.environ.get("WHISPER_GUI_AUDIO_CACHE_MEL", "0") == "1"
+
+# 🔹 Konuşma dili
+# "auto" ise dil, kuyruktaki dosyaların ilk 30 saniyelik konuşmasından
+# LANGUAGE_BATCH dosyalık tek bir model çağrısıyla algılanır ve ses özetiyle
+# saklanır. Bir dil kodu (ör. "tr") verilirse algılama hiç çalışmaz.
+TRANSCRIBE_LANGUAGE = os.environ.get("WHISPER_GUI_LANGUAGE", "auto")
+LANGUAGE_BATCH = int(os.environ.get("WHISPER_GUI_LANGUAGE_BATCH", 16))
+LANGUAGE_CACHE_FILE = os.path.join(CACHE_FOLDER, "languages.json")
+
+# 🔹 Çoklu süreç modu
+# Her alt süreç kendi modelini yükler; 0 ise süreç sayısı çekirdek sayısı ve
+# boştaki RAM'e göre belirlenir
+PROCESS_WORKERS = int(os.environ.get("WHISPER_GUI_PROCESSES", 0))
+
+# 🔹 Toplu çıkarım
+# Birden çok dosyanın 30 saniyelik pencereleri tek bir kodlayıcı/çözücü
+# çağrısında işlenir; kısa kayıtlarda verimi artırır
+BATCH_SIZE = int(os.environ.get("WHISPER_GUI_BATCH_SIZE", 8))
+
+# 🔹 Performans ölçümleri
+# İş başına aşama süreleri toplanır; JSON ve Prometheus metin dosyası
+# olarak dışa aktarılır (aynı adla .prom uzantılı)
+METRICS_FILE = os.environ.get("WHISPER_GUI_METRICS_FILE", os.path.join(CACHE_FOLDER, "metrics.json"))
+
+# 🔹 Günlük (log) ayarları
+# Kayıtlar sınırlı bir halka tamponda toplanır ve arayüz her karede toplu
+# olarak yazar. LOG_FILE verilirse kayıtlar dönen bir dosyaya da yazılır.
+LOG_BUFFER_LINES = 5000
+LOG_MAX_LINES = int(os.environ.get("WHISPER_GUI_LOG_MAX_LINES", 2000))
+LOG_FLUSH_MS = 33
+LOG_FILE = os.environ.get("WHISPER_GUI_LOG_FILE", "")
+LOG_FILE_MAX_BYTES = os.environ.get("WHISPER_GUI_LOG_FILE_SIZE", "5MB")
+LOG_FILE_BACKUPS = 3
+
+# 🔹 Olay pompası
+# Arayüz kuyruğu yalnızca yeni olay geldiğinde boşaltır; her turda en fazla
+# EVENT_BATCH olay işlenir, kalanlar EVENT_TICK_MS sonra devam eder
+EVENT_BATCH = 200
+EVENT_TICK_MS = 16
+
+# 🔹 Sistem izleme
+# CPU/RAM/GPU örnekleri arka planda MONITOR_INTERVAL saniyede bir alınır;
+# son MONITOR_HISTORY örnek saklanır
+MONITOR_INTERVAL = float(os.environ.get("WHISPER_GUI_MONITOR_INTERVAL", 2.0))
+MONITOR_HISTORY = 120
+
+# 🔹 Model indirme
+# Yarım kalan indirmeler kaldığı yerden sürer; aynı anda en fazla
+# DOWNLOAD_WORKERS model indirilir
+DOWNLOAD_WORKERS = int(os.environ.get("WHISPER_GUI_DOWNLOAD_WORKERS", 2))
+
+# 🔹 Dışa aktarma
+# "Kaydet" bu biçimlerin hepsini arka planda yazar; canlı altyazı açıksa
+# LIVE_EXPORT_FORMATS dosyaları segmentler geldikçe büyür
+EXPORT_FORMATS = os.environ.get("WHISPER_GUI_EXPORT_FORMATS", "txt,pdf,srt,vtt,json,tsv").split(",")
+LIVE_EXPORT_FORMATS = ["srt", "vtt"]
+
+# 🔹 HTTP servis ayarları
+# Kuyrukta bekleyen + çalışan iş sayısı bu sınırı aşarsa yeni istekler 429 alır
+SERVER_HOST = os.environ.get("WHISPER_GUI_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("WHISPER_GUI_SERVER_PORT", 8765))
+SERVER_MAX_PENDING = int(os.environ.get("WHISPER_GUI_SERVER_MAX_PENDING", 32))
+# Biten işlerin sonucu bu kadar saniye sorgulanabilir, sonra silinir
+SERVER_RESULT_TTL = int(os.environ.get("WHISPER_GUI_SERVER_RESULT_TTL", 3600))
+
 # 🔹 Eksik modülleri kontrol et
+# Modüller içe aktarılmadan yalnızca varlıkları kontrol edilir
+def module_available(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
 missing_modules = set()
 for module in ["whisper", "torch", "psutil", "GPUtil"]:
-    try:
-        __import__(module)
-    except ImportError:
+    if not module_available(module):
         missing_modules.add(module)
 
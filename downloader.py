@@ -0,0 +1,188 @@
+"""Resumable Whisper checkpoint downloads.
+
+Checkpoints are streamed straight to MODEL_FOLDER instead of being loaded
+by ``whisper.load_model`` just to get them on disk. A partial download is
+kept as ``<name>.pt.part`` and continued with an HTTP Range request, and the
+finished file is checked against the SHA-256 that is part of every model
+URL before it replaces anything.
+"""
+import hashlib
+import os
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from config import MODEL_FOLDER, DOWNLOAD_WORKERS
+from result_cache import get_result_cache
+from model_registry import get_registry
+
+# Same table as whisper._MODELS; the second to last path element is the
+# SHA-256 of the checkpoint.
+MODEL_URLS = {
+    "tiny.en": "https://openaipublic.azureedge.net/main/whisper/models/d3dd57d32accea0b295c96e26691aa14d8822fac7d9d27d5dc00b4ca2826dd03/tiny.en.pt",
+    "tiny": "https://openaipublic.azureedge.net/main/whisper/models/65147644a518d12f04e32d6f3b26facc3f8dd46e5390956a9424a650c0ce22b9/tiny.pt",
+    "base.en": "https://openaipublic.azureedge.net/main/whisper/models/25a8566e1d0c1e2231d1c762132cd20e0f96a85d16145c3a00adf5d1ac670ead/base.en.pt",
+    "base": "https://openaipublic.azureedge.net/main/whisper/models/ed3a0b6b1c0edf879ad9b11b1af5a0e6ab5db9205f891f668f8b0e6c6326e34e/base.pt",
+    "small.en": "https://openaipublic.azureedge.net/main/whisper/models/f953ad0fd29cacd07d5a9eda5624af0f6bcf2258be67c92b79389873d91e0872/small.en.pt",
+    "small": "https://openaipublic.azureedge.net/main/whisper/models/9ecf779972d90ba49c06d968637d720dd632c55bbf19d441fb42bf17a411e794/small.pt",
+    "medium.en": "https://openaipublic.azureedge.net/main/whisper/models/d7440d1dc186f76616474e0ff0b3b6b879abc9d1a4926b7adfa41db2d497ab4f/medium.en.pt",
+    "medium": "https://openaipublic.azureedge.net/main/whisper/models/345ae4da62f9b3d59415adc60127b97c714f32e89e936602e85993674d08dcb1/medium.pt",
+    "large-v1": "https://openaipublic.azureedge.net/main/whisper/models/e4b87e7e0bf463eb8e6956e646f1e277e901512310def2c24bf0e11bd3c28e9a/large-v1.pt",
+    "large-v2": "https://openaipublic.azureedge.net/main/whisper/models/81f7c96c852ee8fc832187b0132e569d6c3065a3252ed18e56effd0b6a73e524/large-v2.pt",
+    "large-v3": "https://openaipublic.azureedge.net/main/whisper/models/e5b1a55b89c1367dacf97e3e19bfd829a01529dbfdeefa8caeb59b3f1b81dadb/large-v3.pt",
+    "large": "https://openaipublic.azureedge.net/main/whisper/models/e5b1a55b89c1367dacf97e3e19bfd829a01529dbfdeefa8caeb59b3f1b81dadb/large-v3.pt",
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class DownloadCancelled(Exception):
+    """The download was stopped; the partial file is kept for resuming."""
+
+
+class ChecksumError(ValueError):
+    """The downloaded file does not match the SHA-256 in its URL."""
+
+
+def expected_sha256(url):
+    return url.rstrip("/").split("/")[-2]
+
+
+def model_path(model_name):
+    """Where whisper.load_model(download_root=MODEL_FOLDER) looks for the model."""
+    return os.path.join(MODEL_FOLDER, os.path.basename(MODEL_URLS[model_name]))
+
+
+def _hash_into(digest, path):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    _hash_into(digest, path)
+    return digest.hexdigest()
+
+
+def download(url, dest, sha256=None, progress=None, stop_event=None, timeout=30):
+    """Download ``url`` to ``dest``, resuming ``dest + '.part'`` if present.
+
+    ``progress(done, total)`` is called after every chunk (``total`` is None
+    when the server does not say). Returns ``dest``. An existing ``dest``
+    with the right checksum is not downloaded again.
+    """
+    sha256 = sha256 or expected_sha256(url)
+    if os.path.isfile(dest) and _sha256(dest) == sha256:
+        return dest
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    part = dest + ".part"
+    offset = os.path.getsize(part) if os.path.isfile(part) else 0
+
+    request = urllib.request.Request(url)
+    if offset:
+        request.add_header("Range", f"bytes={offset}-")
+    digest = hashlib.sha256()
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code != 416:
+            raise
+        # Range not satisfiable: the partial file already holds everything.
+        response = None
+    if response is None:
+        total = offset
+        _hash_into(digest, part)
+    else:
+        with response:
+            if offset and response.status == 206:
+                _hash_into(digest, part)
+                mode = "ab"
+            else:
+                # The server ignored the range; start over.
+                offset, mode = 0, "wb"
+            length = response.headers.get("Content-Length")
+            total = offset + int(length) if length is not None else None
+            done = offset
+            with open(part, mode) as f:
+                while True:
+                    if stop_event is not None and stop_event.is_set():
+                        raise DownloadCancelled(url)
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    digest.update(chunk)
+                    done += len(chunk)
+                    if progress is not None:
+                        progress(done, total)
+
+    if digest.hexdigest() != sha256:
+        os.remove(part)
+        raise ChecksumError(f"SHA-256 mismatch for {os.path.basename(dest)}; please download it again")
+    os.replace(part, dest)
+    return dest
+
+
+def download_model(model_name, progress=None, stop_event=None):
+    """Download a Whisper checkpoint into MODEL_FOLDER and return its path."""
+    if model_name not in MODEL_URLS:
+        raise ValueError(f"unknown model: {model_name}")
+    url = MODEL_URLS[model_name]
+    path = download(url, model_path(model_name), progress=progress, stop_event=stop_event)
+    get_registry(MODEL_FOLDER).record_download(path, expected_sha256(url))
+    # New weights make results stored for this model stale.
+    get_result_cache().invalidate(model_name)
+    return path
+
+
+class DownloadManager:
+    """Runs up to ``workers`` model downloads at once.
+
+    Asking for a model that is already downloading returns the running
+    future instead of starting a second transfer.
+    """
+
+    def __init__(self, workers=DOWNLOAD_WORKERS, fetch=download_model):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-download")
+        self._fetch = fetch
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def submit(self, model_name, progress=None):
+        with self._lock:
+            if model_name in self._running:
+                return self._running[model_name][0]
+            stop_event = threading.Event()
+            future = self._executor.submit(self._fetch, model_name, progress, stop_event)
+            self._running[model_name] = (future, stop_event)
+        future.add_done_callback(lambda _: self._done(model_name))
+        return future
+
+    def cancel(self, model_name):
+        with self._lock:
+            entry = self._running.get(model_name)
+        if entry is not None:
+            entry[1].set()
+
+    def active(self):
+        with self._lock:
+            return list(self._running)
+
+    def _done(self, model_name):
+        with self._lock:
+            self._running.pop(model_name, None)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_downloader():
+    """Process-wide download manager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DownloadManager()
+        return _manager
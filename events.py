@@ -0,0 +1,165 @@
+"""Typed messages between transcription workers and their consumers.
+
+Workers put Event instances on a queue; the scheduler stamps each one with
+the id of the job it belongs to. In the window, a single EventPump drains
+the queue: producers raise a flag that the pump checks on the Tk thread,
+and each round handles at most ``batch`` events before yielding to Tk, so
+UI overhead stays flat however many jobs have run.
+"""
+import queue
+import threading
+from dataclasses import dataclass
+
+from config import EVENT_BATCH, EVENT_TICK_MS
+
+
+class Event:
+    """Base class of everything posted on a transcription queue."""
+
+    __slots__ = ()
+
+
+@dataclass
+class Log(Event):
+    text: str
+    job_id: str = None
+
+
+@dataclass
+class Warn(Event):
+    text: str
+    job_id: str = None
+
+
+@dataclass
+class Error(Event):
+    text: str
+    job_id: str = None
+
+
+@dataclass
+class Segment(Event):
+    """A decoded segment; ``draft`` marks a preview that a refined one replaces."""
+
+    segment: dict
+    draft: bool = False
+    job_id: str = None
+
+
+@dataclass
+class Result(Event):
+    result: dict
+    duration: float = None
+    job_id: str = None
+
+
+@dataclass
+class Stopped(Event):
+    """A job stopped early; ``result`` holds what was decoded, if anything."""
+
+    result: dict = None
+    before_start: bool = False
+    job_id: str = None
+
+
+@dataclass
+class JobStatus(Event):
+    job: dict
+    job_id: str = None
+
+
+@dataclass
+class Metrics(Event):
+    metrics: object
+    job_id: str = None
+
+
+@dataclass
+class DownloadProgress(Event):
+    """Bytes received so far for a model download; ``total`` may be None."""
+
+    model: str
+    done: int
+    total: int = None
+    finished: bool = False
+    job_id: str = None
+
+
+class EventQueue(queue.Queue):
+    """A Queue that calls ``on_put`` after every put, from the putting thread."""
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self.on_put = None
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        callback = self.on_put
+        if callback is not None:
+            callback()
+
+
+class EventPump:
+    """The one consumer of an EventQueue inside a Tk application.
+
+    Register handlers with ``on(EventType, handler)`` and call ``start()``
+    once. There is no polling loop: a put schedules one ``after`` callback
+    unless one is already pending (tkinter runs it on the Tk thread, whichever
+    thread asked), and the callback re-arms itself after ``tick_ms`` only
+    while events are left over from a full batch.
+    """
+
+    def __init__(self, root, q, batch=EVENT_BATCH, tick_ms=EVENT_TICK_MS):
+        self.root = root
+        self.q = q
+        self.batch = batch
+        self.tick_ms = tick_ms
+        self._handlers = {}
+        self._fallback = None
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def on(self, event_type, handler):
+        self._handlers[event_type] = handler
+        return self
+
+    def otherwise(self, handler):
+        """Handler for messages no typed handler claims."""
+        self._fallback = handler
+        return self
+
+    def start(self):
+        self.q.on_put = self._wake
+        # Pick up anything queued before the pump existed.
+        self._wake()
+        return self
+
+    def _wake(self):
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.root.after(0, self._poll)
+
+    def _poll(self):
+        self._drain()
+        with self._lock:
+            # A put after this check finds nothing scheduled and wakes us.
+            if self.q.empty():
+                self._scheduled = False
+                return
+        # A full batch was handled; let Tk redraw before the next one.
+        self.root.after(self.tick_ms, self._poll)
+
+    def _drain(self):
+        for _ in range(self.batch):
+            try:
+                event = self.q.get_nowait()
+            except queue.Empty:
+                return
+            self.dispatch(event)
+
+    def dispatch(self, event):
+        handler = self._handlers.get(type(event), self._fallback)
+        if handler is not None:
+            handler(event)
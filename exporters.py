@@ -0,0 +1,237 @@
+"""Transcript exporters: TXT, PDF, SRT, WebVTT, JSON and TSV.
+
+Every format is written from segment data by a background thread, one
+segment at a time, so saving a long transcript never blocks the window and
+subtitles can be written while segments are still streaming in. Text
+formats are flushed after each batch of segments; PDF and JSON are only
+complete once the session is closed.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+
+from config import EXPORT_FORMATS
+
+
+def _clock(seconds, separator):
+    millis = max(0, round(float(seconds) * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+class SegmentWriter:
+    """Writes one file; ``write`` receives segments in order.
+
+    The base class writes plain text, one segment per line; formats
+    override ``write_text`` (or ``write``) and ``extension``.
+    """
+
+    extension = None
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+    def open(self):
+        self.f = open(self.path, "w", encoding="utf-8", newline="\n")
+
+    def write(self, segment):
+        text = segment.get("text", "").strip()
+        if text:
+            self.count += 1
+            self.write_text(segment, text)
+
+    def write_text(self, segment, text):
+        self.f.write(text + "\n")
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class TxtWriter(SegmentWriter):
+    extension = "txt"
+
+
+class SrtWriter(SegmentWriter):
+    extension = "srt"
+
+    def write_text(self, segment, text):
+        self.f.write(f"{self.count}\n{_clock(segment['start'], ',')} --> {_clock(segment['end'], ',')}\n"
+                     f"{text.replace('-->', '->')}\n\n")
+
+
+class VttWriter(SegmentWriter):
+    extension = "vtt"
+
+    def open(self):
+        super().open()
+        self.f.write("WEBVTT\n\n")
+
+    def write_text(self, segment, text):
+        self.f.write(f"{_clock(segment['start'], '.')} --> {_clock(segment['end'], '.')}\n"
+                     f"{text.replace('-->', '->')}\n\n")
+
+
+class TsvWriter(SegmentWriter):
+    """Start and end in milliseconds, like Whisper's own TSV output."""
+
+    extension = "tsv"
+
+    def open(self):
+        super().open()
+        self.f.write("start\tend\ttext\n")
+
+    def write_text(self, segment, text):
+        text = " ".join(text.split())
+        self.f.write(f"{round(segment['start'] * 1000)}\t{round(segment['end'] * 1000)}\t{text}\n")
+
+
+class JsonWriter(SegmentWriter):
+    """``{"segments": [...], "text": ...}``, streamed segment by segment."""
+
+    extension = "json"
+
+    def open(self):
+        super().open()
+        self.f.write('{"segments": [')
+        self._text = []
+
+    def write(self, segment):
+        record = {"start": segment.get("start", 0.0), "end": segment.get("end", 0.0),
+                  "text": segment.get("text", "")}
+        self.f.write((",\n  " if self.count else "\n  ") + json.dumps(record, ensure_ascii=False))
+        self.count += 1
+        self._text.append(record["text"])
+
+    def close(self):
+        self.f.write("\n], \"text\": " + json.dumps("".join(self._text).strip(), ensure_ascii=False) + "}\n")
+        super().close()
+
+
+class PdfWriter(SegmentWriter):
+    """One paragraph per segment; the file is written when the session closes."""
+
+    extension = "pdf"
+
+    def open(self):
+        from fpdf import FPDF
+
+        self.pdf = FPDF()
+        self.pdf.set_auto_page_break(auto=True, margin=15)
+        self.pdf.add_page()
+        self.pdf.set_font("Arial", size=12)
+
+    def write_text(self, segment, text):
+        self.pdf.multi_cell(0, 10, text)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.pdf.output(self.path)
+
+
+WRITERS = {cls.extension: cls for cls in (TxtWriter, PdfWriter, SrtWriter, VttWriter, JsonWriter, TsvWriter)}
+
+_CLOSE = object()
+
+
+class ExportSession:
+    """Writes segments to ``base_path.<format>`` for each format on a thread.
+
+    ``add``/``extend`` only queue segments and may be called from any
+    thread, including while a transcription is still running. ``close``
+    finishes the files; ``on_done(session)`` is then called from the export
+    thread with ``paths`` (format -> written file) and ``errors`` (format ->
+    message) filled in. A format that fails does not stop the others.
+    """
+
+    def __init__(self, base_path, formats=None, on_done=None):
+        formats = list(formats or EXPORT_FORMATS)
+        unknown = [fmt for fmt in formats if fmt not in WRITERS]
+        if unknown:
+            raise ValueError(f"unknown export format: {', '.join(unknown)}")
+        self.base_path = base_path
+        self.formats = formats
+        self.on_done = on_done
+        self.paths = {}
+        self.errors = {}
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"export-{os.path.basename(base_path)}",
+                                        daemon=True)
+        self._thread.start()
+
+    def add(self, segment):
+        self._queue.put(segment)
+
+    def extend(self, segments):
+        for segment in segments:
+            self._queue.put(segment)
+
+    def close(self):
+        self._queue.put(_CLOSE)
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _open_writers(self):
+        folder = os.path.dirname(self.base_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        writers = {}
+        for fmt in self.formats:
+            writer = WRITERS[fmt](f"{self.base_path}.{fmt}")
+            try:
+                writer.open()
+            except Exception as e:
+                self.errors[fmt] = str(e)
+            else:
+                writers[fmt] = writer
+        return writers
+
+    def _each(self, writers, action):
+        for fmt, writer in list(writers.items()):
+            try:
+                action(writer)
+            except Exception as e:
+                logging.info(f"{fmt} export failed: {e}")
+                self.errors[fmt] = str(e)
+                del writers[fmt]
+
+    def _run(self):
+        writers = self._open_writers()
+        closed = False
+        while not closed:
+            batch = [self._queue.get()]
+            # Take whatever else has arrived so files are flushed once per batch.
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is _CLOSE:
+                    closed = True
+                    break
+                self._each(writers, lambda w: w.write(item))
+            self._each(writers, lambda w: w.flush())
+        self._each(writers, lambda w: w.close())
+        self.paths = {fmt: writer.path for fmt, writer in writers.items()}
+        if self.on_done is not None:
+            self.on_done(self)
+
+
+def export_segments(segments, base_path, formats=None, on_done=None):
+    """Export finished segments in the background and return the session."""
+    session = ExportSession(base_path, formats, on_done)
+    session.extend(segments)
+    session.close()
+    return session
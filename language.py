@@ -0,0 +1,242 @@
+"""Spoken-language selection and batched language detection.
+
+A job's language is pinned (a code such as "tr"), taken from the folder its
+file sits in, or "auto". A pinned language goes straight to the decoder and
+no detection runs. For auto jobs the language is detected from the first
+30-second window of speech; the scheduler does this for many queued files
+at once, stacking their log-mel spectrograms into a single
+``model.detect_language`` call. Detected languages are stored by audio
+hash, so a file is only ever detected once.
+"""
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from config import LANGUAGE_BATCH, LANGUAGE_CACHE_FILE, VAD_ENABLED
+from startup import LazyModule
+
+torch = LazyModule("torch")
+whisper = LazyModule("whisper")
+
+AUTO = "auto"
+SAMPLE_RATE = 16000
+# Same as whisper.audio.N_SAMPLES: one 30-second window.
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+# How much of the start of a file is searched for speech to detect on.
+SEARCH_SAMPLES = 4 * WINDOW_SAMPLES
+
+# Offered in the window; any other Whisper language code can be typed in.
+COMMON_LANGUAGES = [AUTO, "en", "tr", "de", "fr", "es", "it", "pt", "nl", "ru", "ar", "zh", "ja"]
+
+
+@functools.lru_cache(maxsize=None)
+def _known_languages():
+    """{code, name or alias: code} for Whisper's languages, or None without Whisper."""
+    try:
+        from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
+    except ImportError:
+        return None
+    if not isinstance(LANGUAGES, dict):
+        return None
+    known = {code: code for code in LANGUAGES}
+    known.update(TO_LANGUAGE_CODE)
+    return known
+
+
+def normalize(language):
+    """Lower-cased language code, or None for auto-detection.
+
+    Language names such as "Turkish" become their code; anything Whisper
+    does not know raises ValueError.
+    """
+    if language is None:
+        return None
+    language = str(language).strip().lower()
+    if language in ("", AUTO):
+        return None
+    known = _known_languages()
+    if known is None:
+        return language
+    if language not in known:
+        raise ValueError(f"unknown language: {language}")
+    return known[language]
+
+
+def language_for(path, language):
+    """Language for ``path`` given a code or a ``{folder: code}`` mapping.
+
+    With a mapping, the deepest folder containing ``path`` wins; files in
+    none of them are auto-detected. Every code is validated, not just the
+    one that applies.
+    """
+    if not isinstance(language, dict):
+        return normalize(language)
+    path = os.path.abspath(path)
+    best, depth = None, -1
+    for folder, code in language.items():
+        code = normalize(code)
+        folder = os.path.abspath(folder)
+        if (path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)) and len(folder) > depth:
+            best, depth = code, len(folder)
+    return best
+
+
+class LanguageCache:
+    """Detected language per audio hash, kept in a small JSON file."""
+
+    def __init__(self, path=LANGUAGE_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._languages = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("languages", {})
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, audio_hash):
+        with self._lock:
+            return self._languages.get(audio_hash)
+
+    def put(self, audio_hash, language):
+        with self._lock:
+            if self._languages.get(audio_hash) == language:
+                return
+            self._languages[audio_hash] = language
+            try:
+                self._write()
+            except OSError as e:
+                # The language stays known to this process; only reuse suffers.
+                logging.info(f"Language cache update failed: {e}")
+
+    def _write(self):
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        # The GUI, CLI, server and pool workers can share the file, so each
+        # write goes through a temporary file of its own.
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=folder)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"languages": self._languages}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_language_cache():
+    """Process-wide detected-language cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LanguageCache()
+        return _cache
+
+
+def first_window(audio):
+    """The first 30 seconds of speech in ``audio``.
+
+    Only the start of the file is searched, so a long recording is not
+    read just to find its first words.
+    """
+    head = audio[:SEARCH_SAMPLES]
+    if VAD_ENABLED:
+        from vad import SpeechAudio, speech_regions
+
+        speech = SpeechAudio(head, speech_regions(head, SAMPLE_RATE), SAMPLE_RATE)
+        if len(speech):
+            return speech[:WINDOW_SAMPLES]
+    return head[:WINDOW_SAMPLES]
+
+
+def detect_batch(model, clips):
+    """Most likely language of each clip, from one detect_language call."""
+    if not clips:
+        return []
+    if not model.is_multilingual:
+        return ["en"] * len(clips)
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(clip), model.dims.n_mels) for clip in clips
+    ]).to(model.device)
+    _, probs = model.detect_language(mels)
+    return [max(p, key=p.get) for p in probs]
+
+
+def detect_languages(model, items, cache=None, batch_size=LANGUAGE_BATCH):
+    """Language of each ``(audio_hash, audio)`` in ``items``.
+
+    Cached languages are reused; the rest are detected ``batch_size`` files
+    per model call and stored when their hash is known.
+    """
+    cache = cache or get_language_cache()
+    languages = [cache.get(audio_hash) if audio_hash else None for audio_hash, _ in items]
+    todo = [i for i, language in enumerate(languages) if language is None]
+    for start in range(0, len(todo), max(1, batch_size)):
+        chunk = todo[start:start + max(1, batch_size)]
+        for i, language in zip(chunk, detect_batch(model, [first_window(items[i][1]) for i in chunk])):
+            languages[i] = language
+            if items[i][0]:
+                cache.put(items[i][0], language)
+    return languages
+
+
+def detect_jobs(jobs):
+    """Scheduler hook: ``{job_id: language}`` for a batch of auto jobs.
+
+    Jobs are grouped by the model that decodes them first (the preview model
+    of a draft-then-refine job), which the pool then keeps loaded for the
+    transcription itself. Files whose audio cannot be
+    read are left out; their job reports the error when it runs.
+    """
+    from audio_cache import load_audio
+    from model_pool import get_pool
+    from result_cache import hash_file
+    from transcriber import select_device, select_precision
+
+    cache = get_language_cache()
+    found = {}
+    groups = {}
+    for job in jobs:
+        try:
+            audio_hash = hash_file(job.path)
+        except OSError:
+            continue
+        language = cache.get(audio_hash)
+        if language is not None:
+            found[job.id] = language
+        else:
+            groups.setdefault((job.first_model, job.device, job.precision), []).append((job, audio_hash))
+    for (model_name, device, precision), members in groups.items():
+        readable, items = [], []
+        for job, audio_hash in members:
+            try:
+                items.append((audio_hash, load_audio(job.path, audio_hash)))
+            except Exception as e:
+                logging.info(f"Skipping language detection for {job.path}: {e}")
+                continue
+            readable.append(job)
+        if not items:
+            continue
+        try:
+            device = select_device(device)
+            precision = select_precision(device, precision)
+            with get_pool().using(model_name, device, precision) as model:
+                languages = detect_languages(model, items, cache)
+        except Exception as e:
+            logging.info(f"Language detection for {len(items)} file(s) failed: {e}")
+            continue
+        for job, language in zip(readable, languages):
+            found[job.id] = language
+    return found
@@ -0,0 +1,115 @@
+"""Thread-safe log pipeline for the Tk log area.
+
+Any thread may log. Records are formatted by the logging thread and
+appended to a bounded deque; appends and pops on a deque are atomic, so
+no lock is taken on the way in. The Tk side drains the buffer once per
+frame with a single insert, caps the widget's line count and scrolls once.
+
+File logging is optional and runs through a QueueListener so disk writes
+never happen on the logging (or UI) thread.
+"""
+import logging
+import logging.handlers
+import queue
+from collections import deque
+
+from config import (
+    LOG_BUFFER_LINES,
+    LOG_MAX_LINES,
+    LOG_FLUSH_MS,
+    LOG_FILE_MAX_BYTES,
+    LOG_FILE_BACKUPS,
+)
+from model_pool import parse_size
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the newest ``capacity`` formatted records for the UI."""
+
+    def __init__(self, capacity=LOG_BUFFER_LINES):
+        super().__init__()
+        self._buffer = deque(maxlen=capacity)
+        self.capacity = capacity
+        # Approximate: counted without a lock.
+        self.dropped = 0
+
+    def handle(self, record):
+        # logging.Handler.handle takes the handler lock around emit; the
+        # deque is already safe to append to from any thread.
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record):
+        try:
+            msg = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._buffer) == self.capacity:
+            self.dropped += 1
+        self._buffer.append(msg)
+
+    def drain(self):
+        """Pop every buffered line, oldest first."""
+        lines = []
+        try:
+            while True:
+                lines.append(self._buffer.popleft())
+        except IndexError:
+            pass
+        return lines
+
+
+class LogFlusher:
+    """Moves buffered lines into a Tk text widget on the Tk thread."""
+
+    def __init__(self, widget, handler, max_lines=LOG_MAX_LINES, interval_ms=LOG_FLUSH_MS):
+        self.widget = widget
+        self.handler = handler
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self._reported_drops = 0
+
+    def start(self):
+        self.widget.after(self.interval_ms, self._tick)
+        return self
+
+    def _tick(self):
+        self.flush()
+        self.widget.after(self.interval_ms, self._tick)
+
+    def flush(self):
+        lines = self.handler.drain()
+        dropped = self.handler.dropped - self._reported_drops
+        if dropped:
+            self._reported_drops += dropped
+            lines.insert(0, f"... {dropped} log lines dropped")
+        if not lines:
+            return
+        self.widget.insert("end", "\n".join(lines) + "\n")
+        # "end-1c" is on the empty line after the last newline.
+        line_count = int(str(self.widget.index("end-1c")).split(".")[0]) - 1
+        excess = line_count - self.max_lines
+        if excess > 0:
+            self.widget.delete("1.0", f"{excess + 1}.0")
+        self.widget.see("end")
+
+
+def start_file_logging(path, max_bytes=LOG_FILE_MAX_BYTES, backups=LOG_FILE_BACKUPS,
+                       logger=None, formatter=None):
+    """Mirror ``logger`` into a rotating log file written on a background thread.
+
+    Returns the QueueListener; call ``stop()`` on it to flush and close.
+    """
+    logger = logger or logging.getLogger()
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=parse_size(max_bytes), backupCount=backups, encoding="utf-8",
+    )
+    file_handler.setFormatter(formatter or logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, file_handler)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    listener.start()
+    return listener
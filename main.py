@@ -1,7 +1,14 @@
 # main.py
-from ui import create_main_window
+import startup  # noqa: F401  (records the startup reference time first)
+import sys
+
 
 def main():
+    # Any arguments select the headless CLI, which never imports tkinter.
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+    from ui import create_main_window
     root = create_main_window()
     root.mainloop()
 
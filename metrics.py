@@ -0,0 +1,303 @@
+"""Per-job stage timings and resource usage.
+
+run_transcription times each stage with a StageRecorder and posts the
+finished JobMetrics in an events.Metrics event. Consumers (the UI, the
+CLI) feed those into a MetricsRegistry, which aggregates over jobs and
+exports JSON and Prometheus text files.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, fields
+
+from config import METRICS_FILE
+from startup import LazyModule
+
+torch = LazyModule("torch")
+
+STAGES = ["audio_decode", "vad", "model_load", "language_detect", "encoder", "decoder"]
+
+
+@dataclass
+class JobMetrics:
+    model: str = ""
+    device: str = ""
+    precision: str = ""
+    audio_seconds: float = 0.0
+    # Audio left after silence was skipped, i.e. what the model ran on.
+    speech_seconds: float = 0.0
+    audio_decode_seconds: float = 0.0
+    vad_seconds: float = 0.0
+    # Includes waiting for another job to release the pooled model.
+    model_load_seconds: float = 0.0
+    language_detect_seconds: float = 0.0
+    encoder_seconds: float = 0.0
+    decoder_seconds: float = 0.0
+    total_seconds: float = 0.0
+    segments: int = 0
+    segments_per_second: float = 0.0
+    peak_cpu_bytes: int = 0
+    # Sampled at stage and decoder-step boundaries; other jobs on the same
+    # GPU are included, since torch's peak counter is shared by the process.
+    peak_gpu_bytes: int = 0
+
+    @property
+    def skipped_fraction(self):
+        return 1.0 - self.speech_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def current_rss():
+    """Resident memory of this process in bytes, or 0 if unknown."""
+    try:
+        import psutil
+
+        return int(psutil.Process().memory_info().rss)
+    except ImportError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # Without psutil fall back to the lifetime peak (kilobytes on Linux).
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageRecorder:
+    """Collects the timings of one transcription job."""
+
+    def __init__(self, model_name, device, precision):
+        self.metrics = JobMetrics(model=model_name, device=device, precision=precision)
+        self._start = time.perf_counter()
+        self._in_language_detect = False
+        self.sample_memory()
+
+    def add(self, stage, seconds):
+        name = f"{stage}_seconds"
+        setattr(self.metrics, name, getattr(self.metrics, name) + seconds)
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+            self.sample_memory()
+
+    def sample_memory(self):
+        self.metrics.peak_cpu_bytes = max(self.metrics.peak_cpu_bytes, current_rss())
+        self.sample_gpu_memory()
+
+    def sample_gpu_memory(self):
+        if self.metrics.device == "cuda":
+            self.metrics.peak_gpu_bytes = max(self.metrics.peak_gpu_bytes, torch.cuda.memory_allocated())
+
+    @contextmanager
+    def instrument(self, model):
+        """Time the encoder, decoder and language detection of ``model``.
+
+        Forward hooks are removed again on exit. On CUDA the hooks record
+        timing events on the stream instead of waiting for the device, and
+        the events are read once when the job is done.
+        """
+        cuda = self.metrics.device == "cuda"
+        starts = {}
+        events = []
+        handles = []
+
+        def now():
+            if not cuda:
+                return time.perf_counter()
+            event = torch.cuda.Event(enable_timing=True)
+            event.record()
+            return event
+
+        def before(stage):
+            def hook(module, inputs):
+                starts[stage] = now()
+            return hook
+
+        def after(stage):
+            def hook(module, inputs, output):
+                if self._in_language_detect or stage not in starts:
+                    return
+                start, end = starts.pop(stage), now()
+                if cuda:
+                    events.append((stage, start, end))
+                    self.sample_gpu_memory()
+                else:
+                    self.add(stage, end - start)
+            return hook
+
+        for stage in ("encoder", "decoder"):
+            module = getattr(model, stage, None)
+            if module is None or not hasattr(module, "register_forward_hook"):
+                continue
+            handles.append(module.register_forward_pre_hook(before(stage)))
+            handles.append(module.register_forward_hook(after(stage)))
+
+        detect = getattr(model, "detect_language", None)
+        if detect is not None:
+            def timed_detect(*args, **kwargs):
+                self._in_language_detect = True
+                try:
+                    with self.stage("language_detect"):
+                        return detect(*args, **kwargs)
+                finally:
+                    self._in_language_detect = False
+
+            model.detect_language = timed_detect
+        try:
+            yield
+        finally:
+            for handle in handles:
+                handle.remove()
+            if detect is not None:
+                # Drop the instance attribute so the class method shows again.
+                del model.detect_language
+            if events:
+                events[-1][2].synchronize()
+                for stage, start, end in events:
+                    self.add(stage, start.elapsed_time(end) / 1000)
+
+    def finish(self, segments, audio_seconds, speech_seconds=None):
+        m = self.metrics
+        m.total_seconds = time.perf_counter() - self._start
+        m.segments = segments
+        m.audio_seconds = audio_seconds
+        m.speech_seconds = audio_seconds if speech_seconds is None else speech_seconds
+        m.segments_per_second = segments / m.total_seconds if m.total_seconds else 0.0
+        self.sample_memory()
+        return m
+
+
+_SUMMED = [f.name for f in fields(JobMetrics)
+           if f.type in (float, int) and not f.name.startswith("peak_")
+           and f.name != "segments_per_second"]
+_PEAKS = ["peak_cpu_bytes", "peak_gpu_bytes"]
+
+
+class MetricsRegistry:
+    """Aggregates JobMetrics over every job of the session."""
+
+    def __init__(self, path=METRICS_FILE, sampler=None):
+        self.path = path
+        # Optional system_monitor.SystemSampler whose history is exported too.
+        self.sampler = sampler
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.totals = dict.fromkeys(_SUMMED, 0.0)
+        self.peaks = dict.fromkeys(_PEAKS, 0)
+        self.last = None
+
+    def record(self, metrics):
+        with self._lock:
+            self.jobs += 1
+            for name in _SUMMED:
+                self.totals[name] += getattr(metrics, name)
+            for name in _PEAKS:
+                self.peaks[name] = max(self.peaks[name], getattr(metrics, name))
+            self.last = metrics
+
+    def summary(self):
+        with self._lock:
+            totals = dict(self.totals)
+            busy = totals["total_seconds"]
+            summary = {
+                "jobs": self.jobs,
+                "totals": totals,
+                "peaks": dict(self.peaks),
+                "segments_per_second": totals["segments"] / busy if busy else 0.0,
+                "last": self.last.to_dict() if self.last else None,
+            }
+        if self.sampler is not None:
+            summary["system"] = self.sampler.summary()
+        return summary
+
+    def to_prometheus(self):
+        s = self.summary()
+        t = s["totals"]
+        lines = [
+            "# HELP whisper_gui_jobs_total Finished transcription jobs.",
+            "# TYPE whisper_gui_jobs_total counter",
+            f"whisper_gui_jobs_total {s['jobs']}",
+            "# HELP whisper_gui_stage_seconds_total Time spent per pipeline stage.",
+            "# TYPE whisper_gui_stage_seconds_total counter",
+        ]
+        for stage in STAGES:
+            lines.append(f'whisper_gui_stage_seconds_total{{stage="{stage}"}} {t[stage + "_seconds"]}')
+        lines += [
+            "# HELP whisper_gui_job_seconds_total Wall time of all jobs.",
+            "# TYPE whisper_gui_job_seconds_total counter",
+            f"whisper_gui_job_seconds_total {t['total_seconds']}",
+            "# HELP whisper_gui_audio_seconds_total Audio transcribed.",
+            "# TYPE whisper_gui_audio_seconds_total counter",
+            f"whisper_gui_audio_seconds_total {t['audio_seconds']}",
+            "# HELP whisper_gui_speech_seconds_total Audio the model ran on after skipping silence.",
+            "# TYPE whisper_gui_speech_seconds_total counter",
+            f"whisper_gui_speech_seconds_total {t['speech_seconds']}",
+            "# HELP whisper_gui_segments_total Segments produced.",
+            "# TYPE whisper_gui_segments_total counter",
+            f"whisper_gui_segments_total {t['segments']:g}",
+            "# HELP whisper_gui_peak_memory_bytes Highest memory use seen in a job.",
+            "# TYPE whisper_gui_peak_memory_bytes gauge",
+            f'whisper_gui_peak_memory_bytes{{kind="cpu"}} {s["peaks"]["peak_cpu_bytes"]}',
+            f'whisper_gui_peak_memory_bytes{{kind="gpu"}} {s["peaks"]["peak_gpu_bytes"]}',
+        ]
+        latest = (s.get("system") or {}).get("latest")
+        if latest:
+            lines += [
+                "# HELP whisper_gui_system_usage_percent Latest sampled system usage.",
+                "# TYPE whisper_gui_system_usage_percent gauge",
+            ]
+            for name in ("cpu_percent", "ram_percent", "gpu_load"):
+                if latest[name] is not None:
+                    resource = name.split("_")[0]
+                    lines.append(f'whisper_gui_system_usage_percent{{resource="{resource}"}} {latest[name]}')
+            lines += [
+                "# HELP whisper_gui_process_rss_bytes Resident memory per watched process.",
+                "# TYPE whisper_gui_process_rss_bytes gauge",
+            ]
+            for proc in latest["processes"]:
+                lines.append(f'whisper_gui_process_rss_bytes{{process="{proc["label"]}",pid="{proc["pid"]}"}} {proc["rss"]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        """Write ``path`` (JSON) and a Prometheus ``.prom`` file next to it."""
+        path = path or self.path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        prom_path = os.path.splitext(path)[0] + ".prom"
+        for target, text in ((path, json.dumps(self.summary(), indent=2)), (prom_path, self.to_prometheus())):
+            tmp_path = target + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, target)
+        return path, prom_path
+
+
+def format_metrics(m):
+    """One-line summary of a job's stages for the log and the UI panel."""
+    return (
+        f"decode {m.audio_decode_seconds:.2f}s | silence skipped {m.skipped_fraction:.0%} | "
+        f"load {m.model_load_seconds:.2f}s | "
+        f"lang {m.language_detect_seconds:.2f}s | enc {m.encoder_seconds:.2f}s | "
+        f"dec {m.decoder_seconds:.2f}s | {m.segments_per_second:.1f} seg/s | "
+        f"RAM {m.peak_cpu_bytes / 2**30:.2f}GB | GPU {m.peak_gpu_bytes / 2**30:.2f}GB"
+    )
+
+
+_registry = None
+
+
+def get_metrics():
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
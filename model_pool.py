@@ -0,0 +1,352 @@
+import gc
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import MODEL_FOLDER, MODEL_REQUIREMENTS, MODEL_POOL_BUDGET, MODEL_MMAP
+
+_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+# Share of the FP32 footprint a model keeps at the given precision. Whisper
+# casts weights per call for FP16, so only int8 actually shrinks the model.
+PRECISION_FACTORS = {"fp32": 1.0, "fp16": 1.0, "int8": 0.5}
+
+
+def parse_size(text):
+    """Convert a size string such as '152MB' or '2.9GB' to bytes."""
+    if isinstance(text, (int, float)):
+        return int(text)
+    value = str(text).strip().upper().rstrip("+")
+    for unit, factor in _UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[: -len(unit)]) * factor)
+    return int(float(value))
+
+
+def model_size_bytes(model_name, precision="fp32"):
+    """Estimated resident size of a model, taken from MODEL_REQUIREMENTS."""
+    size = MODEL_REQUIREMENTS.get(model_name, {}).get("size")
+    if size is None:
+        return 0
+    return int(parse_size(size) * PRECISION_FACTORS.get(precision, 1.0))
+
+
+def int8_cache_path(model_name):
+    """Location of the cached int8 model, next to the downloaded checkpoint."""
+    return os.path.join(MODEL_FOLDER, f"{model_name}.int8")
+
+
+def load_int8_model(model_name):
+    """Load a CPU model whose linear layers are dynamically quantized to int8.
+
+    The quantized model is saved next to the original checkpoint, so the
+    quantization cost is paid only once.
+    """
+    import torch
+    import whisper
+
+    path = int8_cache_path(model_name)
+    if os.path.isfile(path):
+        return torch.load(path, map_location="cpu", weights_only=False)
+
+    model = whisper.load_model(model_name, device="cpu", download_root=MODEL_FOLDER)
+    # Whisper subclasses nn.Linear only to cast weights per call; the
+    # quantizer matches exact types, so expose them as plain linear layers.
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    tmp_path = path + ".tmp"
+    torch.save(model, tmp_path)
+    os.replace(tmp_path, path)
+    return model
+
+
+def mapped_path(model_name, fp16=False):
+    """Location of the memory-mappable copy written by convert_model."""
+    return os.path.join(MODEL_FOLDER, f"{model_name}{'.fp16' if fp16 else ''}.mmap")
+
+
+def _source_checkpoint(model_name):
+    """(path, expected SHA-256) of the downloaded checkpoint."""
+    import downloader
+
+    url = downloader.MODEL_URLS.get(model_name)
+    if url is None:
+        return os.path.join(MODEL_FOLDER, f"{model_name}.pt"), None
+    return downloader.model_path(model_name), downloader.expected_sha256(url)
+
+
+def convert_model(model_name, fp16=False):
+    """Rewrite a downloaded checkpoint as a memory-mappable file.
+
+    whisper.load_model reads the whole checkpoint and copies it into a newly
+    built FP32 model. The converted file stores the tensors already in the
+    dtype the model runs with, so load_mapped_model can use the mapped pages
+    as the parameters themselves. Processes loading the same file share
+    those pages through the OS page cache.
+    """
+    import torch
+
+    source, sha256 = _source_checkpoint(model_name)
+    checkpoint = torch.load(source, map_location="cpu", weights_only=True)
+    dtype = torch.float16 if fp16 else torch.float32
+    state = {
+        name: (tensor.to(dtype) if tensor.is_floating_point() else tensor).contiguous()
+        for name, tensor in checkpoint["model_state_dict"].items()
+    }
+    path = mapped_path(model_name, fp16)
+    tmp_path = path + ".tmp"
+    torch.save({"dims": checkpoint["dims"], "model_state_dict": state, "source_sha256": sha256}, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _meta_whisper(dims):
+    """A Whisper model whose parameters and buffers are all meta tensors.
+
+    Whisper.__init__ builds its default alignment heads with to_sparse(),
+    which has no meta kernel, so the model is assembled from its parts.
+    """
+    import torch
+    from whisper.model import AudioEncoder, TextDecoder, Whisper
+
+    model = Whisper.__new__(Whisper)
+    torch.nn.Module.__init__(model)
+    model.dims = dims
+    with torch.device("meta"):
+        model.encoder = AudioEncoder(dims.n_mels, dims.n_audio_ctx, dims.n_audio_state,
+                                     dims.n_audio_head, dims.n_audio_layer)
+        model.decoder = TextDecoder(dims.n_vocab, dims.n_text_ctx, dims.n_text_state,
+                                    dims.n_text_head, dims.n_text_layer)
+    return model
+
+
+def _set_alignment_heads(model, model_name):
+    import torch
+    import whisper
+
+    heads = getattr(whisper, "_ALIGNMENT_HEADS", {}).get(model_name)
+    if heads is not None:
+        model.set_alignment_heads(heads)
+        return
+    # Whisper's default: every head of the last half of the decoder layers.
+    dims = model.dims
+    all_heads = torch.zeros(dims.n_text_layer, dims.n_text_head, dtype=torch.bool)
+    all_heads[dims.n_text_layer // 2:] = True
+    model.register_buffer("alignment_heads", all_heads.to_sparse(), persistent=False)
+
+
+def load_mapped_model(model_name, device, fp16=False):
+    """Build a Whisper model on weights mapped lazily from a converted file.
+
+    Returns None when there is no converted file or it was made from another
+    checkpoint than the one downloaded now.
+    """
+    path = mapped_path(model_name, fp16)
+    if not os.path.isfile(path):
+        return None
+    import torch
+    from whisper.model import ModelDimensions, Whisper
+
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    _, sha256 = _source_checkpoint(model_name)
+    if sha256 is not None and checkpoint.get("source_sha256") != sha256:
+        return None
+    dims = ModelDimensions(**checkpoint["dims"])
+    try:
+        # Skip allocating and initializing weights that are replaced anyway.
+        model = _meta_whisper(dims)
+    except (RuntimeError, TypeError):
+        # A layer op without a meta kernel, or changed Whisper internals.
+        model = Whisper(dims)
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    # Non-persistent buffers are not in the checkpoint, so they are still
+    # meta tensors: the decoder's causal mask and the alignment heads.
+    n_ctx = dims.n_text_ctx
+    mask = torch.empty(n_ctx, n_ctx).fill_(float("-inf")).triu_(1)
+    model.decoder.register_buffer("mask", mask, persistent=False)
+    _set_alignment_heads(model, model_name)
+    if any(t.is_meta for t in [*model.parameters(), *model.buffers()]):
+        # A Whisper version with more of them: build the model for real.
+        model = Whisper(dims)
+        model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+        _set_alignment_heads(model, model_name)
+    return model if device == "cpu" else model.to(device)
+
+
+def measure_load(model_name, mapped=False, fp16=False):
+    """Load time and resident memory growth of one CPU model load."""
+    from metrics import current_rss
+
+    rss_before = current_rss()
+    start = time.perf_counter()
+    if mapped:
+        model = load_mapped_model(model_name, "cpu", fp16)
+    else:
+        import whisper
+
+        model = whisper.load_model(model_name, device="cpu", download_root=MODEL_FOLDER)
+    seconds = time.perf_counter() - start
+    if model is None:
+        raise FileNotFoundError(mapped_path(model_name, fp16))
+    return {"mapped": mapped, "fp16": fp16, "load_seconds": round(seconds, 3),
+            "rss_bytes": current_rss() - rss_before}
+
+
+def measure_load_isolated(model_name, mapped=False, fp16=False, timeout=600):
+    """measure_load in a fresh interpreter, so earlier loads do not skew RSS."""
+    code = ("import json, model_pool; "
+            f"print(json.dumps(model_pool.measure_load({model_name!r}, mapped={mapped!r}, fp16={fp16!r})))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, timeout=timeout, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _load_whisper(model_name, device, precision):
+    if precision == "int8":
+        return load_int8_model(model_name)
+
+    if MODEL_MMAP:
+        # The FP16 copy is only used where the model also runs in FP16.
+        variants = [True, False] if precision == "fp16" and device != "cpu" else [False]
+        for fp16 in variants:
+            model = load_mapped_model(model_name, device, fp16)
+            if model is not None:
+                return model
+
+    import whisper
+
+    return whisper.load_model(model_name, device=device, download_root=MODEL_FOLDER)
+
+
+class ModelPool:
+    """Keeps loaded models resident between jobs.
+
+    Models are keyed by (model name, device, precision). When the summed
+    size of the resident models exceeds the budget, the least recently used
+    ones are released first.
+    """
+
+    def __init__(self, budget=MODEL_POOL_BUDGET, loader=None, sizer=None):
+        self.budget = parse_size(budget)
+        self._loader = loader or _load_whisper
+        self._sizer = sizer or model_size_bytes
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._use_locks = {}
+
+    def get(self, model_name, device, precision="fp32"):
+        """Return a loaded model, loading it only when it is not resident."""
+        key = (model_name, device, precision)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+            size = self._sizer(model_name, precision)
+            self._make_room(size)
+            model = self._loader(model_name, device, precision)
+            with self._lock:
+                self._models[key] = (model, size)
+            self._make_room(0)
+            return model
+
+    @contextmanager
+    def using(self, model_name, device, precision="fp32"):
+        """Borrow a model for exclusive use.
+
+        Whisper installs per-call hooks on the model while decoding, so two
+        jobs must not run the same instance at once. Jobs on different models
+        still run in parallel.
+        """
+        key = (model_name, device, precision)
+        with self._lock:
+            use_lock = self._use_locks.setdefault(key, threading.Lock())
+        with use_lock:
+            yield self.get(model_name, device, precision)
+
+    def contains(self, model_name, device, precision="fp32"):
+        with self._lock:
+            return (model_name, device, precision) in self._models
+
+    def keys(self):
+        """Resident keys, least recently used first."""
+        with self._lock:
+            return list(self._models.keys())
+
+    @property
+    def usage(self):
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def evict(self, model_name, device=None, precision=None):
+        """Release every resident model matching the given fields."""
+        with self._lock:
+            keys = [
+                k for k in self._models
+                if k[0] == model_name
+                and (device is None or k[1] == device)
+                and (precision is None or k[2] == precision)
+            ]
+            removed = [(k, self._models.pop(k)[0]) for k in keys]
+        self._release(removed)
+
+    def clear(self):
+        with self._lock:
+            removed = [(k, m) for k, (m, _) in self._models.items()]
+            self._models.clear()
+        self._release(removed)
+
+    def _make_room(self, incoming):
+        removed = []
+        with self._lock:
+            total = sum(size for _, size in self._models.values())
+            # The newest entry is never evicted to make room for itself.
+            while self._models and total + incoming > self.budget:
+                if incoming == 0 and len(self._models) == 1:
+                    break
+                key, (model, size) = self._models.popitem(last=False)
+                total -= size
+                removed.append((key, model))
+        self._release(removed)
+
+    @staticmethod
+    def _release(removed):
+        if not removed:
+            return
+        uses_cuda = any(key[1] == "cuda" for key, _ in removed)
+        removed.clear()
+        gc.collect()
+        if uses_cuda:
+            try:
+                import torch
+
+                torch.cuda.empty_cache()
+            except Exception:
+                pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide model pool shared by every transcription job."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ModelPool()
+        return _pool
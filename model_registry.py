@@ -0,0 +1,222 @@
+"""Persistent index of the models in MODEL_FOLDER.
+
+The registry remembers, per model, the checkpoint's size and modification
+time, its SHA-256 once verified, which converted variants exist next to
+it, when and how it was last used and how long it took to load. Listing
+installed models only stats the folder's files; nothing is hashed or
+loaded for it. At startup the most recently used model can be loaded into
+the model pool in the background.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from config import MODEL_FOLDER
+
+REGISTRY_FILE = "models.json"
+CHECKPOINT_SUFFIXES = (".pt", ".bin")
+
+# Suffix of each converted file written next to a checkpoint.
+VARIANT_SUFFIXES = {"int8": ".int8", "mmap": ".mmap", "mmap-fp16": ".fp16.mmap"}
+
+
+def checkpoint_name(model_name):
+    """Registry key of ``model_name``; aliases like "large" share another model's file."""
+    from downloader import MODEL_URLS
+
+    url = MODEL_URLS.get(model_name)
+    return os.path.splitext(os.path.basename(url))[0] if url else model_name
+
+
+class ModelRegistry:
+    def __init__(self, folder=MODEL_FOLDER):
+        self.folder = folder
+        self.path = os.path.join(folder, REGISTRY_FILE)
+        self._lock = threading.Lock()
+        self._models = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("models", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        os.makedirs(self.folder, exist_ok=True)
+        # A temporary file of its own, so processes writing at the same
+        # time do not replace each other's half-written files.
+        fd, tmp_path = tempfile.mkstemp(prefix=REGISTRY_FILE + ".", suffix=".tmp", dir=self.folder)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "models": self._models}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def refresh(self):
+        """Bring the index in line with the folder; returns the installed names."""
+        try:
+            names = sorted(os.listdir(self.folder))
+        except OSError:
+            names = []
+        files = set(names)
+        found = {}
+        for fname in names:
+            base, ext = os.path.splitext(fname)
+            if ext in CHECKPOINT_SUFFIXES:
+                try:
+                    stat = os.stat(os.path.join(self.folder, fname))
+                except OSError:
+                    continue
+                found[base] = (fname, stat)
+        with self._lock:
+            changed = False
+            for name in list(self._models):
+                if name not in found:
+                    del self._models[name]
+                    changed = True
+            for name, (fname, stat) in found.items():
+                entry = self._models.get(name)
+                if entry is None or entry["file"] != fname or entry["size"] != stat.st_size \
+                        or entry["mtime_ns"] != stat.st_mtime_ns:
+                    # New or replaced checkpoint: its hash and load times are unknown.
+                    entry = {"file": fname, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                             "sha256": None, "variants": [], "last_used": None, "device": None,
+                             "precision": None, "load_seconds": {}}
+                    self._models[name] = entry
+                    changed = True
+                variants = ["fp32"] + [v for v, suffix in VARIANT_SUFFIXES.items() if name + suffix in files]
+                if entry["variants"] != variants:
+                    entry["variants"] = variants
+                    changed = True
+            if changed:
+                self._write()
+            return sorted(self._models)
+
+    def installed(self):
+        return self.refresh()
+
+    def get(self, model_name):
+        with self._lock:
+            entry = self._models.get(model_name)
+            return dict(entry) if entry else None
+
+    def entries(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._models.items()}
+
+    def record_download(self, path, sha256):
+        """Store the hash a downloaded checkpoint was verified against."""
+        stat = os.stat(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        self.refresh()
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                entry["sha256"] = sha256
+                self._write()
+
+    def verify(self, model_name, expected=None):
+        """Hash the checkpoint, store the hash and compare it with ``expected``.
+
+        Returns None when there is nothing to compare against.
+        """
+        from result_cache import hash_file
+
+        self.refresh()
+        with self._lock:
+            entry = self._models.get(model_name)
+        if entry is None:
+            raise KeyError(model_name)
+        sha256 = hash_file(os.path.join(self.folder, entry["file"]))
+        with self._lock:
+            entry["sha256"] = sha256
+            self._write()
+        return None if expected is None else sha256 == expected
+
+    def record_use(self, model_name, device, precision, load_seconds=None):
+        """Note a job's use of a model and, if it was loaded for it, the load time.
+
+        This is bookkeeping only: a failure to save it is logged, never
+        raised into the job.
+        """
+        key = checkpoint_name(model_name)
+        try:
+            with self._lock:
+                entry = self._models.get(key)
+            if entry is None:
+                self.refresh()
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is None:
+                    return
+                entry["last_used"] = time.time()
+                # The name the job asked for, so preloading fills the same pool slot.
+                entry["used_as"] = model_name
+                entry["device"] = device
+                entry["precision"] = precision
+                if load_seconds is not None:
+                    entry["load_seconds"][f"{device}/{precision}"] = round(load_seconds, 3)
+                self._write()
+        except OSError as e:
+            logging.info(f"Model registry update failed: {e}")
+
+    def last_used(self):
+        """(model, device, precision) of the most recently used installed model."""
+        used = [(entry["last_used"], name, entry) for name, entry in self.entries().items() if entry["last_used"]]
+        if not used:
+            return None
+        _, name, entry = max(used)
+        return entry.get("used_as") or name, entry["device"], entry["precision"]
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(folder=MODEL_FOLDER):
+    """The registry of ``folder``, shared by everything in this process."""
+    with _registries_lock:
+        if folder not in _registries:
+            _registries[folder] = ModelRegistry(folder)
+        return _registries[folder]
+
+
+def preload_last_used(registry=None, pool=None, gpu_available=False):
+    """Load the last used model into the pool on a daemon thread.
+
+    Returns (model, device, precision) of the model being loaded, or None
+    when there is nothing to preload.
+    """
+    registry = registry or get_registry()
+    last = registry.last_used()
+    if last is None:
+        return None
+    model_name, device, precision = last
+    if device == "cuda" and not gpu_available:
+        return None
+    if pool is None:
+        from model_pool import get_pool
+
+        pool = get_pool()
+
+    def run():
+        start = time.perf_counter()
+        try:
+            pool.get(model_name, device, precision)
+        except Exception as e:
+            logging.info(f"Preloading {model_name} failed: {e}")
+            return
+        registry.record_use(model_name, device, precision, time.perf_counter() - start)
+
+    threading.Thread(target=run, name="model-preload", daemon=True).start()
+    return last
@@ -0,0 +1,404 @@
+"""Multi-process transcription.
+
+Each worker process loads its own copy of the model and is handed one file
+at a time by the parent. Audio is decoded once in the parent and handed to the
+workers through shared memory instead of being pickled. Worker messages are
+forwarded to the regular UI/CLI queue.
+"""
+import collections
+import importlib
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+from config import PROCESS_WORKERS
+from events import Event, Result, Warn, Error, Stopped
+from language import language_for
+from system_monitor import watch_process, unwatch_process
+from model_pool import model_size_bytes, parse_size
+
+# Memory a worker needs beyond the model weights (activations, audio windows).
+WORKER_OVERHEAD = parse_size("512MB")
+COPY_CHUNK = 4 * 1024 * 1024
+
+
+def available_memory():
+    try:
+        import psutil
+
+        return psutil.virtual_memory().available
+    except ImportError:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+
+def default_process_count(model_name, precision="fp32"):
+    """Processes that fit both the core count and the available RAM."""
+    cores = os.cpu_count() or 1
+    per_worker = model_size_bytes(model_name, precision) + WORKER_OVERHEAD
+    by_memory = max(1, int(available_memory() // per_worker))
+    return max(1, min(cores, by_memory))
+
+
+class SharedPcm:
+    """16 kHz int16 PCM living in a shared memory block.
+
+    Behaves like audio_cache.PcmAudio: slicing returns float32 samples.
+    """
+
+    def __init__(self, buffer, audio_hash=None):
+        self._pcm = buffer.cast("h")
+        self.audio_hash = audio_hash
+
+    def __len__(self):
+        return len(self._pcm)
+
+    def __getitem__(self, index):
+        import numpy as np
+
+        return np.frombuffer(self._pcm[index], dtype=np.int16).astype(np.float32) / 32768.0
+
+    def release(self):
+        self._pcm.release()
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching also registers the block with the
+        # resource tracker, which would unlink it when this worker exits.
+        from multiprocessing import resource_tracker
+
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _resolve(runner):
+    module_name, func_name = runner.split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+class _ResultPipe:
+    """A worker's own channel back to the parent.
+
+    Each worker writes to a separate pipe, so one that dies mid-message
+    cannot leave a shared queue locked for the others; the parent sees the
+    pipe close instead.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def put(self, item):
+        with self._lock:
+            self._conn.send(item)
+
+
+class _ResultQueue:
+    """Stamps a job's events with its id on the way back to the parent.
+
+    ``(job_id, None)`` tells the parent the job is finished.
+    """
+
+    def __init__(self, results, job_id):
+        self._results = results
+        self._job_id = job_id
+
+    def put(self, msg):
+        if isinstance(msg, Event) and msg.job_id is None:
+            msg.job_id = self._job_id
+        self._results.put((self._job_id, msg))
+
+
+def _worker_main(runner, model_name, device, precision, threads, stream, tasks, conn, stop_evt):
+    run = _resolve(runner)
+    results = _ResultPipe(conn)
+    while True:
+        try:
+            task = tasks.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        job_id, path, shm_name, length, audio_hash, language = task
+        shm = _attach(shm_name)
+        # The block may be larger than requested (it is rounded up to whole
+        # pages on some platforms), so only the copied bytes are audio.
+        audio = SharedPcm(shm.buf[:length - length % 2], audio_hash)
+        options = {"language": language} if language else {}
+        if threads:
+            # The cores are split between the worker processes.
+            options["threads"] = threads
+        try:
+            run(_ResultQueue(results, job_id), stop_evt, model_name, path, device, precision,
+                stream=stream, audio=audio, **options)
+        except Exception as e:
+            results.put((job_id, Error(str(e), job_id=job_id)))
+        finally:
+            audio.release()
+            shm.close()
+            results.put((job_id, None))
+
+
+class ProcessPool:
+    """Shards files across worker processes that each hold a loaded model.
+
+    Events from the workers are put on ``q`` unchanged, so the UI and CLI
+    handle them like thread-mode events. ``on_finish(job_id, path, result)``
+    is called in the parent when a file is done; ``result`` is None on
+    failure or when stopped, and ``error(job_id)`` says why.
+
+    Only ``processes + 1`` files are decoded into shared memory ahead of
+    the workers, so a long file list does not fill RAM. Each file is sent
+    to an idle worker's own pipe, so the parent knows which worker holds
+    it; a job whose worker process dies fails instead of leaving ``join``
+    waiting for it.
+    """
+
+    def __init__(self, q, model_name, processes=None, device="cpu", precision=None, stream=False,
+                 runner="transcriber:run_transcription", on_finish=None, decode=None):
+        self.q = q
+        self.model_name = model_name
+        self.processes = processes or PROCESS_WORKERS or default_process_count(model_name, precision or "fp32")
+        self.device = device
+        self.precision = precision
+        self.stream = stream
+        self.runner = runner
+        self._on_finish = on_finish
+        self._decode = decode
+        self._ctx = mp.get_context("spawn")
+        # Worker result pipes by read end; failures found in the parent go
+        # through _local instead.
+        self._pipes = {}
+        self._local = queue.SimpleQueue()
+        # Task pipe of each live worker by pid, the pids waiting for a file
+        # and the decoded files waiting for a worker.
+        self._inboxes = {}
+        self._idle = []
+        self._ready = collections.deque()
+        self.stop_event = self._ctx.Event()
+        self._workers = []
+        self._decoder = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pcm-decode")
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Condition()
+        self._forwarder = None
+        self._slots = threading.Semaphore(self.processes + 1)
+        self._closing = False
+
+    def start(self):
+        threads = max(1, (os.cpu_count() or 1) // self.processes)
+        for _ in range(self.processes):
+            inbox_reader, inbox = self._ctx.Pipe(duplex=False)
+            reader, writer = self._ctx.Pipe(duplex=False)
+            proc = self._ctx.Process(
+                target=_worker_main,
+                args=(self.runner, self.model_name, self.device, self.precision, threads,
+                      self.stream, inbox_reader, writer, self.stop_event),
+                daemon=True,
+            )
+            proc.start()
+            # Only the worker holds the write end, so its exit closes the pipe.
+            writer.close()
+            inbox_reader.close()
+            watch_process(proc.pid, f"worker-{len(self._workers) + 1}")
+            self._workers.append(proc)
+            self._pipes[reader] = proc
+            with self._lock:
+                self._inboxes[proc.pid] = inbox
+                self._idle.append(proc.pid)
+        self._forwarder = threading.Thread(target=self._forward, daemon=True)
+        self._forwarder.start()
+        return self
+
+    def submit(self, path, language=None):
+        """Queue a file; its audio is decoded into shared memory first."""
+        job_id = next(self._ids)
+        with self._lock:
+            self._jobs[job_id] = {"path": path, "language": language, "shm": None, "result": None,
+                                  "error": None, "done": False, "worker": None, "slot": False}
+        self._decoder.submit(self._prepare, job_id, path)
+        return job_id
+
+    def map(self, paths, language=None):
+        """Submit every path; ``language`` is a code or ``{folder: code}``."""
+        return [self.submit(path, language_for(path, language)) for path in paths]
+
+    def _prepare(self, job_id, path):
+        # Released in _finish once the job's shared memory is freed.
+        self._slots.acquire()
+        with self._lock:
+            if self._jobs[job_id]["done"]:
+                # Failed while waiting, when every worker had died.
+                self._slots.release()
+                return
+            self._jobs[job_id]["slot"] = True
+        try:
+            if self._decode is None:
+                from audio_cache import ensure_pcm
+                from result_cache import hash_file
+
+                audio_hash = hash_file(path)
+                pcm_file = ensure_pcm(path, audio_hash)
+            else:
+                audio_hash, pcm_file = self._decode(path)
+            size = max(2, os.path.getsize(pcm_file))
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            with self._lock:
+                self._jobs[job_id]["shm"] = shm
+            with open(pcm_file, "rb") as f:
+                offset = 0
+                for chunk in iter(lambda: f.read(COPY_CHUNK), b""):
+                    shm.buf[offset:offset + len(chunk)] = chunk
+                    offset += len(chunk)
+            with self._lock:
+                job = self._jobs[job_id]
+                if self._workers and not self._inboxes:
+                    raise RuntimeError("worker process exited")
+                if not job["done"]:
+                    self._ready.append((job_id, path, shm.name, offset, audio_hash, job["language"]))
+                    self._dispatch()
+        except Exception as e:
+            self._local.put((job_id, Error(str(e), job_id=job_id)))
+            self._local.put((job_id, None))
+
+    def _dispatch(self):
+        """Send ready files to idle workers; called with the lock held."""
+        while self._ready and self._idle:
+            pid = self._idle.pop()
+            task = self._ready.popleft()
+            try:
+                self._inboxes[pid].send(task)
+            except OSError:
+                # The worker is gone; its closed result pipe removes it.
+                self._ready.appendleft(task)
+                continue
+            self._jobs[task[0]]["worker"] = pid
+
+    def _forward(self):
+        while True:
+            while not self._local.empty():
+                item = self._local.get()
+                if item is None:
+                    return
+                self._handle(*item)
+            for reader in wait(list(self._pipes), timeout=0.2):
+                try:
+                    item = reader.recv()
+                except (EOFError, OSError):
+                    self._worker_exited(self._pipes.pop(reader))
+                    reader.close()
+                    continue
+                self._handle(*item)
+
+    def _handle(self, job_id, msg):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if msg is None and job is not None and job["worker"] in self._inboxes:
+                # The worker is free for the next file.
+                self._idle.append(job["worker"])
+                self._dispatch()
+        if job is None or job["done"]:
+            return
+        if msg is None:
+            self._finish(job_id, job)
+        else:
+            if isinstance(msg, Result):
+                job["result"] = msg.result
+            elif isinstance(msg, (Error, Warn)):
+                job["error"] = msg.text
+            elif isinstance(msg, Stopped):
+                job["error"] = "stopped"
+            self.q.put(msg)
+
+    def _worker_exited(self, proc):
+        """Fail the jobs of a worker process whose pipe closed."""
+        with self._lock:
+            inbox = self._inboxes.pop(proc.pid, None)
+            if proc.pid in self._idle:
+                self._idle.remove(proc.pid)
+            if not self._inboxes:
+                # With no worker left, ready files will never be picked up.
+                self._ready.clear()
+            orphans = [(job_id, job) for job_id, job in self._jobs.items() if not job["done"]
+                       and (job["worker"] == proc.pid or not self._inboxes)]
+        if inbox is not None:
+            inbox.close()
+        if self._closing:
+            return
+        proc.join(timeout=1)
+        self.q.put(Warn(f"Worker process {proc.pid} exited with code {proc.exitcode}."))
+        for job_id, job in orphans:
+            self._fail(job_id, job)
+
+    def _fail(self, job_id, job):
+        job["result"] = None
+        job["error"] = "worker process exited"
+        self.q.put(Error(job["error"], job_id=job_id))
+        self._finish(job_id, job)
+
+    def _finish(self, job_id, job):
+        with self._lock:
+            shm, slot = job["shm"], job["slot"]
+            job["shm"], job["slot"] = None, False
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        if slot:
+            self._slots.release()
+        if self._on_finish is not None:
+            try:
+                self._on_finish(job_id, job["path"], job["result"])
+            except Exception as e:
+                # The forwarder must outlive a failing callback, or join hangs.
+                job["result"] = None
+                job["error"] = str(e)
+                self.q.put(Error(f"{job['path']}: {e}", job_id=job_id))
+        with self._lock:
+            job["done"] = True
+            self._lock.notify_all()
+
+    def error(self, job_id):
+        return self._jobs[job_id]["error"]
+
+    def join(self, timeout=None):
+        """Wait until every submitted file is finished."""
+        with self._lock:
+            return self._lock.wait_for(
+                lambda: all(job["done"] for job in self._jobs.values()), timeout
+            )
+
+    def stop(self):
+        """Ask running workers to stop after their current window."""
+        self.stop_event.set()
+
+    def shutdown(self):
+        self._decoder.shutdown(wait=True)
+        self._closing = True
+        with self._lock:
+            inboxes = list(self._inboxes.values())
+        for inbox in inboxes:
+            try:
+                inbox.send(None)
+            except OSError:
+                pass
+        for proc in self._workers:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+            unwatch_process(proc.pid)
+        self._local.put(None)
+        if self._forwarder is not None:
+            self._forwarder.join(timeout=10)
+        with self._lock:
+            leftovers = [job["shm"] for job in self._jobs.values() if job["shm"] is not None]
+        for shm in leftovers:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from config import CACHE_FOLDER, RESULT_CACHE_SIZE
+from model_pool import parse_size
+from model_registry import checkpoint_name
+
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's content.
+
+    Hashes are remembered per (path, size, mtime) so a file that is queued
+    again in the same session is not read twice.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    value = digest.hexdigest()
+    with _hash_lock:
+        _hash_memo[memo_key] = value
+    return value
+
+
+def list_files(folder, suffixes=None):
+    """(path, size, mtime) for every file below ``folder``."""
+    entries = []
+    for dirpath, _, filenames in os.walk(folder):
+        for fname in filenames:
+            if suffixes and not fname.endswith(tuple(suffixes)):
+                continue
+            path = os.path.join(dirpath, fname)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def trim_folder(folder, max_bytes, suffixes=None, keep=(), busy=None):
+    """Delete the least recently modified files until the folder fits.
+
+    Paths in ``keep``, and paths for which ``busy(path)`` is true, are never
+    deleted, even if they alone exceed the limit.
+    """
+    entries = list_files(folder, suffixes)
+    total = sum(size for _, size, _ in entries)
+    for path, size, _ in sorted(entries, key=lambda e: e[2]):
+        if total <= max_bytes:
+            break
+        if path in keep or (busy is not None and busy(path)):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+    return total
+
+
+def cache_key(audio_hash, model_name, options=None):
+    """Key for a result: audio content plus model and decoding options."""
+    payload = json.dumps(
+        {"audio": audio_hash, "model": model_name, "options": options or {}},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Transcription results stored on disk by content hash.
+
+    Entries live under ``<folder>/<model>/<key>.json`` so a model's results
+    can be dropped together. Reading an entry refreshes its modification
+    time; when the folder grows past ``max_size`` the entries read longest
+    ago are removed first.
+    """
+
+    def __init__(self, folder=None, max_size=RESULT_CACHE_SIZE):
+        self.folder = folder or os.path.join(CACHE_FOLDER, "results")
+        self.max_bytes = parse_size(max_size)
+        self._lock = threading.Lock()
+
+    def _path(self, model_name, key):
+        # Aliases share their checkpoint's folder, so invalidating either
+        # name removes the results of both.
+        return os.path.join(self.folder, checkpoint_name(model_name), f"{key}.json")
+
+    def get(self, audio_hash, model_name, options=None):
+        path = self._path(model_name, cache_key(audio_hash, model_name, options))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry.get("result")
+
+    def put(self, audio_hash, model_name, options, result):
+        key = cache_key(audio_hash, model_name, options)
+        path = self._path(model_name, key)
+        entry = {
+            "audio_hash": audio_hash,
+            "model": model_name,
+            "options": options or {},
+            "result": result,
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def invalidate(self, model_name):
+        """Remove every stored result produced by the given model."""
+        with self._lock:
+            shutil.rmtree(os.path.join(self.folder, checkpoint_name(model_name)), ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.folder, ignore_errors=True)
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        return list_files(self.folder, suffixes=(".json",))
+
+    def _evict(self):
+        trim_folder(self.folder, self.max_bytes, suffixes=(".json",))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide result cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
@@ -0,0 +1,394 @@
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+
+from config import AUDIO_EXTENSIONS, MAX_WORKERS, QUEUE_STATE_FILE, LANGUAGE_BATCH
+from events import Event, Result, Warn, Error, Stopped, JobStatus
+from language import language_for
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = {DONE, FAILED, CANCELLED}
+
+# Placeholder for a job whose language another worker is detecting.
+_DETECTING = object()
+
+
+def collect_audio_files(paths):
+    """Expand files and folders into a sorted list of audio files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                for fname in sorted(filenames):
+                    if os.path.splitext(fname)[1].lower() in AUDIO_EXTENSIONS:
+                        files.append(os.path.join(dirpath, fname))
+        elif os.path.isfile(path):
+            files.append(path)
+    return sorted(dict.fromkeys(files), key=lambda p: (os.path.dirname(p), p))
+
+
+@dataclass
+class Job:
+    path: str
+    model_name: str
+    device: str = None
+    precision: str = None
+    language: str = None
+    preview: str = None
+    priority: int = 0
+    order: int = 0
+    status: str = PENDING
+    error: str = None
+    duration: float = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    created: float = field(default_factory=time.time)
+
+    @property
+    def first_model(self):
+        """The model that decodes the file first, and so detects its language."""
+        return self.preview or self.model_name
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+class _JobQueue:
+    """Stamps a job's events with its id, forwards them and remembers the outcome."""
+
+    def __init__(self, q, job=None, on_message=None):
+        self._q = q
+        self._job = job
+        self._on_message = on_message
+        self.outcome = None
+        self.result = None
+
+    def put(self, msg):
+        if isinstance(msg, Event) and msg.job_id is None and self._job is not None:
+            msg.job_id = self._job.id
+        if self._on_message is not None:
+            self._on_message(self._job, msg)
+        if isinstance(msg, Result):
+            self.outcome = (DONE, None, msg.duration)
+            self.result = msg.result
+        elif isinstance(msg, (Error, Warn)):
+            self.outcome = (FAILED, msg.text, None)
+        elif isinstance(msg, Stopped):
+            self.outcome = (CANCELLED, None, None)
+            self.result = msg.result
+        self._q.put(msg)
+
+
+class JobScheduler:
+    """Runs queued transcription jobs on a bounded pool of worker threads.
+
+    Pending jobs are taken highest priority first, then in queue order. The
+    queue is written to ``state_file`` after every change, and jobs that were
+    pending or running when the process stopped are picked up again on the
+    next start. Workers share loaded models through the model pool.
+
+    When a worker takes a job, the next pending file is passed to
+    ``prefetch`` so its audio is decoded while the current job runs.
+
+    Jobs without a pinned language are handed to ``detector`` in batches of
+    up to ``language_batch`` (the job being started plus the next queued
+    ones with the same model), which returns ``{job_id: language}``; the
+    language is then passed to the runner so it does not detect it again.
+    ``on_message(job, msg)`` sees every message a job posts, and
+    ``on_finish(job, result)`` is called from the worker thread when a job
+    ends; ``result`` is the (possibly partial) transcription or None.
+    """
+
+    def __init__(self, q, workers=MAX_WORKERS, state_file=QUEUE_STATE_FILE, runner=None, prefetch=None,
+                 on_finish=None, on_message=None, detector=None, language_batch=LANGUAGE_BATCH):
+        if runner is None:
+            from transcriber import run_transcription as runner
+            if detector is None:
+                from language import detect_jobs as detector
+        if prefetch is None:
+            from audio_cache import prefetch
+        self.q = q
+        self.workers = max(1, int(workers))
+        self.state_file = state_file
+        self._runner = runner
+        self._prefetch = prefetch
+        self._on_finish = on_finish
+        self._on_message = on_message
+        self._detector = detector
+        self._language_batch = max(1, int(language_batch))
+        self._detected = {}
+        self._jobs = {}
+        self._stop_events = {}
+        self._cond = threading.Condition()
+        self._order = itertools.count()
+        self._threads = []
+        self._shutdown = False
+        self._load()
+
+    # -- queue management -------------------------------------------------
+
+    def add(self, path, model_name, priority=0, device=None, precision=None, language=None, preview=None):
+        """Queue one file; ``language`` is a code, "auto" or ``{folder: code}``.
+
+        With ``preview`` (a fast model name) the runner posts a draft from
+        that model before the selected one refines it.
+        """
+        job = Job(path=path, model_name=model_name, device=device, precision=precision,
+                  language=language_for(path, language), preview=preview, priority=priority,
+                  order=next(self._order))
+        with self._cond:
+            self._jobs[job.id] = job
+            self._save()
+            self._cond.notify()
+        self._post_status(job)
+        return job
+
+    def add_many(self, paths, model_name, priority=0, device=None, precision=None, language=None,
+                 preview=None):
+        """Queue every audio file found in the given files and folders."""
+        return [
+            self.add(path, model_name, priority, device, precision, language, preview)
+            for path in collect_audio_files(paths)
+        ]
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """All jobs, pending ones in the order they will run."""
+        with self._cond:
+            return sorted(self._jobs.values(), key=self._sort_key)
+
+    def pending(self):
+        return [job for job in self.jobs() if job.status == PENDING]
+
+    def active_count(self):
+        """Number of jobs waiting or running."""
+        with self._cond:
+            return sum(1 for j in self._jobs.values() if j.status in (PENDING, RUNNING))
+
+    def set_priority(self, job_id, priority):
+        with self._cond:
+            job = self._jobs[job_id]
+            job.priority = priority
+            self._save()
+            self._cond.notify()
+
+    def move(self, job_id, offset):
+        """Move a pending job up (negative offset) or down the queue."""
+        with self._cond:
+            job = self._jobs[job_id]
+            if job.status != PENDING:
+                return
+            # Moving only reorders within the job's own priority level.
+            peers = [j for j in sorted(self._jobs.values(), key=self._sort_key)
+                     if j.status == PENDING and j.priority == job.priority]
+            index = peers.index(job)
+            target = max(0, min(len(peers) - 1, index + offset))
+            if target == index:
+                return
+            orders = [j.order for j in peers]
+            peers.insert(target, peers.pop(index))
+            for peer, order in zip(peers, orders):
+                peer.order = order
+            self._save()
+
+    def cancel(self, job_id):
+        """Cancel a pending job or ask a running one to stop."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return
+            if job.status == PENDING:
+                job.status = CANCELLED
+                self._save()
+                # join() may be waiting for this job.
+                self._cond.notify_all()
+            else:
+                self._stop_events[job_id].set()
+        self._post_status(job)
+
+    def cancel_all(self):
+        for job in self.jobs():
+            self.cancel(job.id)
+
+    def clear_finished(self, job_ids=None):
+        """Forget finished jobs, or only the finished ones in ``job_ids``."""
+        with self._cond:
+            finished = [j.id for j in self._jobs.values() if j.status in FINISHED_STATUSES]
+            if job_ids is not None:
+                finished = [job_id for job_id in finished if job_id in job_ids]
+            for job_id in finished:
+                del self._jobs[job_id]
+                self._detected.pop(job_id, None)
+            self._save()
+
+    # -- workers ----------------------------------------------------------
+
+    def start(self):
+        with self._cond:
+            self._shutdown = False
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def shutdown(self, wait=True):
+        """Stop the workers after their current job; pending jobs stay queued."""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def join(self, timeout=None):
+        """Block until no job is pending or running."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(j.status in (PENDING, RUNNING) for j in self._jobs.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _next_job(self):
+        candidates = [j for j in self._jobs.values() if j.status == PENDING]
+        if not candidates:
+            return None
+        return min(candidates, key=self._sort_key)
+
+    def _language(self, job):
+        """Pinned or detected language of ``job``, detecting a batch if needed.
+
+        Called with the lock held; it is released while the detector runs.
+        """
+        if job.language or self._detector is None:
+            return job.language
+        if job.id not in self._detected:
+            batch = [job] + [
+                j for j in sorted(self._jobs.values(), key=self._sort_key)
+                if j.status == PENDING and not j.language and j.id not in self._detected
+                and (j.first_model, j.device, j.precision) == (job.first_model, job.device, job.precision)
+            ][:self._language_batch - 1]
+            for j in batch:
+                self._detected[j.id] = _DETECTING
+            found = {}
+            self._cond.release()
+            try:
+                found = self._detector(batch)
+            except Exception:
+                # Jobs left without a language detect it themselves.
+                pass
+            finally:
+                self._cond.acquire()
+                for j in batch:
+                    self._detected[j.id] = found.get(j.id)
+                self._cond.notify_all()
+        while self._detected.get(job.id) is _DETECTING:
+            self._cond.wait()
+        return self._detected.get(job.id)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and not self._shutdown:
+                    self._cond.wait()
+                    job = self._next_job()
+                if self._shutdown:
+                    return
+                job.status = RUNNING
+                stop_evt = threading.Event()
+                self._stop_events[job.id] = stop_evt
+                self._save()
+                upcoming = self._next_job()
+            self._post_status(job)
+            if upcoming is not None and self._prefetch:
+                self._prefetch(upcoming.path)
+            with self._cond:
+                language = self._language(job)
+
+            job_q = _JobQueue(self.q, job, self._on_message)
+            # Runners written before these options existed keep working
+            # for jobs that do not use them.
+            options = {"language": language} if language else {}
+            if job.preview:
+                options["preview_model"] = job.preview
+            try:
+                self._runner(job_q, stop_evt, job.model_name, job.path, job.device, job.precision, **options)
+                status, error, duration = job_q.outcome or (DONE, None, None)
+            except Exception as e:
+                status, error, duration = FAILED, str(e), None
+
+            with self._cond:
+                if stop_evt.is_set():
+                    status = CANCELLED
+                job.status = status
+                job.error = error
+                job.duration = duration
+                self._stop_events.pop(job.id, None)
+                self._detected.pop(job.id, None)
+                self._save()
+            if self._on_finish is not None:
+                try:
+                    self._on_finish(job, job_q.result)
+                except Exception as e:
+                    with self._cond:
+                        job.status, job.error = FAILED, str(e)
+                        self._save()
+            with self._cond:
+                self._cond.notify_all()
+            self._post_status(job)
+
+    # -- persistence ------------------------------------------------------
+
+    @staticmethod
+    def _sort_key(job):
+        return (-job.priority, job.order)
+
+    def _post_status(self, job):
+        self.q.put(JobStatus(job.to_dict(), job_id=job.id))
+
+    def _save(self):
+        if not self.state_file:
+            return
+        data = {"jobs": [job.to_dict() for job in self._jobs.values()]}
+        tmp_path = self.state_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    def _load(self):
+        if not self.state_file or not os.path.isfile(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in data.get("jobs", []):
+            job = Job.from_dict(item)
+            # A job interrupted by a restart runs again from the start.
+            if job.status == RUNNING:
+                job.status = PENDING
+            self._jobs[job.id] = job
+        if self._jobs:
+            self._order = itertools.count(max(j.order for j in self._jobs.values()) + 1)
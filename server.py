@@ -0,0 +1,362 @@
+"""Local HTTP transcription service.
+
+Endpoints:
+    POST   /jobs              submit {"path": ..., "model": ..., "language": ...} as
+                              JSON, or upload raw audio with ?model=...&filename=...
+    GET    /jobs              list jobs
+    GET    /jobs/<id>         job status, with the result once finished
+    GET    /jobs/<id>/stream  segments as newline-delimited JSON while decoding
+    DELETE /jobs/<id>         cancel a job
+    GET    /health            queue usage
+
+Every request shares one JobScheduler, so loaded models stay warm in the
+pool across clients. When ``max_pending`` jobs are waiting or running, new
+submissions get 429 Too Many Requests. Uploaded audio is deleted once its
+job ends, and finished jobs are forgotten ``result_ttl`` seconds later.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from config import (
+    CACHE_FOLDER,
+    MAX_WORKERS,
+    MODEL_LIST,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_MAX_PENDING,
+    SERVER_RESULT_TTL,
+)
+from scheduler import JobScheduler, FINISHED_STATUSES
+from events import JobStatus, Segment
+from language import normalize as normalize_language
+
+UPLOAD_CHUNK = 1024 * 1024
+# Same choices as the CLI's --device and --precision.
+DEVICES = ("auto", "cuda", "cpu")
+PRECISIONS = ("fp32", "fp16", "int8")
+
+
+class QueueFull(Exception):
+    pass
+
+
+def job_options(params):
+    """Validated (model, priority, device, precision, language) of a request.
+
+    Raises ValueError for anything the scheduler would only fail on later.
+    """
+    model_name = params.get("model") or "base"
+    if model_name not in MODEL_LIST:
+        raise ValueError(f"unknown model: {model_name}")
+    try:
+        priority = int(params.get("priority") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("priority must be an integer")
+    device = params.get("device") or None
+    if device is not None and device not in DEVICES:
+        raise ValueError(f"unknown device: {device}")
+    precision = params.get("precision") or None
+    if precision is not None and precision not in PRECISIONS:
+        raise ValueError(f"unknown precision: {precision}")
+    if precision == "int8" and device == "cuda":
+        raise ValueError("int8 precision is only available on the CPU")
+    language = normalize_language(params.get("language"))
+    return model_name, priority, device, precision, language
+
+
+class _JobRecord:
+    def __init__(self):
+        self.segments = []
+        self.result = None
+        self.upload = None
+        # Set once the result is stored; the scheduler marks the job
+        # finished slightly earlier, before on_finish has run.
+        self.finished_at = None
+        self.cond = threading.Condition()
+
+
+class TranscriptionService:
+    """Job bookkeeping shared by all HTTP handler threads."""
+
+    def __init__(self, workers=MAX_WORKERS, max_pending=SERVER_MAX_PENDING, runner=None,
+                 upload_folder=None, result_ttl=SERVER_RESULT_TTL):
+        self.max_pending = max_pending
+        self.upload_folder = upload_folder or os.path.join(CACHE_FOLDER, "uploads")
+        self.result_ttl = result_ttl
+        self._records = {}
+        self._lock = threading.Lock()
+        # Messages are tracked per job through on_message; only the final
+        # status updates on the scheduler's shared queue matter here.
+        self.scheduler = JobScheduler(
+            _StatusSink(self._on_status), workers=workers, state_file=None, runner=runner,
+            on_message=self._on_message, on_finish=self._on_finish,
+        )
+
+    def start(self):
+        self.scheduler.start()
+        return self
+
+    def shutdown(self):
+        self.scheduler.cancel_all()
+        self.scheduler.shutdown(wait=False)
+
+    def submit(self, path, model_name, priority=0, device=None, precision=None, language=None,
+               upload=False):
+        """Queue ``path``; with ``upload`` the file is deleted when the job ends."""
+        self.prune()
+        with self._lock:
+            if self.scheduler.active_count() >= self.max_pending:
+                raise QueueFull()
+            job = self.scheduler.add(path, model_name, priority, device, precision, language)
+        record = self._record(job.id)
+        if upload:
+            with record.cond:
+                record.upload = path
+                finished = record.finished_at is not None
+            if finished:
+                _remove(path)
+        return job
+
+    def prune(self):
+        """Forget jobs that finished more than ``result_ttl`` seconds ago."""
+        cutoff = time.monotonic() - self.result_ttl
+        with self._lock:
+            expired = {job_id for job_id, record in self._records.items()
+                       if record.finished_at is not None and record.finished_at < cutoff}
+            for job_id in expired:
+                del self._records[job_id]
+        if expired:
+            self.scheduler.clear_finished(expired)
+
+    def _record(self, job_id):
+        # A worker may post before submit() returns, so records are created
+        # by whichever side gets there first.
+        with self._lock:
+            return self._records.setdefault(job_id, _JobRecord())
+
+    def save_upload(self, stream, length, filename):
+        """Write an uploaded body to the upload folder and return its path."""
+        os.makedirs(self.upload_folder, exist_ok=True)
+        ext = os.path.splitext(filename or "")[1] or ".bin"
+        path = os.path.join(self.upload_folder, f"{uuid.uuid4().hex}{ext}")
+        remaining = length
+        with open(path, "wb") as f:
+            while remaining > 0:
+                chunk = stream.read(min(UPLOAD_CHUNK, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        return path
+
+    def status(self, job_id, timeout=5.0):
+        job = self.scheduler.get(job_id)
+        if job is None:
+            return None
+        if job.status not in FINISHED_STATUSES:
+            return job.to_dict()
+        record = self._record(job_id)
+        with record.cond:
+            # on_finish may still be storing the result (or failing the job).
+            record.cond.wait_for(lambda: record.finished_at is not None, timeout)
+            return {**job.to_dict(), "result": record.result}
+
+    def iter_segments(self, job_id, timeout=1.0):
+        """Yield a job's segments as they arrive, then its final status."""
+        record = self._record(job_id)
+        sent = 0
+        while True:
+            with record.cond:
+                while sent == len(record.segments) and not self._finished(job_id):
+                    record.cond.wait(timeout)
+                new = record.segments[sent:]
+                done = self._finished(job_id)
+            for segment in new:
+                yield {"type": "segment", **segment}
+            sent += len(new)
+            if done and sent == len(record.segments):
+                yield {"type": "status", **(self.status(job_id) or {"id": job_id})}
+                return
+
+    def _finished(self, job_id):
+        if self.scheduler.get(job_id) is None:
+            return True
+        return self._record(job_id).finished_at is not None
+
+    def _on_message(self, job, msg):
+        if isinstance(msg, Segment):
+            record = self._record(job.id)
+            with record.cond:
+                record.segments.append(msg.segment)
+                record.cond.notify_all()
+
+    def _on_finish(self, job, result):
+        record = self._record(job.id)
+        with record.cond:
+            if result is not None:
+                record.result = {k: v for k, v in result.items() if k != "streamed"}
+
+    def _on_status(self, msg):
+        # The scheduler posts a job's final status after on_finish returns,
+        # and also for jobs cancelled before they started (no on_finish).
+        if msg.job["status"] not in FINISHED_STATUSES:
+            return
+        record = self._record(msg.job_id)
+        with record.cond:
+            if record.finished_at is not None:
+                return
+            record.finished_at = time.monotonic()
+            upload = record.upload
+            record.cond.notify_all()
+        if upload:
+            _remove(upload)
+
+
+class _StatusSink:
+    def __init__(self, on_status):
+        self.on_status = on_status
+
+    def put(self, msg):
+        if isinstance(msg, JobStatus):
+            self.on_status(msg)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        parts = [p for p in parsed.path.split("/") if p]
+        return parts, parse_qs(parsed.query)
+
+    def do_GET(self):
+        parts, _ = self._route()
+        if parts == ["health"]:
+            self._send_json(200, {
+                "active": self.service.scheduler.active_count(),
+                "max_pending": self.service.max_pending,
+            })
+        elif parts == ["jobs"]:
+            self._send_json(200, {"jobs": [job.to_dict() for job in self.service.scheduler.jobs()]})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            data = self.service.status(parts[1])
+            if data is None:
+                self._send_json(404, {"error": "unknown job"})
+            else:
+                self._send_json(200, data)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "stream":
+            if self.service.status(parts[1]) is None:
+                self._send_json(404, {"error": "unknown job"})
+                return
+            self._stream(parts[1])
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _stream(self, job_id):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for item in self.service.iter_segments(job_id):
+            line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        parts, query = self._route()
+        if parts != ["jobs"]:
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        upload = not self.headers.get("Content-Type", "").startswith("application/json")
+        path = None
+        try:
+            if upload:
+                params = {k: v[0] for k, v in query.items()}
+            else:
+                params = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(params, dict):
+                    raise ValueError("request body must be a JSON object")
+            model_name, priority, device, precision, language = job_options(params)
+            if upload:
+                if self.service.scheduler.active_count() >= self.service.max_pending:
+                    raise QueueFull()
+                path = self.service.save_upload(self.rfile, length, params.get("filename"))
+            else:
+                path = params.get("path")
+                if not isinstance(path, str) or not os.path.isfile(path):
+                    self._send_json(400, {"error": "path must point to an existing file"})
+                    return
+            job = self.service.submit(path, model_name, priority, device, precision, language, upload=upload)
+        except QueueFull:
+            self._discard_upload(upload, path)
+            self._send_json(429, {"error": "queue is full"}, {"Retry-After": "5"})
+            return
+        except ValueError as e:
+            self._discard_upload(upload, path)
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+    def _discard_upload(self, upload, path):
+        if upload:
+            if path:
+                _remove(path)
+            else:
+                self.close_connection = True
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs" or self.service.status(parts[1]) is None:
+            self._send_json(404, {"error": "not found"})
+            return
+        self.service.scheduler.cancel(parts[1])
+        self._send_json(200, self.service.status(parts[1]))
+
+
+def make_server(service, host=SERVER_HOST, port=SERVER_PORT):
+    """Create (but don't start) an HTTP server bound to ``service``."""
+    handler = type("BoundRequestHandler", (RequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, workers=MAX_WORKERS, max_pending=SERVER_MAX_PENDING):
+    service = TranscriptionService(workers=workers, max_pending=max_pending).start()
+    server = make_server(service, host, port)
+    print(f"Listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
@@ -0,0 +1,75 @@
+"""Startup helpers: lazy imports, background warm-up and startup timing."""
+import importlib
+import threading
+import time
+
+# Reference point for startup timings; main.py imports this module first.
+T0 = time.perf_counter()
+marks = {}
+
+
+def mark(name):
+    """Record the first time ``name`` is reached, in seconds since T0."""
+    marks.setdefault(name, time.perf_counter() - T0)
+    return marks[name]
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self):
+        module = object.__getattribute__(self, "_module")
+        if module is None:
+            module = importlib.import_module(object.__getattribute__(self, "_name"))
+            object.__setattr__(self, "_module", module)
+        return module
+
+    @property
+    def loaded(self):
+        return object.__getattribute__(self, "_module") is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {object.__getattribute__(self, '_name')!r}>"
+
+
+class WarmUp:
+    """Imports the heavy inference libraries on a background thread.
+
+    ``gpu_available`` is filled in once torch is loaded, and the
+    'transcription_ready' mark is recorded when everything is imported.
+    """
+
+    def __init__(self, modules=("torch", "whisper")):
+        self.modules = modules
+        self.gpu_available = False
+        self.error = None
+        self._done = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            for name in self.modules:
+                importlib.import_module(name)
+            torch = importlib.import_module("torch")
+            self.gpu_available = bool(torch.cuda.is_available())
+        except Exception as e:
+            self.error = e
+        finally:
+            mark("transcription_ready")
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
@@ -0,0 +1,182 @@
+"""Background CPU, RAM, GPU and worker-process sampler.
+
+``GPUtil.getGPUs()`` shells out to nvidia-smi and psutil calls can block,
+so sampling happens on a daemon thread. Samples go into a fixed-size ring
+buffer; readers (the window, the CLI, the metrics export) only look at the
+latest sample or the recorded history and never wait for a probe.
+"""
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+
+from config import MONITOR_INTERVAL, MONITOR_HISTORY
+from startup import LazyModule
+
+psutil = LazyModule("psutil")
+GPUtil = LazyModule("GPUtil")
+
+_watched = {}
+_watched_lock = threading.Lock()
+
+
+def watch_process(pid, label):
+    """Include another process (e.g. a pool worker) in every sample."""
+    with _watched_lock:
+        _watched[pid] = label
+
+
+def unwatch_process(pid):
+    with _watched_lock:
+        _watched.pop(pid, None)
+
+
+@dataclass
+class Sample:
+    time: float
+    cpu_percent: float = None
+    ram_percent: float = None
+    ram_used: int = None
+    ram_total: int = None
+    gpu_name: str = None
+    gpu_load: float = None
+    gpu_mem_used: float = None
+    gpu_mem_total: float = None
+    processes: list = field(default_factory=list)
+    error: str = None
+
+    @property
+    def gpu_mem_percent(self):
+        if not self.gpu_mem_total:
+            return None
+        return self.gpu_mem_used / self.gpu_mem_total * 100
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class SystemSampler:
+    """Samples system load every ``interval`` seconds on a daemon thread."""
+
+    def __init__(self, interval=MONITOR_INTERVAL, history=MONITOR_HISTORY, gpu=True):
+        self.interval = interval
+        self.gpu = gpu
+        self._samples = deque(maxlen=history)
+        self._stop = threading.Event()
+        self._thread = None
+        self._process_handles = {}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._samples.append(self.sample())
+            self._stop.wait(self.interval)
+
+    def sample(self):
+        """Take one sample now, on the calling thread."""
+        s = Sample(time=time.time())
+        errors = []
+        try:
+            # Non-blocking: load since the previous call.
+            s.cpu_percent = float(psutil.cpu_percent(interval=None))
+            mem = psutil.virtual_memory()
+            s.ram_percent, s.ram_used, s.ram_total = float(mem.percent), int(mem.used), int(mem.total)
+            s.processes = self._sample_processes()
+        except Exception as e:
+            errors.append(f"psutil: {e}")
+        if self.gpu:
+            try:
+                gpus = GPUtil.getGPUs()
+                if gpus:
+                    gpu = gpus[0]
+                    s.gpu_name = str(gpu.name)
+                    s.gpu_load = float(gpu.load) * 100
+                    s.gpu_mem_used, s.gpu_mem_total = float(gpu.memoryUsed), float(gpu.memoryTotal)
+            except Exception as e:
+                # Without a driver every probe would fail the same way.
+                self.gpu = False
+                errors.append(f"GPUtil: {e}")
+        s.error = "; ".join(errors) or None
+        return s
+
+    def _sample_processes(self):
+        with _watched_lock:
+            watched = {os.getpid(): "main", **_watched}
+        for pid in list(self._process_handles):
+            if pid not in watched:
+                del self._process_handles[pid]
+        stats = []
+        for pid, label in watched.items():
+            try:
+                proc = self._process_handles.get(pid)
+                if proc is None:
+                    proc = self._process_handles[pid] = psutil.Process(pid)
+                stats.append({
+                    "pid": pid,
+                    "label": label,
+                    "cpu_percent": float(proc.cpu_percent(interval=None)),
+                    "rss": int(proc.memory_info().rss),
+                })
+            except Exception:
+                self._process_handles.pop(pid, None)
+        return stats
+
+    def latest(self):
+        try:
+            return self._samples[-1]
+        except IndexError:
+            return None
+
+    def samples(self):
+        return list(self._samples)
+
+    def history(self, name):
+        """Values of one Sample attribute over the buffer, oldest first."""
+        return [getattr(s, name) for s in list(self._samples)]
+
+    def summary(self):
+        """Latest sample plus peaks over the buffered history."""
+        samples = self.samples()
+        peaks = {}
+        for name in ("cpu_percent", "ram_percent", "gpu_load", "gpu_mem_used"):
+            values = [getattr(s, name) for s in samples if getattr(s, name) is not None]
+            peaks[name] = max(values) if values else None
+        latest = samples[-1].to_dict() if samples else None
+        return {"interval": self.interval, "samples": len(samples), "latest": latest, "peaks": peaks}
+
+
+def sparkline_points(values, width, height, max_value=100.0):
+    """Flat canvas coordinates of a polyline through ``values``.
+
+    Missing values (None) are drawn as zero. Returns an empty list when
+    there are fewer than two values.
+    """
+    values = [v or 0.0 for v in values]
+    if len(values) < 2:
+        return []
+    step = width / (len(values) - 1)
+    scale = max(max_value, max(values)) or 1.0
+    points = []
+    for i, value in enumerate(values):
+        points.append(round(i * step, 1))
+        points.append(round(height - value / scale * height, 1))
+    return points
+
+
+_sampler = None
+
+
+def get_sampler():
+    global _sampler
+    if _sampler is None:
+        _sampler = SystemSampler()
+    return _sampler
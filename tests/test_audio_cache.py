@@ -0,0 +1,107 @@
+import os
+import struct
+import threading
+
+import pytest
+
+import audio_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_cache, "CACHE_FOLDER", str(tmp_path / "cache"))
+    return tmp_path
+
+
+def fake_decoder(calls):
+    def decode(audio_file, out_path):
+        calls.append(audio_file)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, "wb") as f:
+            f.write(struct.pack("<4h", 0, 16384, -16384, 32767))
+    return decode
+
+
+def test_ensure_pcm_decodes_once_per_content(cache_dir, monkeypatch):
+    calls = []
+    monkeypatch.setattr(audio_cache, "decode_to_file", fake_decoder(calls))
+    a = cache_dir / "a.wav"
+    b = cache_dir / "copy-of-a.wav"
+    a.write_bytes(b"same audio")
+    b.write_bytes(b"same audio")
+
+    first = audio_cache.ensure_pcm(str(a))
+    second = audio_cache.ensure_pcm(str(b))
+    assert first == second
+    assert calls == [str(a)]
+
+
+def test_concurrent_requests_share_one_decode(cache_dir, monkeypatch):
+    calls = []
+    release = threading.Event()
+    decode = fake_decoder(calls)
+
+    def slow_decode(audio_file, out_path):
+        release.wait(5)
+        decode(audio_file, out_path)
+
+    monkeypatch.setattr(audio_cache, "decode_to_file", slow_decode)
+    audio = cache_dir / "a.wav"
+    audio.write_bytes(b"data")
+    threads = [threading.Thread(target=audio_cache.ensure_pcm, args=(str(audio),)) for _ in range(3)]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1
+
+
+def test_pcm_audio_slices_to_float(cache_dir, monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(audio_cache, "decode_to_file", fake_decoder([]))
+    audio_file = cache_dir / "a.wav"
+    audio_file.write_bytes(b"data")
+    audio = audio_cache.load_audio(str(audio_file))
+    assert len(audio) == 4
+    assert list(audio[0:3]) == [0.0, 0.5, -0.5]
+    assert audio[1:2].dtype.name == "float32"
+
+
+def test_prefetch_skips_missing_files(cache_dir):
+    prefetcher = audio_cache.AudioPrefetcher()
+    assert prefetcher.submit(str(cache_dir / "missing.wav")) is None
+
+
+def test_trim_spares_files_in_flight_and_mapped(cache_dir, monkeypatch):
+    monkeypatch.setattr(audio_cache, "decode_to_file", fake_decoder([]))
+    monkeypatch.setattr(audio_cache, "AUDIO_CACHE_SIZE", 1)
+    folder = audio_cache.cache_folder()
+    os.makedirs(folder)
+    for name in ["mapped.pcm", "mapped.mel80.npy", "other.pcm.tmp", "idle.pcm"]:
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(b"x" * 100)
+        os.utime(os.path.join(folder, name), (1000, 1000))
+    audio_cache._map("mapped")
+    try:
+        audio_file = cache_dir / "a.wav"
+        audio_file.write_bytes(b"data")
+        path = audio_cache.ensure_pcm(str(audio_file))
+    finally:
+        audio_cache._unmap("mapped")
+    assert sorted(os.listdir(folder)) == sorted(
+        ["mapped.pcm", "mapped.mel80.npy", "other.pcm.tmp", os.path.basename(path)])
+
+
+def test_live_pcm_audio_keeps_its_file(cache_dir, monkeypatch):
+    pytest.importorskip("numpy")
+    import gc
+
+    monkeypatch.setattr(audio_cache, "decode_to_file", fake_decoder([]))
+    audio_file = cache_dir / "a.wav"
+    audio_file.write_bytes(b"data")
+    audio = audio_cache.load_audio(str(audio_file))
+    assert audio_cache._busy(audio.path)
+    del audio
+    gc.collect()
+    assert not audio_cache._busy(audio_cache.pcm_path(audio_cache.hash_file(str(audio_file))))
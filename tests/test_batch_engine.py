@@ -0,0 +1,151 @@
+from types import SimpleNamespace
+
+import batch_engine
+
+
+class _Stack(list):
+    def to(self, device):
+        return self
+
+
+def fake_backend(monkeypatch, batches):
+    def decode(model, mels, options):
+        if any(mel[0] == "broken" for mel in mels):
+            raise RuntimeError("broken window")
+        batches.append(len(mels))
+        return [
+            SimpleNamespace(
+                text="" if mel[0] == "quiet" else f"{mel[0]}-{len(mel)}",
+                language="en", no_speech_prob=0.0, avg_logprob=0.0,
+            )
+            for mel in mels
+        ]
+
+    monkeypatch.setattr(batch_engine, "whisper", SimpleNamespace(
+        pad_or_trim=lambda audio: audio,
+        log_mel_spectrogram=lambda audio, n_mels: audio,
+        DecodingOptions=lambda **kw: kw,
+        decode=decode,
+    ))
+    monkeypatch.setattr(batch_engine, "torch", SimpleNamespace(stack=_Stack))
+    return SimpleNamespace(dims=SimpleNamespace(n_mels=80), device="cpu")
+
+
+def clip(name, seconds):
+    return [name] * int(seconds * batch_engine.SAMPLE_RATE)
+
+
+def test_split_windows_offsets():
+    windows = batch_engine.split_windows("a", clip("a", 70))
+    assert [(w.index, w.offset, w.duration) for w in windows] == [(0, 0.0, 30.0), (1, 30.0, 30.0), (2, 60.0, 10.0)]
+
+
+def test_windows_of_many_files_share_batches(monkeypatch):
+    batches = []
+    model = fake_backend(monkeypatch, batches)
+    engine = batch_engine.BatchEngine(model, batch_size=4)
+    items = [("a", clip("a", 5)), ("b", clip("b", 40)), ("c", clip("c", 3)), ("d", clip("d", 2))]
+    results = dict(engine.transcribe(items))
+
+    assert batches == [4, 1]
+    assert results["a"]["text"] == " a-80000"
+    assert results["b"]["segments"] == [
+        {"start": 0.0, "end": 30.0, "text": " b-480000"},
+        {"start": 30.0, "end": 40.0, "text": " b-160000"},
+    ]
+    assert results["b"]["audio_duration"] == 40.0
+    assert results["d"]["language"] == "en"
+
+
+def test_short_files_finish_before_long_ones(monkeypatch):
+    batches = []
+    model = fake_backend(monkeypatch, batches)
+    engine = batch_engine.BatchEngine(model, batch_size=2)
+    items = [("short", clip("short", 1)), ("long", clip("long", 90)), ("quiet", clip("quiet", 1))]
+    results = engine.transcribe(items)
+    key, _ = next(results)
+    assert key == "short"
+    assert batches == [2]
+    rest = dict(results)
+    assert list(rest) == ["long", "quiet"]
+    assert rest["quiet"]["segments"] == []
+
+
+def test_stop_event_ends_between_batches(monkeypatch):
+    batches = []
+    model = fake_backend(monkeypatch, batches)
+    engine = batch_engine.BatchEngine(model, batch_size=1)
+    stop = SimpleNamespace(is_set=lambda: len(batches) >= 1)
+    results = list(engine.transcribe([("a", clip("a", 1)), ("b", clip("b", 1))], stop))
+    assert [key for key, _ in results] == ["a"]
+
+
+def test_files_are_read_only_as_batches_reach_them(monkeypatch):
+    batches = []
+    model = fake_backend(monkeypatch, batches)
+    engine = batch_engine.BatchEngine(model, batch_size=2)
+    opened = []
+
+    def items():
+        for name in ["a", "b", "c", "d", "e"]:
+            opened.append(name)
+            yield name, clip(name, 1)
+
+    results = engine.transcribe(items())
+    assert [key for key, _ in (next(results), next(results))] == ["a", "b"]
+    assert opened == ["a", "b"]
+    assert [key for key, _ in results] == ["c", "d", "e"]
+    assert batches == [2, 2, 1]
+
+
+def test_full_windows_read_the_mel_cache(monkeypatch):
+    import audio_cache
+
+    batches = []
+    model = fake_backend(monkeypatch, batches)
+    model.dims.n_mels = 128
+    monkeypatch.setattr(batch_engine.torch, "from_numpy", lambda array: array, raising=False)
+    requested = []
+
+    class Mel:
+        def __getitem__(self, index):
+            # The length tells the test which frames were read.
+            return SimpleNamespace(astype=lambda dtype: ["cached"] * (index[1].start + 1))
+
+    def load_mel(audio, n_mels):
+        requested.append((audio.audio_hash, n_mels))
+        return Mel()
+
+    monkeypatch.setattr(audio_cache, "load_mel", load_mel)
+
+    class Pcm(list):
+        audio_hash = "abc"
+
+    engine = batch_engine.BatchEngine(model, batch_size=4, mel_cache=True)
+    result = dict(engine.transcribe([("a", Pcm(clip("a", 70)))]))["a"]
+    assert [seg["text"] for seg in result["segments"]] == [" cached-1", " cached-3001", " a-160000"]
+    assert requested == [("abc", 128), ("abc", 128)]
+
+
+def test_a_failing_file_does_not_fail_its_batch(monkeypatch):
+    batches = []
+    model = fake_backend(monkeypatch, batches)
+    pad = batch_engine.whisper.pad_or_trim
+
+    def pad_or_trim(audio):
+        if audio[0] == "corrupt":
+            raise ValueError("corrupt window")
+        return pad(audio)
+
+    monkeypatch.setattr(batch_engine.whisper, "pad_or_trim", pad_or_trim)
+    engine = batch_engine.BatchEngine(model, batch_size=4)
+    items = [("a", clip("a", 1)), ("unreadable", OSError("no such file")), ("broken", clip("broken", 1)),
+             ("corrupt", clip("corrupt", 1)), ("b", clip("b", 1)), ("c", clip("c", 1))]
+    results = dict(engine.transcribe(items))
+
+    assert str(results["unreadable"]) == "no such file"
+    assert str(results["corrupt"]) == "corrupt window"
+    assert str(results["broken"]) == "broken window"
+    assert [results[key]["text"] for key in "abc"] == [" a-16000", " b-16000", " c-16000"]
+    # The batch that failed was retried file by file.
+    assert batches == [1, 1, 1]
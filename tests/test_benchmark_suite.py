@@ -0,0 +1,21 @@
+from benchmarks import suite
+
+
+def test_stub_case_reports_all_metrics():
+    case = suite.run_case("stub", 12)
+    assert case["backend"] == "stub"
+    assert case["segments"] == 3
+    for metric in suite.METRICS:
+        assert case[metric] >= 0
+    assert case["first_segment_seconds"] <= case["rtf"] * 12
+
+
+def test_compare_flags_regressions_above_threshold():
+    def report(rtf, rss):
+        return {"cases": [{"backend": "stub", "audio_seconds": 30, "load_seconds": 0.05,
+                           "rtf": rtf, "first_segment_seconds": 0.1, "peak_rss_mb": rss}]}
+
+    rows = suite.compare(report(0.10, 100), report(0.13, 105), threshold=0.10)
+    flagged = {row["metric"] for row in rows if row["regression"]}
+    assert flagged == {"rtf"}
+    assert suite.compare(report(0.10, 100), {"cases": []}) == []
@@ -0,0 +1,140 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest import mock
+
+sys.modules.setdefault('torch', mock.MagicMock())
+sys.modules.setdefault('whisper', mock.MagicMock())
+
+import audio_cache
+import cli
+import transcriber
+from events import Result
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_cli_import_does_not_load_gui_or_monitoring_modules():
+    code = (
+        "import sys, cli; "
+        "print([m for m in ('tkinter', 'psutil', 'GPUtil', 'torch', 'whisper') if m in sys.modules])"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_write_result_json_and_txt(tmp_path):
+    result = {"text": " hello", "segments": [{"start": 0.0, "end": 1.0, "text": " hello"}], "rtf": 0.1}
+    path = cli.write_result(result, "/data/call.wav", str(tmp_path), "json", "base")
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    assert Path(path).name == "call.json"
+    assert data["model"] == "base"
+    assert data["segments"][0]["text"] == " hello"
+
+    path = cli.write_result(result, "/data/call.wav", str(tmp_path), "txt", "base")
+    assert Path(path).read_text(encoding="utf-8") == "hello\n"
+
+    path = cli.write_result(result, "/data/call.wav", str(tmp_path), "srt", "base")
+    assert Path(path).read_text(encoding="utf-8") == "1\n00:00:00,000 --> 00:00:01,000\nhello\n\n"
+
+
+def test_output_bases_keep_same_named_inputs_apart(tmp_path):
+    root = tmp_path / "in"
+    root.mkdir()
+    files = [str(root / "a" / "call.wav"), str(root / "b" / "call.wav"),
+             str(root / "call.wav"), str(root / "call.mp3")]
+    bases = cli.output_bases(files, [str(root)])
+    assert bases[files[0]] == os.path.join("a", "call")
+    assert bases[files[1]] == os.path.join("b", "call")
+    assert bases[files[2]] == "call_wav"
+    assert bases[files[3]] == "call_mp3"
+    assert len(set(bases.values())) == len(files)
+
+    result = {"text": " hi", "segments": []}
+    out = tmp_path / "out"
+    paths = {cli.write_result(result, f, str(out), "txt", "base", bases[f]) for f in files}
+    assert len(paths) == len(files)
+    assert (out / "a" / "call.txt").exists()
+
+
+def test_transcribe_command_processes_folder(tmp_path, monkeypatch, capsys):
+    audio_dir = tmp_path / "in"
+    audio_dir.mkdir()
+    (audio_dir / "a.wav").touch()
+    (audio_dir / "b.mp3").touch()
+    out_dir = tmp_path / "out"
+
+    def fake_run(q, stop_evt, model_name, audio_file, device=None, precision=None, **kwargs):
+        q.put(Result({"text": Path(audio_file).stem, "segments": []}, 0.1))
+
+    monkeypatch.setattr(transcriber, "run_transcription", fake_run)
+    monkeypatch.setattr(audio_cache, "prefetch", lambda path: None)
+    code = cli.main(["transcribe", str(audio_dir), "--model", "tiny", "--workers", "2",
+                     "--output", str(out_dir)])
+
+    assert code == 0
+    assert json.loads((out_dir / "a.json").read_text(encoding="utf-8"))["text"] == "a"
+    assert json.loads((out_dir / "b.json").read_text(encoding="utf-8"))["text"] == "b"
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(line["status"] for line in lines) == ["done", "done"]
+
+
+def test_transcribe_command_pins_languages(tmp_path, monkeypatch):
+    import language
+
+    audio_dir = tmp_path / "in"
+    (audio_dir / "ist").mkdir(parents=True)
+    (audio_dir / "ist" / "a.wav").touch()
+    (audio_dir / "b.wav").touch()
+    seen = {}
+
+    def fake_run(q, stop_evt, model_name, audio_file, device=None, precision=None, language=None, **kwargs):
+        seen[Path(audio_file).name] = language
+        q.put(Result({"text": "", "segments": []}, 0.1))
+
+    def no_detection(jobs):
+        raise AssertionError("pinned languages must not be detected")
+
+    monkeypatch.setattr(transcriber, "run_transcription", fake_run)
+    monkeypatch.setattr(language, "detect_jobs", no_detection)
+    monkeypatch.setattr(audio_cache, "prefetch", lambda path: None)
+    code = cli.main(["transcribe", str(audio_dir), "--model", "tiny", "--language", "en",
+                     "--folder-language", f"{audio_dir / 'ist'}=tr", "--output", str(tmp_path / "out")])
+
+    assert code == 0
+    assert seen == {"a.wav": "tr", "b.wav": "en"}
+
+
+def test_batched_mode_reports_each_failed_file(tmp_path, monkeypatch, capsys):
+    import batch_engine
+
+    audio_dir = tmp_path / "in"
+    audio_dir.mkdir()
+    for name in ["a.wav", "bad.wav", "c.wav"]:
+        (audio_dir / name).touch()
+
+    def fake_files(model_name, files, *args, **kwargs):
+        for path in files:
+            if path.endswith("bad.wav"):
+                yield path, RuntimeError("corrupt")
+            else:
+                yield path, {"text": Path(path).stem, "segments": []}
+
+    monkeypatch.setattr(batch_engine, "transcribe_files", fake_files)
+    code = cli.main(["transcribe", str(audio_dir), "--model", "tiny", "--batch", "4",
+                     "--output", str(tmp_path / "out")])
+
+    assert code == 1
+    lines = {Path(line["file"]).name: line for line in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert lines["bad.wav"]["error"] == "corrupt"
+    assert lines["a.wav"]["status"] == lines["c.wav"]["status"] == "done"
+
+
+def test_batched_mode_rejects_metrics(tmp_path, capsys):
+    (tmp_path / "a.wav").touch()
+    code = cli.main(["transcribe", str(tmp_path), "--batch", "--metrics", str(tmp_path / "m.json")])
+    assert code == 2
+    assert "--metrics" in capsys.readouterr().err
@@ -0,0 +1,133 @@
+import hashlib
+import http.server
+import threading
+
+import pytest
+
+import downloader
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MiB
+SHA = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serves PAYLOAD at /<sha>/model.pt and honours 'Range: bytes=N-'."""
+
+    ranges = True
+    requests = []
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        self.requests.append(header)
+        start = 0
+        if header and self.ranges:
+            start = int(header.split("=")[1].rstrip("-"))
+            if start >= len(PAYLOAD):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        else:
+            self.send_response(200)
+        body = PAYLOAD[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    RangeHandler.ranges = True
+    RangeHandler.requests = []
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/{SHA}/model.pt"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_download_reports_progress_and_verifies(server, tmp_path):
+    dest = tmp_path / "model.pt"
+    seen = []
+    assert downloader.download(server, str(dest), progress=lambda d, t: seen.append((d, t))) == str(dest)
+    assert dest.read_bytes() == PAYLOAD
+    assert seen[-1] == (len(PAYLOAD), len(PAYLOAD))
+    assert not (tmp_path / "model.pt.part").exists()
+    # A verified file is not fetched again.
+    downloader.download(server, str(dest))
+    assert len(RangeHandler.requests) == 1
+
+
+def test_partial_download_is_resumed_with_range(server, tmp_path):
+    dest = tmp_path / "model.pt"
+    (tmp_path / "model.pt.part").write_bytes(PAYLOAD[:300_000])
+    downloader.download(server, str(dest))
+    assert RangeHandler.requests == ["bytes=300000-"]
+    assert dest.read_bytes() == PAYLOAD
+
+
+def test_server_without_range_support_restarts(server, tmp_path):
+    RangeHandler.ranges = False
+    dest = tmp_path / "model.pt"
+    (tmp_path / "model.pt.part").write_bytes(b"stale bytes")
+    downloader.download(server, str(dest))
+    assert dest.read_bytes() == PAYLOAD
+
+
+def test_complete_partial_file_is_accepted_on_416(server, tmp_path):
+    dest = tmp_path / "model.pt"
+    (tmp_path / "model.pt.part").write_bytes(PAYLOAD)
+    downloader.download(server, str(dest))
+    assert dest.read_bytes() == PAYLOAD
+
+
+def test_checksum_mismatch_discards_the_file(server, tmp_path):
+    dest = tmp_path / "model.pt"
+    with pytest.raises(downloader.ChecksumError):
+        downloader.download(server, str(dest), sha256="0" * 64)
+    assert not dest.exists() and not (tmp_path / "model.pt.part").exists()
+
+
+def test_cancelled_download_keeps_partial_file(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "CHUNK_SIZE", 64 * 1024)
+    stop = threading.Event()
+    dest = tmp_path / "model.pt"
+
+    def progress(done, total):
+        if done >= 128 * 1024:
+            stop.set()
+
+    with pytest.raises(downloader.DownloadCancelled):
+        downloader.download(server, str(dest), progress=progress, stop_event=stop)
+    assert (tmp_path / "model.pt.part").stat().st_size == 128 * 1024
+    downloader.download(server, str(dest))
+    assert RangeHandler.requests[-1] == f"bytes={128 * 1024}-"
+    assert dest.read_bytes() == PAYLOAD
+
+
+def test_manager_runs_downloads_in_parallel_and_deduplicates():
+    started = threading.Barrier(3, timeout=5)
+    release = threading.Event()
+
+    def fetch(model_name, progress, stop_event):
+        started.wait()
+        release.wait(5)
+        return model_name
+
+    manager = downloader.DownloadManager(workers=2, fetch=fetch)
+    first = manager.submit("tiny")
+    assert manager.submit("tiny") is first
+    second = manager.submit("base")
+    started.wait()  # both fetches are running at the same time
+    assert sorted(manager.active()) == ["base", "tiny"]
+    release.set()
+    assert first.result(5) == "tiny" and second.result(5) == "base"
+
+
+def test_model_urls_carry_checksums():
+    assert downloader.expected_sha256(downloader.MODEL_URLS["tiny"]).startswith("65147644")
+    assert downloader.model_path("large").endswith("large-v3.pt")
@@ -0,0 +1,81 @@
+import threading
+
+import events
+
+
+class FakeRoot:
+    """Records ``after`` calls, which tkinter accepts from any thread."""
+
+    def __init__(self):
+        self.afters = []
+        self.lock = threading.Lock()
+
+    def after(self, ms, func):
+        with self.lock:
+            self.afters.append((ms, func))
+
+    def run_afters(self):
+        with self.lock:
+            pending, self.afters = self.afters, []
+        for _, func in pending:
+            func()
+
+
+def test_pump_wakes_on_put_and_drains_in_bounded_batches():
+    q = events.EventQueue()
+    q.put(events.Log("early"))
+    root = FakeRoot()
+    seen = []
+    pump = events.EventPump(root, q, batch=3, tick_ms=5)
+    pump.on(events.Log, lambda e: seen.append(e.text))
+    pump.start()
+    root.run_afters()
+    assert seen == ["early"]
+    # Nothing is scheduled while the queue is empty.
+    assert root.afters == []
+
+    for i in range(7):
+        q.put(events.Log(str(i)))
+    # Only the first put schedules a callback.
+    assert [ms for ms, _ in root.afters] == [0]
+    root.run_afters()
+    assert seen[1:] == ["0", "1", "2"]
+    # Left-over events come back after a tick.
+    assert [ms for ms, _ in root.afters] == [5]
+    root.run_afters()
+    root.run_afters()
+    assert seen[1:] == [str(i) for i in range(7)]
+    assert root.afters == []
+
+    q.put(events.Log("late"))
+    root.run_afters()
+    assert seen[-1] == "late"
+
+
+def test_pump_dispatches_by_type_with_fallback():
+    q = events.EventQueue()
+    root = FakeRoot()
+    results, other = [], []
+    pump = events.EventPump(root, q).on(events.Result, results.append).otherwise(other.append)
+    pump.start()
+    q.put(events.Result({"text": "x"}, 1.0, job_id="job1"))
+    q.put("plain message")
+    root.run_afters()
+    assert results[0].job_id == "job1" and results[0].duration == 1.0
+    assert other == ["plain message"]
+
+
+def test_events_from_many_threads_are_all_delivered():
+    q = events.EventQueue()
+    root = FakeRoot()
+    seen = []
+    events.EventPump(root, q, batch=50).on(events.Log, seen.append).start()
+    threads = [threading.Thread(target=lambda: [q.put(events.Log("x")) for _ in range(100)])
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    while len(seen) < 400:
+        root.run_afters()
+    assert len(seen) == 400
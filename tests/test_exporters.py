@@ -0,0 +1,71 @@
+import json
+import sys
+import threading
+from unittest import mock
+
+import pytest
+
+import exporters
+from exporters import ExportSession, export_segments
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.5, "text": " Hello there."},
+    {"start": 1.5, "end": 2.0, "text": "  "},
+    {"start": 3661.25, "end": 3662.0, "text": " General --> Kenobi"},
+]
+
+
+def export(tmp_path, formats):
+    done = threading.Event()
+    session = export_segments(SEGMENTS, str(tmp_path / "out" / "talk"), formats, on_done=lambda s: done.set())
+    assert done.wait(10)
+    return session
+
+
+def test_subtitle_and_table_formats(tmp_path):
+    session = export(tmp_path, ["srt", "vtt", "tsv", "txt", "json"])
+    assert session.errors == {}
+    out = tmp_path / "out"
+    assert (out / "talk.srt").read_text(encoding="utf-8") == (
+        "1\n00:00:00,000 --> 00:00:01,500\nHello there.\n\n"
+        "2\n01:01:01,250 --> 01:01:02,000\nGeneral -> Kenobi\n\n"
+    )
+    assert (out / "talk.vtt").read_text(encoding="utf-8") == (
+        "WEBVTT\n\n00:00:00.000 --> 00:00:01.500\nHello there.\n\n"
+        "01:01:01.250 --> 01:01:02.000\nGeneral -> Kenobi\n\n"
+    )
+    assert (out / "talk.tsv").read_text(encoding="utf-8").splitlines() == [
+        "start\tend\ttext", "0\t1500\tHello there.", "3661250\t3662000\tGeneral --> Kenobi"]
+    assert (out / "talk.txt").read_text(encoding="utf-8") == "Hello there.\nGeneral --> Kenobi\n"
+    data = json.loads((out / "talk.json").read_text(encoding="utf-8"))
+    assert len(data["segments"]) == 3
+    assert data["text"] == "Hello there.   General --> Kenobi"
+    assert session.paths["srt"] == str(out / "talk.srt")
+
+
+def test_live_session_flushes_while_segments_arrive(tmp_path):
+    session = ExportSession(str(tmp_path / "live"), ["srt"])
+    session.add(SEGMENTS[0])
+    srt = tmp_path / "live.srt"
+    for _ in range(500):
+        if srt.exists() and srt.read_text(encoding="utf-8"):
+            break
+        threading.Event().wait(0.01)
+    assert srt.read_text(encoding="utf-8").startswith("1\n00:00:00,000")
+    session.add(SEGMENTS[2])
+    session.close()
+    assert session.wait(10)
+    assert srt.read_text(encoding="utf-8").count("-->") == 2
+
+
+def test_failing_format_does_not_stop_the_others(tmp_path):
+    with mock.patch.dict(sys.modules, {"fpdf": None}):
+        session = export(tmp_path, ["pdf", "txt"])
+    assert "pdf" in session.errors
+    assert list(session.paths) == ["txt"]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ExportSession(str(tmp_path / "x"), ["docx"])
+    assert set(exporters.WRITERS) == {"txt", "pdf", "srt", "vtt", "json", "tsv"}
@@ -0,0 +1,129 @@
+import logging
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import language
+from language import LanguageCache, detect_languages, language_for
+
+
+class FakeBatch(list):
+    def to(self, device):
+        return self
+
+
+class FakeTorch:
+    @staticmethod
+    def stack(items):
+        return FakeBatch(items)
+
+
+class FakeWhisper:
+    @staticmethod
+    def pad_or_trim(clip):
+        return clip
+
+    @staticmethod
+    def log_mel_spectrogram(clip, n_mels):
+        return clip
+
+
+class FakeModel:
+    is_multilingual = True
+    dims = SimpleNamespace(n_mels=80)
+    device = "cpu"
+
+    def __init__(self):
+        self.batches = []
+
+    def detect_language(self, mels):
+        self.batches.append(len(mels))
+        # Clips are labelled with their language for the test.
+        return None, [{clip: 0.9, "en": 0.1} for clip in mels]
+
+
+class Clip(str):
+    def __getitem__(self, index):
+        return self
+
+
+def use_fakes(monkeypatch):
+    monkeypatch.setattr(language, "torch", FakeTorch())
+    monkeypatch.setattr(language, "whisper", FakeWhisper())
+    monkeypatch.setattr(language, "VAD_ENABLED", False)
+
+
+def test_language_for_codes_and_folders(tmp_path):
+    assert language_for("a.wav", None) is None
+    assert language_for("a.wav", "auto") is None
+    assert language_for("a.wav", " TR ") == "tr"
+    folders = {str(tmp_path): "de", str(tmp_path / "ist"): "tr"}
+    assert language_for(str(tmp_path / "ist" / "a.wav"), folders) == "tr"
+    assert language_for(str(tmp_path / "b.wav"), folders) == "de"
+    # A folder named like a prefix of another is not its parent.
+    assert language_for(str(tmp_path / "istanbul" / "c.wav"), folders) == "de"
+    assert language_for(os.path.abspath("elsewhere.wav"), folders) is None
+
+
+def test_languages_are_validated_against_whisper(monkeypatch):
+    tokenizer = SimpleNamespace(LANGUAGES={"en": "english", "tr": "turkish"},
+                                TO_LANGUAGE_CODE={"english": "en", "turkish": "tr"})
+    monkeypatch.setitem(sys.modules, "whisper.tokenizer", tokenizer)
+    language._known_languages.cache_clear()
+    try:
+        assert language.normalize(" TR ") == "tr"
+        assert language.normalize("Turkish") == "tr"
+        assert language.normalize("auto") is None
+        with pytest.raises(ValueError):
+            language.normalize("klingon")
+        with pytest.raises(ValueError):
+            language_for("a/x.wav", {"a": "tr", "b": "xx"})
+    finally:
+        language._known_languages.cache_clear()
+
+
+def test_cache_persists_detected_languages(tmp_path):
+    path = str(tmp_path / "languages.json")
+    LanguageCache(path).put("abc", "tr")
+    assert LanguageCache(path).get("abc") == "tr"
+    assert LanguageCache(path).get("missing") is None
+
+
+def test_language_cache_write_errors_are_logged(tmp_path, monkeypatch, caplog):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    cache = LanguageCache(str(tmp_path / "languages.json"))
+    monkeypatch.setattr("language.os.replace", fail)
+    with caplog.at_level(logging.INFO):
+        cache.put("abc", "tr")
+    assert cache.get("abc") == "tr"
+    assert "disk full" in caplog.text
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_detect_languages_batches_and_skips_cached(monkeypatch, tmp_path):
+    use_fakes(monkeypatch)
+    cache = LanguageCache(str(tmp_path / "languages.json"))
+    cache.put("h1", "fr")
+    model = FakeModel()
+    items = [("h1", Clip("xx")), ("h2", Clip("tr")), ("h3", Clip("de")), (None, Clip("es"))]
+
+    assert detect_languages(model, items, cache, batch_size=2) == ["fr", "tr", "de", "es"]
+    assert model.batches == [2, 1]
+    assert cache.get("h2") == "tr" and cache.get("h3") == "de"
+
+    model.batches.clear()
+    assert detect_languages(model, items[:3], cache) == ["fr", "tr", "de"]
+    assert model.batches == []
+
+
+def test_english_only_models_skip_detection(monkeypatch, tmp_path):
+    use_fakes(monkeypatch)
+    model = FakeModel()
+    model.is_multilingual = False
+    cache = LanguageCache(str(tmp_path / "languages.json"))
+    assert detect_languages(model, [("h", Clip("tr"))], cache) == ["en"]
+    assert model.batches == []
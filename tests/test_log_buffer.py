@@ -0,0 +1,111 @@
+import logging
+import threading
+
+import log_buffer
+
+
+class FakeText:
+    """Just enough of tk.Text for LogFlusher."""
+
+    def __init__(self):
+        self.text = ""
+        self.inserts = 0
+        self.scrolls = 0
+
+    def insert(self, index, text):
+        assert index == "end"
+        self.inserts += 1
+        self.text += text
+
+    def index(self, index):
+        assert index == "end-1c"
+        return f"{self.text.count(chr(10)) + 1}.0"
+
+    def delete(self, start, end):
+        assert start == "1.0"
+        count = int(end.split(".")[0]) - 1
+        self.text = "".join(self.text.splitlines(keepends=True)[count:])
+
+    def see(self, index):
+        self.scrolls += 1
+
+    def after(self, ms, func):
+        pass
+
+
+def make_logger(handler):
+    logger = logging.getLogger(f"test_log_buffer.{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+
+def test_records_from_threads_are_flushed_in_one_insert():
+    handler = log_buffer.RingBufferHandler(capacity=1000)
+    logger = make_logger(handler)
+    threads = [threading.Thread(target=lambda n=n: [logger.info("t%d %d", n, i) for i in range(50)])
+               for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    widget = FakeText()
+    log_buffer.LogFlusher(widget, handler, max_lines=1000).flush()
+    assert widget.inserts == 1
+    assert widget.scrolls == 1
+    assert len(widget.text.splitlines()) == 200
+    log_buffer.LogFlusher(widget, handler).flush()
+    assert widget.inserts == 1
+
+
+def test_buffer_and_widget_are_bounded():
+    handler = log_buffer.RingBufferHandler(capacity=10)
+    logger = make_logger(handler)
+    for i in range(25):
+        logger.info("line %d", i)
+    assert handler.dropped == 15
+
+    widget = FakeText()
+    flusher = log_buffer.LogFlusher(widget, handler, max_lines=5)
+    flusher.flush()
+    assert widget.text.splitlines() == [f"line {i}" for i in range(20, 25)]
+    logger.info("more")
+    flusher.flush()
+    assert widget.text.splitlines()[-1] == "more"
+    assert len(widget.text.splitlines()) == 5
+
+
+def test_dropped_lines_are_reported_once():
+    handler = log_buffer.RingBufferHandler(capacity=2)
+    logger = make_logger(handler)
+    for i in range(5):
+        logger.info("x%d", i)
+    widget = FakeText()
+    flusher = log_buffer.LogFlusher(widget, handler, max_lines=100)
+    flusher.flush()
+    assert widget.text.splitlines() == ["... 3 log lines dropped", "x3", "x4"]
+    flusher.flush()
+    assert widget.inserts == 1
+
+
+def test_file_logging_rotates(tmp_path):
+    logger = logging.getLogger("test_log_buffer.file")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    path = tmp_path / "app.log"
+    listener = log_buffer.start_file_logging(str(path), max_bytes=200, backups=2, logger=logger,
+                                             formatter=logging.Formatter("%(message)s"))
+    try:
+        for i in range(40):
+            logger.info("message number %d", i)
+    finally:
+        listener.stop()
+        for h in list(logger.handlers):
+            logger.removeHandler(h)
+        for h in listener.handlers:
+            h.close()
+    assert path.exists()
+    assert (tmp_path / "app.log.1").exists()
+    assert "message number 39" in path.read_text(encoding="utf-8")
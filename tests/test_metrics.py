@@ -0,0 +1,151 @@
+import json
+import types
+
+import metrics
+
+
+class _Handle:
+    def __init__(self, hooks, hook):
+        self.hooks = hooks
+        self.hook = hook
+
+    def remove(self):
+        self.hooks.remove(self.hook)
+
+
+class FakeModule:
+    """Calls forward hooks the way torch.nn.Module does."""
+
+    def __init__(self):
+        self.pre_hooks = []
+        self.post_hooks = []
+
+    def register_forward_pre_hook(self, hook):
+        self.pre_hooks.append(hook)
+        return _Handle(self.pre_hooks, hook)
+
+    def register_forward_hook(self, hook):
+        self.post_hooks.append(hook)
+        return _Handle(self.post_hooks, hook)
+
+    def __call__(self, clock, cost):
+        for hook in list(self.pre_hooks):
+            hook(self, ())
+        clock.now += cost
+        for hook in list(self.post_hooks):
+            hook(self, (), None)
+
+
+class FakeModel:
+    def __init__(self, clock):
+        self.clock = clock
+        self.encoder = FakeModule()
+        self.decoder = FakeModule()
+
+    def detect_language(self):
+        self.encoder(self.clock, 0.5)
+        self.decoder(self.clock, 0.25)
+        return "en"
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stage_recorder_splits_encoder_decoder_and_language(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(metrics.time, "perf_counter", clock)
+    monkeypatch.setattr(metrics, "current_rss", lambda: 1000)
+    recorder = metrics.StageRecorder("base", "cpu", "fp32")
+    with recorder.stage("audio_decode"):
+        clock.now += 2.0
+    model = FakeModel(clock)
+    with recorder.instrument(model):
+        assert model.detect_language() == "en"
+        model.encoder(clock, 3.0)
+        model.decoder(clock, 1.0)
+        model.decoder(clock, 1.0)
+    # Hooks are gone once the job is done.
+    assert not model.encoder.pre_hooks and not model.decoder.post_hooks
+    assert "detect_language" not in vars(model)
+
+    m = recorder.finish(segments=4, audio_seconds=60.0)
+    assert m.audio_decode_seconds == 2.0
+    assert m.language_detect_seconds == 0.75
+    assert m.encoder_seconds == 3.0
+    assert m.decoder_seconds == 2.0
+    assert m.total_seconds == 7.75
+    assert m.peak_cpu_bytes == 1000
+    assert m.segments_per_second == 4 / 7.75
+
+
+class FakeCuda:
+    """torch.cuda stand-in whose events read the fake clock when recorded."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.allocated = 0
+        self.synced = 0
+        cuda = self
+
+        class Event:
+            def __init__(self, enable_timing=False):
+                self.time = None
+
+            def record(self):
+                self.time = cuda.clock.now
+
+            def synchronize(self):
+                cuda.synced += 1
+
+            def elapsed_time(self, end):
+                return (end.time - self.time) * 1000
+
+        self.Event = Event
+
+    def memory_allocated(self):
+        return self.allocated
+
+
+def test_stage_recorder_reads_cuda_events_once(monkeypatch):
+    clock = Clock()
+    cuda = FakeCuda(clock)
+    monkeypatch.setattr(metrics, "torch", types.SimpleNamespace(cuda=cuda))
+    monkeypatch.setattr(metrics.time, "perf_counter", clock)
+    monkeypatch.setattr(metrics, "current_rss", lambda: 0)
+    recorder = metrics.StageRecorder("base", "cuda", "fp16")
+    model = FakeModel(clock)
+    with recorder.instrument(model):
+        model.encoder(clock, 3.0)
+        cuda.allocated = 500
+        for _ in range(3):
+            model.decoder(clock, 0.5)
+        cuda.allocated = 100
+    assert cuda.synced == 1
+
+    m = recorder.finish(segments=1, audio_seconds=10.0)
+    assert m.encoder_seconds == 3.0
+    assert m.decoder_seconds == 1.5
+    assert m.peak_gpu_bytes == 500
+
+
+def test_registry_aggregates_and_exports(tmp_path):
+    registry = metrics.MetricsRegistry(str(tmp_path / "metrics.json"))
+    registry.record(metrics.JobMetrics(encoder_seconds=1.0, total_seconds=2.0, segments=4, peak_cpu_bytes=10))
+    registry.record(metrics.JobMetrics(encoder_seconds=2.0, total_seconds=2.0, segments=4, peak_cpu_bytes=30))
+    summary = registry.summary()
+    assert summary["jobs"] == 2
+    assert summary["totals"]["encoder_seconds"] == 3.0
+    assert summary["peaks"]["peak_cpu_bytes"] == 30
+    assert summary["segments_per_second"] == 2.0
+
+    json_path, prom_path = registry.export()
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f)["jobs"] == 2
+    with open(prom_path, encoding="utf-8") as f:
+        prom = f.read()
+    assert 'whisper_gui_stage_seconds_total{stage="encoder"} 3.0' in prom
+    assert "whisper_gui_jobs_total 2" in prom
@@ -0,0 +1,149 @@
+from unittest import mock
+
+import pytest
+
+import model_pool
+
+
+def real_module(name):
+    module = pytest.importorskip(name)
+    if isinstance(module, mock.Mock):
+        pytest.skip(f"{name} is mocked by another test module")
+    return module
+
+
+def make_pool(budget, sizes):
+    loader = mock.MagicMock(side_effect=lambda name, device, precision: object())
+    pool = model_pool.ModelPool(
+        budget=budget,
+        loader=loader,
+        sizer=lambda name, precision: sizes[name],
+    )
+    return pool, loader
+
+
+def test_parse_size():
+    assert model_pool.parse_size("152MB") == 152 * 1024 ** 2
+    assert model_pool.parse_size("2.9GB") == int(2.9 * 1024 ** 3)
+    assert model_pool.parse_size("16GB+") == 16 * 1024 ** 3
+    assert model_pool.parse_size(42) == 42
+
+
+def test_model_size_uses_requirements():
+    assert model_pool.model_size_bytes("tiny") == 152 * 1024 ** 2
+    assert model_pool.model_size_bytes("unknown") == 0
+
+
+def test_pool_reuses_loaded_model():
+    pool, loader = make_pool(100, {"base": 10})
+    first = pool.get("base", "cuda", "fp16")
+    second = pool.get("base", "cuda", "fp16")
+    assert first is second
+    loader.assert_called_once_with("base", "cuda", "fp16")
+
+
+def test_pool_keys_by_device_and_precision():
+    pool, loader = make_pool(100, {"base": 10})
+    pool.get("base", "cuda", "fp16")
+    pool.get("base", "cpu", "fp32")
+    assert loader.call_count == 2
+    assert pool.usage == 20
+
+
+def test_pool_evicts_least_recently_used():
+    pool, loader = make_pool(25, {"tiny": 10, "base": 10, "small": 10})
+    pool.get("tiny", "cpu")
+    pool.get("base", "cpu")
+    pool.get("tiny", "cpu")  # tiny is now the most recently used
+    pool.get("small", "cpu")
+    assert [k[0] for k in pool.keys()] == ["tiny", "small"]
+    assert pool.usage == 20
+
+
+def test_pool_keeps_single_model_over_budget():
+    pool, _ = make_pool(5, {"tiny": 1, "large": 50})
+    pool.get("tiny", "cpu")
+    pool.get("large", "cpu")
+    assert [k[0] for k in pool.keys()] == ["large"]
+
+
+def test_pool_evict_by_model():
+    pool, _ = make_pool(100, {"base": 10})
+    pool.get("base", "cuda", "fp16")
+    pool.get("base", "cpu", "fp32")
+    pool.evict("base", device="cpu")
+    assert pool.keys() == [("base", "cuda", "fp16")]
+    pool.clear()
+    assert pool.keys() == []
+
+
+def test_mapped_model_is_preferred_when_converted(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_mapped(name, device, fp16=False):
+        calls.append((name, device, fp16))
+        return "mapped" if not fp16 else None
+
+    monkeypatch.setattr(model_pool, "MODEL_MMAP", True)
+    monkeypatch.setattr(model_pool, "load_mapped_model", fake_mapped)
+    assert model_pool._load_whisper("base", "cpu", "fp32") == "mapped"
+    # Without an FP16 copy, an FP16 GPU run falls back to the FP32 one.
+    assert model_pool._load_whisper("base", "cuda", "fp16") == "mapped"
+    assert calls == [("base", "cpu", False), ("base", "cuda", True), ("base", "cuda", False)]
+
+
+def test_load_mapped_model_without_converted_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(model_pool, "MODEL_FOLDER", str(tmp_path))
+    assert model_pool.mapped_path("base", fp16=True) == str(tmp_path / "base.fp16.mmap")
+    assert model_pool.load_mapped_model("base", "cpu") is None
+
+
+def tiny_checkpoint(monkeypatch, tmp_path):
+    torch = real_module("torch")
+    real_module("whisper")
+    from whisper.model import ModelDimensions, Whisper
+
+    dims = ModelDimensions(n_mels=80, n_audio_ctx=8, n_audio_state=16, n_audio_head=2, n_audio_layer=1,
+                           n_vocab=64, n_text_ctx=8, n_text_state=16, n_text_head=2, n_text_layer=2)
+    model = Whisper(dims)
+    # Whisper leaves some parameters uninitialized (torch.empty).
+    with torch.no_grad():
+        for parameter in model.parameters():
+            parameter.normal_(std=0.02)
+    source = tmp_path / "tiny-test.pt"
+    torch.save({"dims": vars(dims), "model_state_dict": model.state_dict()}, source)
+    monkeypatch.setattr(model_pool, "MODEL_FOLDER", str(tmp_path))
+    monkeypatch.setattr(model_pool, "_source_checkpoint", lambda name: (str(source), None))
+    model_pool.convert_model("tiny-test")
+    return torch, model
+
+
+def test_converted_model_loads_with_real_buffers(monkeypatch, tmp_path):
+    torch, model = tiny_checkpoint(monkeypatch, tmp_path)
+    loaded = model_pool.load_mapped_model("tiny-test", "cpu")
+    assert not any(t.is_meta for t in [*loaded.parameters(), *loaded.buffers()])
+    assert torch.equal(loaded.decoder.mask, model.decoder.mask)
+    mel = torch.randn(1, 80, 16)
+    tokens = torch.zeros(1, 3, dtype=torch.long)
+    with torch.no_grad():
+        torch.testing.assert_close(loaded(mel, tokens), model(mel, tokens))
+
+
+def test_converted_model_is_built_once_on_meta(monkeypatch, tmp_path):
+    torch, _ = tiny_checkpoint(monkeypatch, tmp_path)
+    import whisper.model
+
+    devices = []
+    for cls in (whisper.model.AudioEncoder, whisper.model.TextDecoder, whisper.model.Whisper):
+        init = cls.__init__
+
+        def spy(self, *args, _init=init, _name=cls.__name__, **kwargs):
+            devices.append((_name, torch.empty(0).device.type))
+            _init(self, *args, **kwargs)
+
+        monkeypatch.setattr(cls, "__init__", spy)
+
+    loaded = model_pool.load_mapped_model("tiny-test", "cpu")
+    assert devices == [("AudioEncoder", "meta"), ("TextDecoder", "meta")]
+    assert not any(t.is_meta for t in [*loaded.parameters(), *loaded.buffers()])
+    assert loaded.alignment_heads.to_dense()[1].all()
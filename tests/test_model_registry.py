@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from model_registry import ModelRegistry, preload_last_used
+
+
+def test_refresh_indexes_checkpoints_and_variants(tmp_path):
+    (tmp_path / "base.pt").write_bytes(b"x" * 10)
+    (tmp_path / "base.mmap").write_bytes(b"")
+    (tmp_path / "medium.bin").write_bytes(b"y")
+    (tmp_path / "readme.txt").write_bytes(b"")
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.installed() == ["base", "medium"]
+    entry = registry.get("base")
+    assert entry["size"] == 10 and entry["variants"] == ["fp32", "mmap"]
+    saved = json.loads((tmp_path / "models.json").read_text(encoding="utf-8"))
+    assert sorted(saved["models"]) == ["base", "medium"]
+
+    # Unchanged folders are not written again.
+    mtime = os.stat(tmp_path / "models.json").st_mtime_ns
+    registry.installed()
+    assert os.stat(tmp_path / "models.json").st_mtime_ns == mtime
+
+    (tmp_path / "medium.bin").unlink()
+    assert registry.installed() == ["base"]
+
+
+def test_use_and_download_are_remembered_across_instances(tmp_path):
+    checkpoint = tmp_path / "small.pt"
+    checkpoint.write_bytes(b"weights")
+    registry = ModelRegistry(str(tmp_path))
+    registry.record_download(str(checkpoint), "abc")
+    registry.record_use("small", "cpu", "int8", load_seconds=1.23456)
+    registry.record_use("unknown", "cpu", "fp32")
+
+    reopened = ModelRegistry(str(tmp_path))
+    entry = reopened.get("small")
+    assert entry["sha256"] == "abc"
+    assert entry["load_seconds"] == {"cpu/int8": 1.235}
+    assert reopened.last_used() == ("small", "cpu", "int8")
+
+    # A replaced checkpoint loses what was known about the old one.
+    checkpoint.write_bytes(b"new weights")
+    reopened.refresh()
+    assert reopened.get("small")["sha256"] is None
+
+
+def test_aliases_are_recorded_under_their_checkpoint(tmp_path):
+    (tmp_path / "large-v3.pt").write_bytes(b"weights")
+    registry = ModelRegistry(str(tmp_path))
+    registry.record_use("large", "cpu", "fp32", load_seconds=2.0)
+    assert registry.get("large-v3")["load_seconds"] == {"cpu/fp32": 2.0}
+    # Preloading uses the name the job asked for, i.e. its pool key.
+    assert registry.last_used() == ("large", "cpu", "fp32")
+
+
+def test_record_use_survives_write_errors(tmp_path, monkeypatch, caplog):
+    (tmp_path / "base.pt").write_bytes(b"b")
+    registry = ModelRegistry(str(tmp_path))
+    registry.refresh()
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("model_registry.tempfile.mkstemp", fail)
+    with caplog.at_level(logging.INFO):
+        registry.record_use("base", "cpu", "fp32")
+    assert "disk full" in caplog.text
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["base.pt", "models.json"]
+
+
+def test_verify_hashes_the_checkpoint(tmp_path):
+    (tmp_path / "tiny.pt").write_bytes(b"tiny")
+    registry = ModelRegistry(str(tmp_path))
+    good = hashlib.sha256(b"tiny").hexdigest()
+    assert registry.verify("tiny", good) is True
+    assert registry.verify("tiny", "0" * 64) is False
+    assert registry.get("tiny")["sha256"] == good
+
+
+class FakePool:
+    def __init__(self):
+        self.loaded = threading.Event()
+        self.calls = []
+
+    def get(self, model_name, device, precision):
+        self.calls.append((model_name, device, precision))
+        self.loaded.set()
+
+
+def test_preload_last_used_model(tmp_path):
+    (tmp_path / "base.pt").write_bytes(b"b")
+    (tmp_path / "small.pt").write_bytes(b"s")
+    registry = ModelRegistry(str(tmp_path))
+    pool = FakePool()
+    assert preload_last_used(registry, pool) is None
+
+    registry.record_use("base", "cpu", "fp32")
+    registry.record_use("small", "cuda", "fp16")
+    # The last model ran on a GPU that is not available now.
+    assert preload_last_used(registry, pool, gpu_available=False) is None
+    assert preload_last_used(registry, pool, gpu_available=True) == ("small", "cuda", "fp16")
+    assert pool.loaded.wait(5)
+    assert pool.calls == [("small", "cuda", "fp16")]
@@ -0,0 +1,155 @@
+import os
+import queue
+import threading
+
+import process_pool
+from events import Segment, Result
+
+
+def stub_runner(q, stop_evt, model_name, audio_file, device=None, precision=None, stream=None,
+                audio=None, threads=None):
+    if audio_file.endswith("bad.wav"):
+        raise RuntimeError("cannot decode")
+    if audio_file.endswith("crash.wav"):
+        os._exit(3)
+    q.put(Segment({"start": 0.0, "end": 1.0, "text": "hi"}))
+    q.put(Result({"text": f"{model_name}:{len(audio)}:{audio._pcm[1]}"}, 0.1))
+
+
+def fake_decode(tmp_path):
+    def decode(path):
+        pcm_file = tmp_path / (path.replace("/", "_") + ".pcm")
+        pcm_file.write_bytes((7).to_bytes(2, "little", signed=True) * 100
+                             + (-3).to_bytes(2, "little", signed=True) * 20)
+        return "hash", str(pcm_file)
+
+    return decode
+
+
+def test_default_process_count_respects_memory(monkeypatch):
+    monkeypatch.setattr(process_pool.os, "cpu_count", lambda: 16)
+    per_worker = process_pool.model_size_bytes("base", "fp32") + process_pool.WORKER_OVERHEAD
+    monkeypatch.setattr(process_pool, "available_memory", lambda: per_worker * 3 + 1)
+    assert process_pool.default_process_count("base") == 3
+    monkeypatch.setattr(process_pool, "available_memory", lambda: 1)
+    assert process_pool.default_process_count("base") == 1
+    monkeypatch.setattr(process_pool.os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(process_pool, "available_memory", lambda: per_worker * 100)
+    assert process_pool.default_process_count("base") == 2
+
+
+def test_files_are_transcribed_in_worker_processes(tmp_path):
+    q = queue.Queue()
+    finished = {}
+    pool = process_pool.ProcessPool(
+        q, "tiny", processes=2, runner="tests.test_process_pool:stub_runner",
+        decode=fake_decode(tmp_path),
+        on_finish=lambda job_id, path, result: finished.__setitem__(path, result),
+    )
+    pool.start()
+    try:
+        ids = pool.map(["a.wav", "b.wav", "bad.wav"])
+        assert pool.join(timeout=60)
+    finally:
+        pool.shutdown()
+    assert finished["a.wav"] == {"text": "tiny:120:7"}
+    assert finished["b.wav"] == {"text": "tiny:120:7"}
+    assert finished["bad.wav"] is None
+    assert pool.error(ids[2]) == "cannot decode"
+    kinds = []
+    while not q.empty():
+        event = q.get()
+        assert event.job_id in ids
+        kinds.append(type(event).__name__)
+    assert kinds.count("Segment") == 2
+    assert kinds.count("Result") == 2
+    assert all(pool._jobs[i]["shm"] is None for i in ids)
+
+
+def test_only_a_few_files_are_prepared_ahead(tmp_path):
+    decode = fake_decode(tmp_path)
+    prepared = []
+
+    def counting_decode(path):
+        prepared.append(path)
+        return decode(path)
+
+    pool = process_pool.ProcessPool(queue.Queue(), "tiny", processes=1, decode=counting_decode)
+    for name in ["a.wav", "b.wav", "c.wav", "d.wav"]:
+        pool.submit(name)
+    # No workers run, so nothing finishes and frees a slot.
+    threading.Event().wait(0.5)
+    assert len(prepared) == 2
+    for job_id, job in list(pool._jobs.items()):
+        if job["shm"] is not None:
+            pool._finish(job_id, job)
+    pool._decoder.shutdown(wait=True)
+    assert len(prepared) == 4
+    for job_id, job in pool._jobs.items():
+        if job["shm"] is not None:
+            pool._finish(job_id, job)
+
+
+def test_jobs_fail_when_their_worker_dies(tmp_path):
+    q = queue.Queue()
+    finished = {}
+    pool = process_pool.ProcessPool(
+        q, "tiny", processes=1, runner="tests.test_process_pool:stub_runner",
+        decode=fake_decode(tmp_path),
+        on_finish=lambda job_id, path, result: finished.__setitem__(path, result),
+    )
+    pool.start()
+    try:
+        ids = [pool.submit("crash.wav")]
+        # a.wav comes after the only worker took crash.wav, and dies with it.
+        while pool._jobs[ids[0]]["worker"] is None:
+            threading.Event().wait(0.01)
+        ids.append(pool.submit("a.wav"))
+        assert pool.join(timeout=60)
+    finally:
+        pool.shutdown()
+    assert finished == {"crash.wav": None, "a.wav": None}
+    assert pool.error(ids[0]) == "worker process exited"
+    assert all(pool._jobs[i]["shm"] is None for i in ids)
+
+
+def test_only_the_dead_workers_job_fails(tmp_path):
+    finished = {}
+    pool = process_pool.ProcessPool(
+        queue.Queue(), "tiny", processes=2, runner="tests.test_process_pool:stub_runner",
+        decode=fake_decode(tmp_path),
+        on_finish=lambda job_id, path, result: finished.__setitem__(path, result),
+    )
+    pool.start()
+    try:
+        ids = pool.map(["crash.wav", "a.wav", "b.wav"])
+        assert pool.join(timeout=60)
+    finally:
+        pool.shutdown()
+    # The job was assigned when it was sent, before the worker touched it.
+    assert finished == {"crash.wav": None, "a.wav": {"text": "tiny:120:7"}, "b.wav": {"text": "tiny:120:7"}}
+    assert pool.error(ids[0]) == "worker process exited"
+
+
+def test_failing_on_finish_fails_only_its_job(tmp_path):
+    q = queue.Queue()
+    finished = {}
+
+    def on_finish(job_id, path, result):
+        if path == "a.wav":
+            raise OSError("disk full")
+        finished[path] = result
+
+    pool = process_pool.ProcessPool(
+        q, "tiny", processes=1, runner="tests.test_process_pool:stub_runner",
+        decode=fake_decode(tmp_path), on_finish=on_finish,
+    )
+    pool.start()
+    try:
+        ids = pool.map(["a.wav", "b.wav"])
+        assert pool.join(timeout=60)
+    finally:
+        pool.shutdown()
+    assert finished == {"b.wav": {"text": "tiny:120:7"}}
+    assert pool.error(ids[0]) == "disk full"
+    assert pool._jobs[ids[0]]["result"] is None
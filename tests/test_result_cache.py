@@ -0,0 +1,74 @@
+import os
+import time
+
+import result_cache
+
+
+def test_hash_file_depends_on_content(tmp_path):
+    a = tmp_path / "a.wav"
+    b = tmp_path / "b.wav"
+    a.write_bytes(b"same")
+    b.write_bytes(b"same")
+    assert result_cache.hash_file(str(a)) == result_cache.hash_file(str(b))
+    b.write_bytes(b"different")
+    os.utime(b, ns=(time.time_ns() + 10 ** 9, time.time_ns() + 10 ** 9))
+    assert result_cache.hash_file(str(a)) != result_cache.hash_file(str(b))
+
+
+def test_cache_key_includes_model_and_options():
+    base = result_cache.cache_key("h", "base", {"precision": "fp32"})
+    assert base == result_cache.cache_key("h", "base", {"precision": "fp32"})
+    assert base != result_cache.cache_key("h", "small", {"precision": "fp32"})
+    assert base != result_cache.cache_key("h", "base", {"precision": "int8"})
+
+
+def test_cache_key_follows_vad_settings(monkeypatch):
+    import vad
+
+    key = result_cache.cache_key("h", "base", {"vad": vad.vad_settings()})
+    assert key == result_cache.cache_key("h", "base", {"vad": vad.vad_settings()})
+    monkeypatch.setattr(vad, "VAD_THRESHOLD_DB", -30.0)
+    assert key != result_cache.cache_key("h", "base", {"vad": vad.vad_settings()})
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    cache = result_cache.ResultCache(folder=str(tmp_path))
+    result = {"text": " hi", "segments": [{"start": 0.0, "end": 1.0, "text": " hi"}]}
+    assert cache.get("h", "base", {}) is None
+    cache.put("h", "base", {}, result)
+    assert cache.get("h", "base", {}) == result
+    assert cache.get("h", "base", {"precision": "int8"}) is None
+
+
+def test_invalidate_by_model(tmp_path):
+    cache = result_cache.ResultCache(folder=str(tmp_path))
+    cache.put("h", "base", {}, {"text": "a"})
+    cache.put("h", "small", {}, {"text": "b"})
+    cache.invalidate("base")
+    assert cache.get("h", "base", {}) is None
+    assert cache.get("h", "small", {}) == {"text": "b"}
+
+
+def test_invalidate_covers_model_aliases(tmp_path):
+    cache = result_cache.ResultCache(folder=str(tmp_path))
+    cache.put("h", "large", {}, {"text": "a"})
+    cache.put("h", "large-v3", {}, {"text": "b"})
+    cache.invalidate("large")
+    assert cache.get("h", "large", {}) is None
+    assert cache.get("h", "large-v3", {}) is None
+
+
+def test_evicts_least_recently_read(tmp_path):
+    cache = result_cache.ResultCache(folder=str(tmp_path), max_size=10 ** 9)
+    payload = {"text": "x" * 200}
+    for name in ("old", "mid", "new"):
+        cache.put(name, "base", {}, payload)
+    entries = sorted(cache._entries(), key=lambda e: e[0])
+    for i, (path, _, _) in enumerate(entries):
+        os.utime(path, (1000 + i, 1000 + i))
+    cache.get("old", "base", {})  # reading refreshes the entry
+    cache.max_bytes = cache.size() - 1
+    cache._evict()
+    remaining = [name for name in ("old", "mid", "new") if cache.get(name, "base", {})]
+    assert "old" in remaining
+    assert len(remaining) == 2
@@ -0,0 +1,232 @@
+import json
+import os
+import queue
+import threading
+
+import scheduler
+from events import Result, Error, JobStatus
+
+
+def make_scheduler(tmp_path, runner, workers=1):
+    return scheduler.JobScheduler(
+        queue.Queue(),
+        workers=workers,
+        state_file=str(tmp_path / "queue.json"),
+        runner=runner,
+    )
+
+
+def ok_runner(q, stop_evt, model_name, audio_file, device=None, precision=None):
+    q.put(Result({"text": audio_file}, 0.5))
+
+
+def test_collect_audio_files_expands_folders(tmp_path):
+    (tmp_path / "b.wav").touch()
+    (tmp_path / "a.mp3").touch()
+    (tmp_path / "notes.txt").touch()
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    (sub / "c.flac").touch()
+    files = scheduler.collect_audio_files([str(tmp_path)])
+    assert files == [str(tmp_path / "a.mp3"), str(tmp_path / "b.wav"), str(sub / "c.flac")]
+
+
+def test_jobs_run_by_priority_then_order(tmp_path):
+    ran = []
+
+    def runner(q, stop_evt, model_name, audio_file, device=None, precision=None):
+        ran.append(audio_file)
+        ok_runner(q, stop_evt, model_name, audio_file)
+
+    sched = make_scheduler(tmp_path, runner)
+    sched.add("first", "base")
+    sched.add("second", "base")
+    urgent = sched.add("urgent", "base", priority=5)
+    sched.start()
+    assert sched.join(timeout=5)
+    sched.shutdown()
+    assert ran == ["urgent", "first", "second"]
+    assert sched.get(urgent.id).status == scheduler.DONE
+    assert sched.get(urgent.id).duration == 0.5
+    posted = []
+    while not sched.q.empty():
+        posted.append(sched.q.get())
+    results = [e for e in posted if isinstance(e, Result)]
+    assert [e.result["text"] for e in results] == ["urgent", "first", "second"]
+    assert results[0].job_id == urgent.id
+    assert all(e.job_id for e in posted if isinstance(e, JobStatus))
+
+
+def test_move_reorders_pending_jobs(tmp_path):
+    sched = make_scheduler(tmp_path, ok_runner)
+    a = sched.add("a", "base")
+    b = sched.add("b", "base")
+    c = sched.add("c", "base")
+    sched.move(c.id, -2)
+    assert [j.path for j in sched.pending()] == ["c", "a", "b"]
+    sched.move(c.id, 1)
+    assert [j.path for j in sched.pending()] == ["a", "c", "b"]
+    assert {a.id, b.id, c.id} == {j.id for j in sched.jobs()}
+
+
+def test_failed_and_cancelled_status(tmp_path):
+    def runner(q, stop_evt, model_name, audio_file, device=None, precision=None):
+        q.put(Error("boom"))
+
+    sched = make_scheduler(tmp_path, runner)
+    failing = sched.add("x", "base")
+    skipped = sched.add("y", "base")
+    sched.cancel(skipped.id)
+    sched.start()
+    assert sched.join(timeout=5)
+    sched.shutdown()
+    assert sched.get(failing.id).status == scheduler.FAILED
+    assert sched.get(failing.id).error == "boom"
+    assert sched.get(skipped.id).status == scheduler.CANCELLED
+
+
+def test_cancel_running_job_sets_stop_event(tmp_path):
+    started = threading.Event()
+
+    def runner(q, stop_evt, model_name, audio_file, device=None, precision=None):
+        started.set()
+        stop_evt.wait(5)
+
+    sched = make_scheduler(tmp_path, runner)
+    job = sched.add("long", "base")
+    sched.start()
+    assert started.wait(5)
+    sched.cancel(job.id)
+    assert sched.join(timeout=5)
+    sched.shutdown()
+    assert sched.get(job.id).status == scheduler.CANCELLED
+
+
+def test_queue_persists_across_restarts(tmp_path):
+    sched = make_scheduler(tmp_path, ok_runner)
+    job = sched.add("pending.wav", "small", priority=2, device="cpu")
+
+    restored = make_scheduler(tmp_path, ok_runner)
+    [again] = restored.pending()
+    assert again.id == job.id
+    assert again.model_name == "small"
+    assert again.priority == 2
+    assert again.device == "cpu"
+    newer = restored.add("later.wav", "small", priority=2)
+    assert newer.order > again.order
+
+
+def test_next_job_is_prefetched(tmp_path):
+    prefetched = []
+    sched = scheduler.JobScheduler(
+        queue.Queue(),
+        workers=1,
+        state_file=str(tmp_path / "queue.json"),
+        runner=ok_runner,
+        prefetch=prefetched.append,
+    )
+    sched.add("one.wav", "base")
+    sched.add("two.wav", "base")
+    sched.start()
+    assert sched.join(timeout=5)
+    sched.shutdown()
+    assert prefetched == ["two.wav"]
+
+
+def test_auto_languages_are_detected_in_one_batch(tmp_path):
+    batches = []
+    ran = {}
+
+    def detector(jobs):
+        batches.append([job.path for job in jobs])
+        return {job.id: "tr" for job in jobs}
+
+    def runner(q, stop_evt, model_name, audio_file, device=None, precision=None, language=None):
+        ran[audio_file] = language
+        ok_runner(q, stop_evt, model_name, audio_file)
+
+    sched = scheduler.JobScheduler(
+        queue.Queue(), workers=1, state_file=str(tmp_path / "queue.json"),
+        runner=runner, prefetch=lambda path: None, detector=detector, language_batch=3,
+    )
+    for name in ["a.wav", "b.wav", "c.wav", "d.wav"]:
+        sched.add(name, "base")
+    sched.add("pinned.wav", "base", language="EN")
+    sched.add("other-model.wav", "small")
+    sched.start()
+    assert sched.join(timeout=5)
+    sched.shutdown()
+    assert batches == [["a.wav", "b.wav", "c.wav"], ["d.wav"], ["other-model.wav"]]
+    assert ran == {"a.wav": "tr", "b.wav": "tr", "c.wav": "tr", "d.wav": "tr",
+                   "pinned.wav": "en", "other-model.wav": "tr"}
+
+
+def test_folder_languages_pin_per_folder(tmp_path):
+    calls = tmp_path / "calls"
+    (calls / "istanbul").mkdir(parents=True)
+    (calls / "istanbul" / "a.wav").touch()
+    (calls / "b.wav").touch()
+    sched = make_scheduler(tmp_path, ok_runner)
+    jobs = sched.add_many([str(calls)], "base", language={str(calls): "de", str(calls / "istanbul"): "tr"})
+    assert {os.path.basename(job.path): job.language for job in jobs} == {"a.wav": "tr", "b.wav": "de"}
+    assert sched.add(str(tmp_path / "x.wav"), "base", language="auto").language is None
+
+
+def test_runner_without_language_support_still_runs_auto_jobs(tmp_path):
+    sched = scheduler.JobScheduler(
+        queue.Queue(), workers=1, state_file=str(tmp_path / "queue.json"),
+        runner=ok_runner, prefetch=lambda path: None, detector=lambda jobs: {},
+    )
+    job = sched.add("a.wav", "base")
+    sched.start()
+    assert sched.join(timeout=5)
+    sched.shutdown()
+    assert sched.get(job.id).status == scheduler.DONE
+
+
+def test_preview_jobs_pass_their_draft_model(tmp_path):
+    seen = {}
+
+    def runner(q, stop_evt, model_name, audio_file, device=None, precision=None, **options):
+        seen[audio_file] = options
+        ok_runner(q, stop_evt, model_name, audio_file)
+
+    batches = []
+    sched = scheduler.JobScheduler(
+        queue.Queue(), workers=1, state_file=str(tmp_path / "queue.json"), runner=runner,
+        prefetch=lambda path: None, detector=lambda jobs: batches.append(jobs) or {},
+    )
+    job = sched.add("a.wav", "large-v3", preview="tiny")
+    sched.add("b.wav", "large-v3", language="tr")
+    sched.start()
+    assert sched.join(timeout=5)
+    sched.shutdown()
+    assert seen == {"a.wav": {"preview_model": "tiny"}, "b.wav": {"language": "tr"}}
+    # The draft model is the one that detects the language.
+    assert [[j.first_model for j in batch] for batch in batches] == [["tiny"]]
+    assert scheduler.Job.from_dict(job.to_dict()).preview == "tiny"
+
+
+def test_cancelling_the_last_pending_job_wakes_join(tmp_path):
+    sched = make_scheduler(tmp_path, ok_runner)
+    job = sched.add("a.wav", "base")
+    waiter = threading.Thread(target=sched.join)
+    waiter.start()
+    sched.cancel(job.id)
+    waiter.join(timeout=2)
+    assert not waiter.is_alive()
+
+
+def test_on_finish_failure_is_saved(tmp_path):
+    def on_finish(job, result):
+        raise OSError("disk full")
+
+    sched = scheduler.JobScheduler(queue.Queue(), workers=1, state_file=str(tmp_path / "queue.json"),
+                                   runner=ok_runner, prefetch=lambda path: None, on_finish=on_finish)
+    job = sched.add("a.wav", "base")
+    sched.start()
+    assert sched.join(timeout=5)
+    sched.shutdown()
+    saved = json.loads((tmp_path / "queue.json").read_text())["jobs"][0]
+    assert saved["status"] == scheduler.FAILED and saved["error"] == "disk full"
+    assert sched.get(job.id).status == scheduler.FAILED
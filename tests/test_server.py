@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import server
+from events import Segment, Result
+
+
+def stub_runner(release=None):
+    def run(q, stop_evt, model_name, audio_file, device=None, precision=None):
+        if release is not None:
+            release.wait(5)
+        segments = [
+            {"start": 0.0, "end": 1.0, "text": " hello"},
+            {"start": 1.0, "end": 2.0, "text": " world"},
+        ]
+        for segment in segments:
+            q.put(Segment(segment))
+        q.put(Result({"text": " hello world", "segments": segments, "streamed": True}, 0.1))
+    return run
+
+
+@pytest.fixture
+def running_server(tmp_path, monkeypatch):
+    monkeypatch.setattr("audio_cache.prefetch", lambda path: None)
+    servers = []
+
+    def start(runner, max_pending=8, service=None):
+        service = service or server.TranscriptionService(
+            workers=1, max_pending=max_pending, runner=runner,
+            upload_folder=str(tmp_path / "uploads"),
+        )
+        service.start()
+        httpd = server.make_server(service, "127.0.0.1", 0)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append((httpd, service))
+        return f"http://127.0.0.1:{httpd.server_port}"
+
+    yield start
+    for httpd, service in servers:
+        httpd.shutdown()
+        httpd.server_close()
+        service.shutdown()
+
+
+def request(url, data=None, content_type="application/json", method=None):
+    req = urllib.request.Request(url, data=data, method=method)
+    if data is not None:
+        req.add_header("Content-Type", content_type)
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        return resp.status, resp.read()
+
+
+def submit(base, path, model="base"):
+    body = json.dumps({"path": str(path), "model": model}).encode()
+    status, payload = request(f"{base}/jobs", body)
+    return status, json.loads(payload)
+
+
+def test_submit_by_path_and_stream(running_server, tmp_path):
+    base = running_server(stub_runner())
+    audio = tmp_path / "a.wav"
+    audio.touch()
+
+    status, job = submit(base, audio)
+    assert status == 202
+
+    _, body = request(f"{base}/jobs/{job['id']}/stream")
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert [line["type"] for line in lines] == ["segment", "segment", "status"]
+    assert lines[0]["text"] == " hello"
+    assert lines[-1]["status"] == "done"
+
+    _, body = request(f"{base}/jobs/{job['id']}")
+    data = json.loads(body)
+    assert data["status"] == "done"
+    assert data["result"]["text"] == " hello world"
+
+
+def test_upload_raw_audio(running_server):
+    base = running_server(stub_runner())
+    status, payload = request(f"{base}/jobs?model=tiny&filename=clip.wav", b"RIFFdata",
+                              content_type="audio/wav")
+    job = json.loads(payload)
+    assert status == 202
+    assert job["model_name"] == "tiny"
+    assert job["path"].endswith(".wav")
+
+    request(f"{base}/jobs/{job['id']}/stream")
+    assert not os.path.exists(job["path"])
+
+
+def test_upload_with_unknown_model_is_not_saved(running_server, tmp_path):
+    base = running_server(stub_runner())
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        request(f"{base}/jobs?model=huge&filename=clip.wav", b"RIFFdata", content_type="audio/wav")
+    assert excinfo.value.code == 400
+    assert not (tmp_path / "uploads").exists()
+
+
+def test_status_waits_for_result(running_server, tmp_path):
+    service = server.TranscriptionService(workers=1, runner=stub_runner(),
+                                          upload_folder=str(tmp_path / "uploads"))
+    on_finish = service._on_finish
+
+    def slow_on_finish(job, result):
+        # The scheduler already reports the job as done at this point.
+        time.sleep(0.3)
+        on_finish(job, result)
+
+    service._on_finish = slow_on_finish
+    service.scheduler._on_finish = slow_on_finish
+    base = running_server(None, service=service)
+    audio = tmp_path / "a.wav"
+    audio.touch()
+    _, job = submit(base, audio)
+
+    deadline = time.monotonic() + 5
+    while service.scheduler.get(job["id"]).status != "done" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    _, body = request(f"{base}/jobs/{job['id']}")
+    assert json.loads(body)["result"]["text"] == " hello world"
+
+
+def test_finished_jobs_expire(tmp_path):
+    service = server.TranscriptionService(workers=1, runner=stub_runner(), result_ttl=0,
+                                          upload_folder=str(tmp_path / "uploads")).start()
+    audio = tmp_path / "a.wav"
+    audio.touch()
+    try:
+        first = service.submit(str(audio), "base")
+        list(service.iter_segments(first.id))
+        second = service.submit(str(audio), "base")
+        assert service.scheduler.get(first.id) is None
+        assert first.id not in service._records
+        assert service.scheduler.get(second.id) is not None
+    finally:
+        service.shutdown()
+
+
+def test_queue_full_returns_429(running_server, tmp_path):
+    release = threading.Event()
+    base = running_server(stub_runner(release), max_pending=1)
+    audio = tmp_path / "a.wav"
+    audio.touch()
+
+    assert submit(base, audio)[0] == 202
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        submit(base, audio)
+    assert excinfo.value.code == 429
+    assert excinfo.value.headers["Retry-After"]
+    release.set()
+
+
+def test_unknown_language_returns_400(running_server, tmp_path, monkeypatch):
+    monkeypatch.setattr("language._known_languages", lambda: {"en": "en", "english": "en"})
+    base = running_server(stub_runner())
+    audio = tmp_path / "a.wav"
+    audio.touch()
+    body = json.dumps({"path": str(audio), "language": "klingon"}).encode()
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        request(f"{base}/jobs", body)
+    assert excinfo.value.code == 400
+    assert "klingon" in json.loads(excinfo.value.read())["error"]
+    body = json.dumps({"path": str(audio), "language": "English"}).encode()
+    status, payload = request(f"{base}/jobs", body)
+    assert status == 202 and json.loads(payload)["language"] == "en"
+
+
+def test_bad_requests(running_server, tmp_path):
+    base = running_server(stub_runner())
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        submit(base, tmp_path / "missing.wav")
+    assert excinfo.value.code == 400
+    audio = tmp_path / "a.wav"
+    audio.touch()
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        submit(base, audio, model="huge")
+    assert excinfo.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        request(f"{base}/jobs/nope")
+    assert excinfo.value.code == 404
+
+
+@pytest.mark.parametrize("body", [
+    [], "x", 3,
+    {"device": "tpu"},
+    {"precision": "fp8"},
+    {"device": "cuda", "precision": "int8"},
+    {"priority": [1]},
+])
+def test_invalid_job_bodies_return_400(running_server, tmp_path, body):
+    base = running_server(stub_runner())
+    audio = tmp_path / "a.wav"
+    audio.touch()
+    if isinstance(body, dict):
+        body = {"path": str(audio), **body}
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        request(f"{base}/jobs", json.dumps(body).encode())
+    assert excinfo.value.code == 400
+    assert json.loads(excinfo.value.read())["error"]
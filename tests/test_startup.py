@@ -0,0 +1,45 @@
+import sys
+import types
+
+import startup
+
+
+def test_lazy_module_imports_on_first_use(monkeypatch):
+    fake = types.ModuleType("fake_heavy_module")
+    fake.value = 42
+    monkeypatch.setitem(sys.modules, "fake_heavy_module", fake)
+
+    lazy = startup.LazyModule("fake_heavy_module")
+    assert not lazy.loaded
+    assert lazy.value == 42
+    assert lazy.loaded
+
+
+def test_lazy_module_attributes_can_be_overridden(monkeypatch):
+    fake = types.ModuleType("fake_heavy_module")
+    fake.value = 1
+    monkeypatch.setitem(sys.modules, "fake_heavy_module", fake)
+
+    lazy = startup.LazyModule("fake_heavy_module")
+    monkeypatch.setattr(lazy, "value", 2)
+    assert lazy.value == 2
+
+
+def test_warm_up_records_ready_mark(monkeypatch):
+    fake_torch = types.ModuleType("torch")
+    fake_torch.cuda = types.SimpleNamespace(is_available=lambda: False)
+    monkeypatch.setitem(sys.modules, "torch", fake_torch)
+    monkeypatch.setattr(startup, "marks", {})
+
+    warm_up = startup.WarmUp(modules=("torch",)).start()
+    assert warm_up.wait(5)
+    assert warm_up.error is None
+    assert warm_up.gpu_available is False
+    assert "transcription_ready" in startup.marks
+
+
+def test_warm_up_reports_import_errors(monkeypatch):
+    monkeypatch.setattr(startup, "marks", {})
+    warm_up = startup.WarmUp(modules=("module_that_does_not_exist",)).start()
+    assert warm_up.wait(5)
+    assert isinstance(warm_up.error, ImportError)
@@ -0,0 +1,119 @@
+import os
+from types import SimpleNamespace
+
+import system_monitor
+from metrics import MetricsRegistry
+from system_monitor import SystemSampler, sparkline_points
+
+
+class FakeProcess:
+    def __init__(self, pid):
+        if pid == -1:
+            raise ProcessLookupError(pid)
+        self.pid = pid
+
+    def cpu_percent(self, interval=None):
+        return 5.0
+
+    def memory_info(self):
+        return SimpleNamespace(rss=1000 + self.pid)
+
+
+class FakePsutil:
+    Process = FakeProcess
+
+    def __init__(self):
+        self.load = 0.0
+
+    def cpu_percent(self, interval=None):
+        self.load += 10.0
+        return self.load
+
+    def virtual_memory(self):
+        return SimpleNamespace(percent=50.0, used=4, total=8)
+
+
+class FakeGPUtil:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def getGPUs(self):
+        self.calls += 1
+        if self.fail:
+            raise OSError("nvidia-smi not found")
+        return [SimpleNamespace(name="Fake GPU", load=0.25, memoryUsed=512.0, memoryTotal=2048.0)]
+
+
+def test_sample_reads_cpu_ram_gpu_and_watched_processes(monkeypatch):
+    monkeypatch.setattr(system_monitor, "psutil", FakePsutil())
+    monkeypatch.setattr(system_monitor, "GPUtil", FakeGPUtil())
+    system_monitor.watch_process(12345, "worker-1")
+    system_monitor.watch_process(-1, "worker-2")
+    try:
+        sample = SystemSampler().sample()
+    finally:
+        system_monitor.unwatch_process(12345)
+        system_monitor.unwatch_process(-1)
+    assert sample.cpu_percent == 10.0 and sample.ram_percent == 50.0
+    assert sample.gpu_name == "Fake GPU" and sample.gpu_load == 25.0
+    assert sample.gpu_mem_percent == 25.0
+    assert sample.error is None
+    labels = {p["label"]: p for p in sample.processes}
+    assert labels["main"]["pid"] == os.getpid()
+    assert labels["worker-1"]["rss"] == 1000 + 12345
+    # A process that is gone is left out instead of failing the sample.
+    assert "worker-2" not in labels
+
+
+def test_gpu_failure_disables_further_probes(monkeypatch):
+    gputil = FakeGPUtil(fail=True)
+    monkeypatch.setattr(system_monitor, "psutil", FakePsutil())
+    monkeypatch.setattr(system_monitor, "GPUtil", gputil)
+    sampler = SystemSampler()
+    first = sampler.sample()
+    second = sampler.sample()
+    assert "nvidia-smi" in first.error
+    assert second.error is None and second.gpu_name is None
+    assert gputil.calls == 1
+
+
+def test_history_is_bounded_and_exported(monkeypatch, tmp_path):
+    monkeypatch.setattr(system_monitor, "psutil", FakePsutil())
+    monkeypatch.setattr(system_monitor, "GPUtil", FakeGPUtil())
+    sampler = SystemSampler(history=3)
+    assert sampler.latest() is None
+    for _ in range(5):
+        sampler._samples.append(sampler.sample())
+    assert sampler.history("cpu_percent") == [30.0, 40.0, 50.0]
+    assert sampler.latest().cpu_percent == 50.0
+
+    registry = MetricsRegistry(str(tmp_path / "metrics.json"), sampler=sampler)
+    summary = registry.summary()
+    assert summary["system"]["peaks"]["cpu_percent"] == 50.0
+    assert summary["system"]["samples"] == 3
+    prom = registry.to_prometheus()
+    assert 'whisper_gui_system_usage_percent{resource="cpu"} 50.0' in prom
+    assert 'whisper_gui_system_usage_percent{resource="gpu"} 25.0' in prom
+    assert f'process="main",pid="{os.getpid()}"' in prom
+
+
+def test_background_thread_collects_samples(monkeypatch):
+    monkeypatch.setattr(system_monitor, "psutil", FakePsutil())
+    monkeypatch.setattr(system_monitor, "GPUtil", FakeGPUtil())
+    sampler = SystemSampler(interval=0.01, history=10).start()
+    try:
+        for _ in range(200):
+            if len(sampler.samples()) >= 2:
+                break
+            sampler._stop.wait(0.01)
+    finally:
+        sampler.stop()
+    assert len(sampler.samples()) >= 2
+
+
+def test_sparkline_points():
+    assert sparkline_points([50], 100, 20) == []
+    assert sparkline_points([0, None, 100], 100, 20) == [0.0, 20.0, 50.0, 20.0, 100.0, 0.0]
+    # Values above the scale stretch it instead of leaving the canvas.
+    assert sparkline_points([0, 200], 10, 10) == [0.0, 10.0, 10.0, 0.0]
@@ -10,46 +10,74 @@ sys.modules.setdefault('GPUtil', mock.MagicMock())
 sys.modules.setdefault('fpdf', mock.MagicMock())
 
 import builtins
+from types import SimpleNamespace
+
+import pytest
+
+import events
 import transcriber
 import ui
 
 
-def test_check_requirements_all_present():
-    original_import = builtins.__import__
+def _cpu_setup(monkeypatch, seconds=1):
+    """A CPU machine with the model downloaded and ``seconds`` of silent audio."""
+    monkeypatch.setattr(transcriber, 'VAD_ENABLED', False)
+    mock_cuda = mock.MagicMock()
+    mock_cuda.is_available.return_value = False
+    monkeypatch.setattr(transcriber.torch, 'cuda', mock_cuda)
+    monkeypatch.setattr(transcriber.os.path, 'isfile', lambda path: True)
+    fake_whisper = mock.MagicMock()
+    fake_whisper.audio.SAMPLE_RATE = 16000
+    monkeypatch.setattr(transcriber, 'whisper', fake_whisper)
+    load = mock.MagicMock(return_value=[0.0] * int(16000 * seconds))
+    monkeypatch.setattr(transcriber, 'load_audio', load)
+    return load
 
-    def import_mock(name, globals=None, locals=None, fromlist=(), level=0):
-        if name in ("psutil", "GPUtil", "fpdf"):
-            return mock.MagicMock()
-        return original_import(name, globals, locals, fromlist, level)
 
-    with mock.patch('builtins.__import__', side_effect=import_mock):
-        assert transcriber.check_requirements() == []
+@pytest.fixture
+def cpu_job(monkeypatch):
+    """_cpu_setup plus a pooled model; tests set ``model.transcribe``."""
+    load = _cpu_setup(monkeypatch)
+    model = mock.MagicMock()
+    pool = mock.MagicMock()
+    pool.using.return_value.__enter__.return_value = model
+    pool.contains.return_value = False
+    monkeypatch.setattr(transcriber, 'get_pool', lambda: pool)
+    return SimpleNamespace(model=model, pool=pool, load_audio=load, q=transcriber.queue.Queue(),
+                           stop_event=transcriber.threading.Event())
 
 
-def test_check_requirements_missing_psutil():
-    original_import = builtins.__import__
+def drain(q):
+    return [q.get_nowait() for _ in range(q.qsize())]
 
-    def import_mock(name, globals=None, locals=None, fromlist=(), level=0):
-        if name == "psutil":
-            raise ImportError()
-        if name in ("GPUtil", "fpdf"):
-            return mock.MagicMock()
-        return original_import(name, globals, locals, fromlist, level)
 
-    with mock.patch('builtins.__import__', side_effect=import_mock):
+def test_check_requirements_all_present():
+    with mock.patch('transcriber.module_available', return_value=True):
+        assert transcriber.check_requirements() == []
+
+
+def test_check_requirements_missing_psutil():
+    with mock.patch('transcriber.module_available', side_effect=lambda name: name != "psutil"):
         assert transcriber.check_requirements() == ["psutil"]
 
 
 def test_check_requirements_missing_all():
+    with mock.patch('transcriber.module_available', return_value=False):
+        assert transcriber.check_requirements() == ["psutil", "gputil", "fpdf"]
+
+
+def test_check_requirements_does_not_import(monkeypatch):
+    monkeypatch.setattr('config.importlib.util.find_spec', lambda name: None)
+    imported = []
     original_import = builtins.__import__
 
-    def import_mock(name, globals=None, locals=None, fromlist=(), level=0):
-        if name in ("psutil", "GPUtil", "fpdf"):
-            raise ImportError()
-        return original_import(name, globals, locals, fromlist, level)
+    def import_mock(name, *args, **kwargs):
+        imported.append(name)
+        return original_import(name, *args, **kwargs)
 
     with mock.patch('builtins.__import__', side_effect=import_mock):
         assert transcriber.check_requirements() == ["psutil", "gputil", "fpdf"]
+    assert not {"psutil", "GPUtil", "fpdf"} & set(imported)
 
 
 def test_install_requirements_installs_only_missing():
@@ -104,13 +132,14 @@ def test_get_installed_models(tmp_path, monkeypatch):
     assert sorted(models) == ['base', 'medium']
 
 
-def test_download_model_uses_load_model(monkeypatch):
+def test_download_model_streams_checkpoint_without_loading(monkeypatch):
     mock_load = mock.MagicMock()
+    mock_fetch = mock.MagicMock(return_value='base.pt')
     monkeypatch.setattr(transcriber, 'whisper', mock.MagicMock(load_model=mock_load))
-    monkeypatch.setattr(transcriber, 'messagebox', mock.MagicMock(askyesno=mock.MagicMock(return_value=False)))
-    monkeypatch.setattr(transcriber, 'filedialog', mock.MagicMock())
-    transcriber.download_model('base')
-    mock_load.assert_called_once_with('base', device='cpu', download_root=transcriber.MODEL_FOLDER)
+    monkeypatch.setattr(transcriber.downloader, 'download_model', mock_fetch)
+    assert transcriber.download_model('base') == 'base.pt'
+    mock_fetch.assert_called_once_with('base', progress=None, stop_event=None)
+    mock_load.assert_not_called()
 
 def test_get_installed_models_empty(monkeypatch, tmp_path):
     monkeypatch.setattr(transcriber, 'MODEL_FOLDER', str(tmp_path))
@@ -129,5 +158,243 @@ def test_run_transcription_warns_when_model_missing(monkeypatch, tmp_path):
 
     transcriber.run_transcription(q, stop_event, 'base', tmp_path / 'audio.mp3')
     message = q.get_nowait()
-    assert message[0] == 'Warning'
-    assert 'Model bulunamadı' in message[1]
+    assert isinstance(message, events.Warn)
+    assert 'Model bulunamadı' in message.text
+
+
+def test_run_transcription_finds_aliased_checkpoint(monkeypatch, tmp_path):
+    q = transcriber.queue.Queue()
+    monkeypatch.setattr(transcriber.torch, 'cuda', mock.MagicMock(is_available=lambda: False))
+    monkeypatch.setattr(transcriber, 'MODEL_FOLDER', str(tmp_path))
+    # "large" is downloaded as large-v3.pt.
+    (tmp_path / 'large-v3.pt').touch()
+    looked_up = []
+
+    def lookup(model_name, audio_file, options):
+        looked_up.append(model_name)
+        raise RuntimeError('stop here')
+
+    monkeypatch.setattr(transcriber, '_cache_lookup', lookup)
+    transcriber.run_transcription(q, transcriber.threading.Event(), 'large', tmp_path / 'audio.mp3')
+    assert looked_up == ['large']
+    assert not any(isinstance(m, events.Warn) for m in q.queue)
+
+
+def test_select_device_falls_back_to_cpu(monkeypatch):
+    mock_cuda = mock.MagicMock()
+    mock_cuda.is_available.return_value = False
+    monkeypatch.setattr(transcriber.torch, 'cuda', mock_cuda)
+    assert transcriber.select_device() == 'cpu'
+    assert transcriber.select_device('auto') == 'cpu'
+    try:
+        transcriber.select_device('cuda')
+    except RuntimeError as e:
+        assert 'CUDA' in str(e)
+    else:
+        raise AssertionError('cuda should be rejected without a GPU')
+
+
+def test_select_precision_defaults():
+    assert transcriber.select_precision('cuda') == 'fp16'
+    assert transcriber.select_precision('cpu') == 'fp32'
+    assert transcriber.select_precision('cpu', 'int8') == 'int8'
+
+
+def test_run_transcription_on_cpu_reports_rtf(cpu_job, tmp_path):
+    cpu_job.load_audio.return_value = [0.0] * 32000
+    model = cpu_job.model
+    model.transcribe.return_value = {'segments': [{'start': 0.0, 'end': 2.0, 'text': 'hello'}]}
+
+    transcriber.run_transcription(cpu_job.q, cpu_job.stop_event, 'base', tmp_path / 'audio.wav',
+                                  precision='int8', stream=False)
+
+    cpu_job.pool.using.assert_called_once_with('base', 'cpu', 'int8')
+    model.transcribe.assert_called_once()
+    assert model.transcribe.call_args.kwargs['fp16'] is False
+    messages = drain(cpu_job.q)
+    result = [m for m in messages if isinstance(m, events.Result)][0].result
+    assert result['device'] == 'cpu'
+    assert result['audio_duration'] == 2.0
+    assert 'rtf' in result
+    job_metrics = [m for m in messages if isinstance(m, events.Metrics)][0].metrics
+    assert job_metrics.device == 'cpu'
+    assert job_metrics.audio_seconds == 2.0
+    assert job_metrics.segments == 1
+
+
+def test_iter_segments_offsets_and_reseeks():
+    model = mock.MagicMock()
+    model.transcribe.side_effect = [
+        {'language': 'en', 'segments': [
+            {'start': 0.0, 'end': 4.0, 'text': ' one'},
+            {'start': 4.0, 'end': 9.5, 'text': ' cut'},
+        ]},
+        {'segments': [{'start': 0.0, 'end': 3.0, 'text': ' two'}]},
+    ]
+    audio = [0.0] * 12
+    segments = list(transcriber.iter_segments(model, audio, sample_rate=1, window_seconds=10))
+
+    assert segments == [
+        {'start': 0.0, 'end': 4.0, 'text': ' one'},
+        {'start': 4.0, 'end': 7.0, 'text': ' two'},
+    ]
+    second_call = model.transcribe.call_args_list[1]
+    assert len(second_call.args[0]) == 8
+    assert second_call.kwargs['language'] == 'en'
+    assert second_call.kwargs['initial_prompt'] == ' one'
+
+
+def test_run_transcription_streams_segments(cpu_job, tmp_path):
+    cpu_job.model.transcribe.return_value = {'segments': [
+        {'start': 0.0, 'end': 0.5, 'text': ' hi'},
+        {'start': 0.5, 'end': 1.0, 'text': ' there'},
+    ]}
+
+    transcriber.run_transcription(cpu_job.q, cpu_job.stop_event, 'base', tmp_path / 'audio.wav', stream=True)
+
+    messages = drain(cpu_job.q)
+    kinds = [type(m).__name__ for m in messages]
+    assert kinds.count('Segment') == 2
+    assert kinds.index('Segment') < kinds.index('Result')
+    result = messages[kinds.index('Result')].result
+    assert result['text'] == ' hi there'
+    assert result['streamed'] is True
+
+
+def test_run_transcription_stops_between_windows(cpu_job, tmp_path):
+    cpu_job.load_audio.return_value = [0.0] * 16000 * 120
+
+    def fake_transcribe(audio, **kwargs):
+        cpu_job.stop_event.set()  # user presses Stop while the first window decodes
+        return {'segments': [{'start': 0.0, 'end': 30.0, 'text': ' partial'}]}
+
+    cpu_job.model.transcribe.side_effect = fake_transcribe
+
+    transcriber.run_transcription(cpu_job.q, cpu_job.stop_event, 'base', tmp_path / 'audio.wav')
+
+    assert cpu_job.model.transcribe.call_count == 1
+    messages = drain(cpu_job.q)
+    stopped = [m for m in messages if isinstance(m, events.Stopped)]
+    assert stopped and stopped[0].result['text'] == ' partial'
+    assert not [m for m in messages if isinstance(m, events.Result)]
+
+
+def test_run_transcription_returns_cached_result(cpu_job, monkeypatch, tmp_path):
+    from result_cache import ResultCache
+
+    audio = tmp_path / 'audio.wav'
+    audio.write_bytes(b'RIFF....')
+    cache = ResultCache(folder=str(tmp_path / 'cache'))
+    monkeypatch.setattr(transcriber, 'get_result_cache', lambda: cache)
+    options = {'precision': 'fp32', 'window': transcriber.STREAM_WINDOW_SECONDS}
+    cache.put(transcriber.hash_file(str(audio)), 'base', options, {
+        'text': ' cached', 'segments': [{'start': 0.0, 'end': 1.0, 'text': ' cached'}],
+    })
+
+    transcriber.run_transcription(cpu_job.q, cpu_job.stop_event, 'base', str(audio), stream=True)
+
+    cpu_job.pool.using.assert_not_called()
+    messages = drain(cpu_job.q)
+    assert [type(m).__name__ for m in messages] == ['Segment', 'Log', 'Result']
+    assert messages[-1].result['cached'] is True
+
+
+def test_run_transcription_pinned_language_skips_detection(cpu_job, monkeypatch, tmp_path):
+    detect = mock.MagicMock()
+    monkeypatch.setattr(transcriber, 'detect_languages', detect)
+    cpu_job.model.transcribe.return_value = {'segments': [{'start': 0.0, 'end': 1.0, 'text': ' merhaba'}]}
+
+    transcriber.run_transcription(cpu_job.q, cpu_job.stop_event, 'base', tmp_path / 'audio.wav', language='TR')
+
+    detect.assert_not_called()
+    assert cpu_job.model.transcribe.call_args.kwargs['language'] == 'tr'
+    messages = drain(cpu_job.q)
+    result = [m for m in messages if isinstance(m, events.Result)][0].result
+    assert result['language'] == 'tr'
+
+
+def test_run_transcription_detects_language_once(cpu_job, monkeypatch, tmp_path):
+    cpu_job.load_audio.return_value = [0.0] * 16000 * 70
+    detect = mock.MagicMock(return_value=['de'])
+    monkeypatch.setattr(transcriber, 'detect_languages', detect)
+    model = cpu_job.model
+    model.transcribe.return_value = {'segments': [{'start': 0.0, 'end': 1.0, 'text': ' hallo'}]}
+
+    transcriber.run_transcription(cpu_job.q, cpu_job.stop_event, 'base', tmp_path / 'audio.wav', stream=False)
+
+    detect.assert_called_once()
+    assert model.transcribe.call_count == 3
+    assert all(call.kwargs['language'] == 'de' for call in model.transcribe.call_args_list)
+
+
+def _two_model_pool(monkeypatch, models):
+    pool = mock.MagicMock()
+    pool.contains.return_value = False
+
+    def using(model_name, device, precision):
+        ctx = mock.MagicMock()
+        ctx.__enter__.return_value = models[model_name]
+        return ctx
+
+    pool.using.side_effect = using
+    monkeypatch.setattr(transcriber, 'get_pool', lambda: pool)
+    return pool
+
+
+def _preview_setup(monkeypatch):
+    load = _cpu_setup(monkeypatch, seconds=4)
+    monkeypatch.setattr(transcriber, 'detect_languages', mock.MagicMock(return_value=['en']))
+    return load
+
+
+def test_preview_then_refine_shares_audio_and_replaces_draft(monkeypatch, tmp_path):
+    load = _preview_setup(monkeypatch)
+    draft_model = mock.MagicMock()
+    draft_model.transcribe.return_value = {'segments': [{'start': 0.0, 'end': 2.0, 'text': ' helo'},
+                                                         {'start': 2.0, 'end': 4.0, 'text': ' wrld'}]}
+    final_model = mock.MagicMock()
+    final_model.transcribe.return_value = {'segments': [{'start': 0.0, 'end': 4.0, 'text': ' hello world'}]}
+    pool = _two_model_pool(monkeypatch, {'tiny': draft_model, 'large-v3': final_model})
+    q = transcriber.queue.Queue()
+
+    transcriber.run_transcription(q, transcriber.threading.Event(), 'large-v3', tmp_path / 'a.wav',
+                                  use_cache=False, preview_model='tiny')
+
+    load.assert_called_once()
+    assert [call.args[0] for call in pool.using.call_args_list] == ['tiny', 'large-v3']
+    assert final_model.transcribe.call_args.kwargs['language'] == 'en'
+    messages = drain(q)
+    segments = [(m.segment['text'], m.draft) for m in messages if isinstance(m, events.Segment)]
+    assert segments == [(' helo', True), (' wrld', True), (' hello world', False)]
+    results = [m for m in messages if isinstance(m, events.Result)]
+    assert len(results) == 1 and results[0].result['text'] == ' hello world'
+    assert not [m for m in messages if isinstance(m, (events.Warn, events.Error))]
+    # The job is counted once in the metrics totals.
+    assert len([m for m in messages if isinstance(m, events.Metrics)]) == 1
+
+
+def test_stopping_the_refine_pass_keeps_the_draft(monkeypatch, tmp_path):
+    _preview_setup(monkeypatch)
+    stop_event = transcriber.threading.Event()
+    draft_model = mock.MagicMock()
+    draft_model.transcribe.return_value = {'segments': [{'start': 0.0, 'end': 2.0, 'text': ' one'},
+                                                         {'start': 2.0, 'end': 4.0, 'text': ' two'}]}
+
+    def refine(audio, **kwargs):
+        stop_event.set()  # the user keeps the draft while refining
+        return {'segments': [{'start': 0.0, 'end': 1.5, 'text': ' One'}, {'start': 1.5, 'end': 1.8, 'text': '.'}]}
+
+    final_model = mock.MagicMock()
+    final_model.transcribe.side_effect = refine
+    _two_model_pool(monkeypatch, {'tiny': draft_model, 'large-v3': final_model})
+    q = transcriber.queue.Queue()
+
+    transcriber.run_transcription(q, stop_event, 'large-v3', tmp_path / 'a.wav', use_cache=False,
+                                  preview_model='tiny')
+
+    messages = drain(q)
+    stopped = [m for m in messages if isinstance(m, events.Stopped)]
+    assert len(stopped) == 1
+    assert stopped[0].result['text'] == ' One. two'
+    assert stopped[0].result['streamed'] is True
+    assert not [m for m in messages if isinstance(m, events.Result)]
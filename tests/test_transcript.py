@@ -0,0 +1,108 @@
+import pytest
+
+from transcript import TranscriptModel, format_timestamp, parse_timestamp
+
+
+def test_counts_are_kept_incrementally():
+    model = TranscriptModel()
+    model.append({"start": 0.0, "end": 2.0, "text": " Hello there."})
+    model.append({"start": 2.0, "end": 3.0, "text": "  "})
+    model.extend([{"start": 3.0, "end": 5.0, "text": " General Kenobi"}])
+    assert model.char_count == len("Hello there. General Kenobi")
+    assert model.word_count == 4
+    assert model.text() == "Hello there.   General Kenobi"
+    assert len(model) == 3
+
+
+def test_add_result_without_segments_and_clear():
+    model = TranscriptModel()
+    model.add_result({"text": " plain text"})
+    assert model.lines(0, 10) == ["[00:00] plain text"]
+    version = model.version
+    model.clear()
+    assert len(model) == 0 and model.char_count == 0 and model.version > version
+
+
+def test_index_at_time_and_line_window():
+    model = TranscriptModel()
+    model.extend({"start": i * 10.0, "end": i * 10.0 + 10, "text": f" s{i}"} for i in range(100_000))
+    assert model.index_at_time(0) == 0
+    assert model.index_at_time(15) == 1
+    assert model.index_at_time(3725) == 372
+    assert model.index_at_time(10 ** 9) == 99_999
+    assert model.lines(372, 374) == ["[1:02:00] s372", "[1:02:10] s373"]
+    assert model.lines(99_999, 100_050) == ["[277:46:30] s99999"]
+
+
+def test_timestamps_round_trip():
+    assert format_timestamp(75) == "01:15"
+    assert parse_timestamp("1:15") == 75
+    assert parse_timestamp("1:02:03") == 3723
+    assert parse_timestamp("42") == 42
+    for bad in ("", "a:b", "1::2", "1:2:3:4"):
+        with pytest.raises(ValueError):
+            parse_timestamp(bad)
+
+
+def test_refined_segments_replace_drafts_in_place():
+    model = TranscriptModel()
+    model.extend([{"start": 0.0, "end": 2.0, "text": " helo"},
+                  {"start": 2.0, "end": 4.0, "text": " wrld"},
+                  {"start": 4.0, "end": 6.0, "text": " agian"}], key="a", draft=True)
+    model.append({"start": 0.0, "end": 1.0, "text": " other job"}, key="b")
+
+    model.refine("a", {"start": 0.0, "end": 3.5, "text": " hello world"})
+    assert model.text() == "hello world agian other job"
+    assert [model.is_draft(i) for i in range(len(model))] == [False, True, False]
+    assert model.char_count == len("hello world agian other job")
+    assert model.word_count == 5
+
+    model.refine("a", {"start": 3.5, "end": 6.0, "text": " again"})
+    assert model.text() == "hello world again other job"
+    assert not any(model.is_draft(i) for i in range(len(model)))
+    # With no drafts left, refined segments go to the end of their job.
+    model.refine("a", {"start": 6.0, "end": 7.0, "text": " more"})
+    assert model.lines(0, 4) == ["[00:00] hello world", "[00:03] again", "[00:06] more", "[00:00] other job"]
+    assert model.index_at_time(3.6, index=0) == 1
+
+
+def test_drafts_left_after_refining_are_dropped_or_kept():
+    model = TranscriptModel()
+    drafts = [{"start": float(i), "end": i + 1.0, "text": f" d{i}"} for i in range(4)]
+    model.extend(drafts, key="a", draft=True)
+    model.extend(drafts, key="b", draft=True)
+    model.refine("a", {"start": 0.0, "end": 2.0, "text": " A"})
+    model.refine("b", {"start": 0.0, "end": 1.0, "text": " B"})
+    assert model.text() == "A d2 d3 B d1 d2 d3"
+
+    # The refine pass finished before the end of the draft.
+    assert model.drop_drafts("a") == 2
+    assert model.text() == "A B d1 d2 d3"
+    # The refine pass was stopped: the rest of the draft becomes final.
+    assert model.keep_drafts("b") == 3
+    assert not any(model.is_draft(i) for i in range(len(model)))
+    assert model.drop_drafts("b") == 0
+    assert model.char_count == len("A B d1 d2 d3")
+
+
+def test_concurrent_jobs_keep_their_own_blocks():
+    model = TranscriptModel()
+    for i in range(3):
+        model.append({"start": i * 5.0, "end": i * 5.0 + 5, "text": f" a{i}"}, key="a")
+        model.append({"start": i * 2.0, "end": i * 2.0 + 2, "text": f" b{i}"}, key="b")
+    assert model.text() == "a0 a1 a2 b0 b1 b2"
+    # Each job keeps its own timeline.
+    assert model.index_at_time(6.0, index=0) == 1
+    assert model.index_at_time(3.0) == 4
+    assert model.lines(3, 4) == ["[00:00] b0"]
+
+
+def test_set_text_updates_counts():
+    model = TranscriptModel()
+    model.extend([{"start": 0.0, "end": 1.0, "text": " helo"}, {"start": 1.0, "end": 2.0, "text": " there"}])
+    copy = model.segments()
+    model.set_text(0, " hello big")
+    assert model.text() == "hello big there"
+    assert model.char_count == len("hello big there")
+    assert model.word_count == 3
+    assert copy[0]["text"] == " helo"
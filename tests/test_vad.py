@@ -0,0 +1,96 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import vad
+from vad import SpeechAudio, speech_regions
+
+SR = 16000
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SR), dtype=np.float32) / SR
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(seconds * SR)) * 1e-4).astype(np.float32)
+
+
+def test_speech_regions_find_loud_parts_with_padding():
+    audio = np.concatenate([silence(5), tone(3), silence(0.3), tone(1), silence(6), tone(2), silence(4)])
+    regions = speech_regions(audio, SR)
+    # The short pause stays inside the first region; edges are padded.
+    assert len(regions) == 2
+    (s1, e1), (s2, e2) = regions
+    assert abs(s1 / SR - 4.8) < 0.05 and abs(e1 / SR - 9.5) < 0.05
+    assert abs(s2 / SR - 15.1) < 0.05 and abs(e2 / SR - 17.5) < 0.05
+
+
+def test_short_blips_and_silence_are_dropped():
+    assert speech_regions(silence(10), SR) == []
+    blip = np.concatenate([silence(2), tone(0.1), silence(2)])
+    assert speech_regions(blip, SR) == []
+    assert speech_regions(np.zeros(0, dtype=np.float32), SR) == []
+
+
+def test_blocks_cover_long_audio(monkeypatch):
+    monkeypatch.setattr(vad, "BLOCK_SECONDS", 1)
+    audio = np.concatenate([silence(2.5), tone(2), silence(2.5)])
+    energy = vad.frame_energy(audio, SR)
+    assert len(energy) == -(-len(audio) // 480)
+    (start, end), = speech_regions(audio, SR)
+    assert abs(start / SR - 2.3) < 0.05 and abs(end / SR - 4.7) < 0.05
+
+
+def test_speech_audio_joins_regions_and_maps_times_back():
+    audio = np.arange(100 * SR, dtype=np.float32)
+    speech = SpeechAudio(audio, [(10 * SR, 20 * SR), (50 * SR, 55 * SR)], SR)
+    assert len(speech) == 15 * SR
+    assert speech.skipped_fraction == pytest.approx(0.85)
+    joined = speech[9 * SR:11 * SR]
+    assert joined[0] == 19 * SR and joined[-1] == 51 * SR - 1
+    assert len(speech[14 * SR:20 * SR]) == SR
+    assert speech.to_original(2.0) == 12.0
+    assert speech.to_original(10.0) == 50.0
+    assert speech.to_original(10.0, end=True) == 20.0
+    assert speech.remap({"start": 9.5, "end": 12.0, "text": " x"}) == {"start": 19.5, "end": 52.0, "text": " x"}
+
+
+def test_run_transcription_skips_silence(monkeypatch, tmp_path):
+    from unittest import mock
+    import sys
+
+    sys.modules.setdefault("torch", mock.MagicMock())
+    sys.modules.setdefault("whisper", mock.MagicMock())
+    import events
+    import transcriber
+
+    q = transcriber.queue.Queue()
+    monkeypatch.setattr(transcriber, "VAD_ENABLED", True)
+    monkeypatch.setattr(transcriber.torch, "cuda", mock.MagicMock(is_available=mock.MagicMock(return_value=False)))
+    monkeypatch.setattr(transcriber.os.path, "isfile", lambda path: True)
+    audio = np.concatenate([silence(20), tone(5), silence(15)])
+    monkeypatch.setattr(transcriber, "load_audio", mock.MagicMock(return_value=audio))
+    fake_whisper = mock.MagicMock()
+    fake_whisper.audio.SAMPLE_RATE = SR
+    monkeypatch.setattr(transcriber, "whisper", fake_whisper)
+    model = mock.MagicMock()
+    model.transcribe.return_value = {"segments": [{"start": 0.5, "end": 4.0, "text": " hello"}]}
+    pool = mock.MagicMock()
+    pool.using.return_value.__enter__.return_value = model
+    pool.contains.return_value = False
+    monkeypatch.setattr(transcriber, "get_pool", lambda: pool)
+
+    transcriber.run_transcription(q, transcriber.threading.Event(), "base", tmp_path / "a.wav",
+                                  stream=False, use_cache=False)
+
+    sent = model.transcribe.call_args.args[0]
+    assert len(sent) == pytest.approx(5.4 * SR, abs=0.1 * SR)
+    messages = [q.get_nowait() for _ in range(q.qsize())]
+    result = [m for m in messages if isinstance(m, events.Result)][0].result
+    assert result["segments"][0]["start"] == pytest.approx(20.3, abs=0.05)
+    job_metrics = [m for m in messages if isinstance(m, events.Metrics)][0].metrics
+    assert job_metrics.audio_seconds == 40.0
+    assert job_metrics.skipped_fraction == pytest.approx(1 - 5.4 / 40, abs=0.01)
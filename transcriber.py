@@ -3,12 +3,35 @@ import sys
 import queue
 import threading
 import subprocess
-import torch
-import whisper
+import gc
 import time  # Eksik import tamamlandı
-from tkinter import messagebox, filedialog
 
-from config import MODEL_FOLDER, MODEL_REQUIREMENTS, MODEL_LIST
+from config import (
+    module_available,
+    MODEL_FOLDER,
+    MODEL_REQUIREMENTS,
+    MODEL_LIST,
+    CPU_THREADS,
+    CPU_INTEROP_THREADS,
+    STREAM_SEGMENTS,
+    STREAM_WINDOW_SECONDS,
+    VAD_ENABLED,
+    PREVIEW_MODEL,
+)
+from model_pool import get_pool
+import downloader
+from model_registry import checkpoint_name, get_registry
+from result_cache import get_result_cache, hash_file
+from audio_cache import load_audio
+from vad import SpeechAudio, speech_regions, vad_settings
+from language import detect_languages, normalize as normalize_language
+from metrics import StageRecorder, format_metrics
+from events import Log, Warn, Error, Segment, Result, Stopped, Metrics
+from startup import LazyModule
+
+# torch and whisper take seconds to import; load them on first use.
+torch = LazyModule("torch")
+whisper = LazyModule("whisper")
 os.makedirs(MODEL_FOLDER, exist_ok=True)  # Ensure model folder exists
 
 
@@ -18,30 +41,19 @@ def ensure_model_folder():
 
 
 def get_installed_models():
-    """MODEL_FOLDER içindeki .pt veya .bin uzantılı dosyalardan model adlarını döndür."""
-    models = []
-    if os.path.isdir(MODEL_FOLDER):
-        for fname in os.listdir(MODEL_FOLDER):
-            base, ext = os.path.splitext(fname)
-            if ext in {".pt", ".bin"}:
-                models.append(base)
-    return models
+    """MODEL_FOLDER içindeki .pt veya .bin modellerin adlarını kayıt defterinden döndür."""
+    return get_registry(MODEL_FOLDER).installed()
 
 
 
 def check_requirements():
+    """Report missing optional packages without importing them."""
     missing_modules = []
-    try:
-        import psutil
-    except ImportError:
+    if not module_available("psutil"):
         missing_modules.append("psutil")
-    try:
-        import GPUtil
-    except ImportError:
+    if not module_available("GPUtil"):
         missing_modules.append("gputil")
-    try:
-        import fpdf
-    except ImportError:
+    if not module_available("fpdf"):
         missing_modules.append("fpdf")
     return missing_modules
 
@@ -67,52 +79,328 @@ def install_requirements(packages=None):
             pkg,
         ], capture_output=True, text=True)
 
-def run_transcription(q, stop_evt, model_name, audio_file):
+_interop_configured = False
+
+
+def select_device(preferred=None):
+    """Pick the execution device: 'cuda' when available, otherwise 'cpu'."""
+    if preferred in (None, "", "auto"):
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    if preferred == "cuda" and not torch.cuda.is_available():
+        raise RuntimeError("No NVIDIA CUDA GPU found! Select the CPU device instead.")
+    return preferred
+
+
+def select_precision(device, precision=None):
+    """FP16 on the GPU, FP32 on the CPU unless int8 is requested."""
+    if precision:
+        if precision == "int8" and device != "cpu":
+            raise RuntimeError("int8 quantization is only available on the CPU.")
+        return precision
+    return "fp16" if device == "cuda" else "fp32"
+
+
+def configure_cpu_threads(intra=None, inter=None):
+    """Set torch's intra-op and inter-op thread counts for CPU inference."""
+    global _interop_configured
+    torch.set_num_threads(intra or CPU_THREADS)
+    # The inter-op pool can only be sized once per process.
+    if not _interop_configured:
+        try:
+            torch.set_num_interop_threads(inter or CPU_INTEROP_THREADS)
+        except RuntimeError:
+            pass
+        _interop_configured = True
+
+
+def iter_segments(model, audio, sample_rate=16000, window_seconds=STREAM_WINDOW_SECONDS,
+                  stop_evt=None, **options):
+    """Transcribe ``audio`` window by window, yielding segments as they finish.
+
+    Each window is decoded with ``model.transcribe``. Unless it is the last
+    window, its final segment may be cut mid-sentence, so it is dropped and
+    the next window starts where that segment began, the same way Whisper
+    moves its own seek position. Segment times are relative to the whole
+    audio. The language detected in the first window is reused afterwards.
+
+    ``stop_evt`` is checked before every window, so a stop request ends the
+    loop after at most one more window.
+    """
+    window = int(window_seconds * sample_rate)
+    total = len(audio)
+    seek = 0
+    prompt = options.pop("initial_prompt", None)
+    while seek < total:
+        if stop_evt is not None and stop_evt.is_set():
+            return
+        offset = seek / sample_rate
+        result = model.transcribe(audio[seek:seek + window], initial_prompt=prompt, **options)
+        if not options.get("language") and result.get("language"):
+            options["language"] = result["language"]
+        segments = result.get("segments", [])
+
+        next_seek = seek + window
+        if next_seek < total and len(segments) > 1:
+            next_seek = seek + int(segments[-1]["start"] * sample_rate)
+            segments = segments[:-1]
+        # Always advance by at least a second so a stuck window can't loop.
+        next_seek = max(next_seek, seek + sample_rate)
+
+        for seg in segments:
+            yield {
+                "start": offset + seg["start"],
+                "end": offset + seg["end"],
+                "text": seg["text"],
+            }
+        if segments:
+            prompt = "".join(seg["text"] for seg in segments)[-200:]
+        seek = next_seek
+
+
+def _cache_lookup(model_name, audio_file, options):
+    """Return (cache, audio_hash, cached_result) for the given job."""
+    cache = get_result_cache()
+    try:
+        audio_hash = hash_file(audio_file)
+    except OSError:
+        return cache, None, None
+    return cache, audio_hash, cache.get(audio_hash, model_name, options)
+
+
+def _detect_language(q, model, audio_hash, audio):
+    """Detected (or cached) language of ``audio``; None lets Whisper detect it."""
+    try:
+        language = detect_languages(model, [(audio_hash, audio)])[0]
+    except Exception as e:
+        q.put(Log(f"Language detection failed, Whisper will detect it: {e}"))
+        return None
+    q.put(Log(f"Language: {language}"))
+    return language
+
+
+def run_transcription(q, stop_evt, model_name, audio_file, device=None, precision=None, stream=None,
+                      use_cache=True, audio=None, language=None, preview_model=None, threads=None):
+    """Transcribe one file, posting events to ``q``.
+
+    ``language`` pins the spoken language and skips detection; without it
+    the language is detected once from the first speech and cached. With
+    ``preview_model`` a draft is posted first (see run_preview_refine).
+    ``threads`` overrides CPU_THREADS for torch's thread pool on the CPU.
+    """
+    if preview_model and preview_model != model_name:
+        return run_preview_refine(q, stop_evt, model_name, audio_file, device, precision,
+                                  use_cache=use_cache, audio=audio, language=language,
+                                  preview_model=preview_model, threads=threads)
     start_time = time.time()
+    if stream is None:
+        stream = STREAM_SEGMENTS
+    language = normalize_language(language)
     try:
-        if not torch.cuda.is_available():
-            raise RuntimeError("No NVIDIA CUDA GPU found! GPU is required for this application.")
+        device = select_device(device)
+        precision = select_precision(device, precision)
+        if device == "cpu":
+            configure_cpu_threads(threads)
 
-        device = "cuda"
-        model_file_pt = os.path.join(MODEL_FOLDER, f"{model_name}.pt")
-        model_file_bin = os.path.join(MODEL_FOLDER, f"{model_name}.bin")
+        # Aliases such as "large" are downloaded under their checkpoint's name.
+        checkpoint = checkpoint_name(model_name)
+        model_file_pt = os.path.join(MODEL_FOLDER, f"{checkpoint}.pt")
+        model_file_bin = os.path.join(MODEL_FOLDER, f"{checkpoint}.bin")
 
         if not (os.path.isfile(model_file_pt) or os.path.isfile(model_file_bin)):
-            q.put(("Warning", "Model bulunamadı, lütfen önce indirin."))
+            q.put(Warn("Model bulunamadı, lütfen önce indirin."))
             return
 
-        model = whisper.load_model(model_name, device=device, download_root=MODEL_FOLDER)
-        
-        if stop_evt.is_set():
-            q.put(("StoppedBeforeTranscribe", None))
+        cache_options = {"precision": precision, "window": STREAM_WINDOW_SECONDS}
+        if VAD_ENABLED:
+            cache_options["vad"] = vad_settings()
+        if language:
+            cache_options["language"] = language
+        cache, audio_hash, cached = (None, None, None)
+        if use_cache:
+            cache, audio_hash, cached = _cache_lookup(model_name, audio_file, cache_options)
+        if cached is not None:
+            if stream:
+                for segment in cached["segments"]:
+                    q.put(Segment(segment))
+            cached["streamed"] = stream
+            cached["cached"] = True
+            q.put(Log("Result loaded from cache."))
+            q.put(Result(cached, time.time() - start_time))
             return
-        
-        q.put(("Log", "Model loaded. Starting transcription..."))
-        result = model.transcribe(audio_file)
-        
+
+        recorder = StageRecorder(model_name, device, precision)
+        pool = get_pool()
+        resident = pool.contains(model_name, device, precision)
+        if resident:
+            q.put(Log("Model reused from pool."))
+        load_start = time.perf_counter()
+        with pool.using(model_name, device, precision) as model:
+            load_seconds = time.perf_counter() - load_start
+            recorder.add("model_load", load_seconds)
+            get_registry(MODEL_FOLDER).record_use(model_name, device, precision,
+                                                  None if resident else load_seconds)
+            if stop_evt.is_set():
+                q.put(Stopped(before_start=True))
+                return
+
+            q.put(Log(f"Model loaded on {device} ({precision}). Starting transcription..."))
+            if audio is None:
+                with recorder.stage("audio_decode"):
+                    audio = load_audio(audio_file, audio_hash)
+            audio_duration = len(audio) / whisper.audio.SAMPLE_RATE
+            speech = audio
+            if VAD_ENABLED:
+                # Only speech goes to the model; times are mapped back below.
+                with recorder.stage("vad"):
+                    speech = SpeechAudio(audio, speech_regions(audio, whisper.audio.SAMPLE_RATE),
+                                         whisper.audio.SAMPLE_RATE)
+                q.put(Log(f"Silence skipped: {speech.skipped_fraction:.0%} of {audio_duration:.1f}s"))
+            speech_duration = len(speech) / whisper.audio.SAMPLE_RATE
+            transcribe_start = time.time()
+            # Decoding always goes window by window so Stop is honoured
+            # between windows; streaming only decides whether each segment
+            # is posted as soon as it is ready.
+            segments = []
+            with recorder.instrument(model):
+                if language is None:
+                    language = _detect_language(q, model, audio_hash, audio)
+                for segment in iter_segments(model, speech, whisper.audio.SAMPLE_RATE,
+                                             stop_evt=stop_evt, fp16=precision == "fp16",
+                                             language=language):
+                    if speech is not audio:
+                        segment = speech.remap(segment)
+                    segments.append(segment)
+                    if stream:
+                        q.put(Segment(segment))
+            result = {
+                "text": "".join(seg["text"] for seg in segments),
+                "segments": segments,
+                "language": language,
+                "streamed": stream,
+            }
+            del audio, speech
+
         if stop_evt.is_set():
-            q.put(("StoppedAfterTranscribe", None))
+            # Hand back whatever was decoded before the stop request.
+            gc.collect()
+            q.put(Stopped(result))
             return
-        
+
         end_time = time.time()
         duration = end_time - start_time
-        q.put(("Result", result, duration))
+        # Real-time factor: processing seconds per second of audio.
+        rtf = (end_time - transcribe_start) / audio_duration if audio_duration else 0.0
+        result["device"] = device
+        result["precision"] = precision
+        result["audio_duration"] = audio_duration
+        result["rtf"] = rtf
+        if audio_hash:
+            cache.put(audio_hash, model_name, cache_options, {
+                "text": result["text"],
+                "segments": result["segments"],
+                "language": language,
+                "audio_duration": audio_duration,
+            })
+        q.put(Log(f"Real-time factor: {rtf:.3f} ({audio_duration:.1f}s audio, {device}/{precision})"))
+        q.put(Metrics(recorder.finish(len(segments), audio_duration, speech_duration)))
+        q.put(Result(result, duration))
     except Exception as e:
-        q.put(("Error", str(e)))
+        q.put(Error(str(e)))
     finally:
-        torch.cuda.empty_cache()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+class _PassQueue:
+    """Forwards the events of one pass of run_preview_refine.
+
+    Draft segments are re-posted with ``draft=True``; the pass's result or
+    stop is kept for the caller instead of ending the job. The draft pass's
+    metrics are only logged, so the job counts once in the metrics totals.
+    """
+
+    def __init__(self, q, draft):
+        self._q = q
+        self.draft = draft
+        self.segments = []
+        self.result = None
+        self.stopped = None
+
+    def put(self, msg):
+        if isinstance(msg, Segment):
+            self.segments.append(msg.segment)
+            msg = Segment(msg.segment, draft=self.draft, job_id=msg.job_id)
+        elif isinstance(msg, Stopped):
+            self.stopped = msg
+            return
+        elif isinstance(msg, Result):
+            self.result = msg.result
+            if self.draft:
+                msg = Log(f"Draft ready in {msg.duration:.1f}s, refining...")
+        elif self.draft and isinstance(msg, (Warn, Error)):
+            # Without a draft the refine pass still runs.
+            msg = Log(f"Draft skipped: {msg.text}")
+        elif self.draft and isinstance(msg, Metrics):
+            msg = Log(f"Draft: {format_metrics(msg.metrics)}")
+        self._q.put(msg)
+
+
+def merge_refined(draft, refined):
+    """Refined segments followed by the draft segments they do not cover yet."""
+    end = refined[-1]["end"] if refined else float("-inf")
+    return list(refined) + [seg for seg in draft if seg["start"] >= end]
+
+
+def run_preview_refine(q, stop_evt, model_name, audio_file, device=None, precision=None,
+                       use_cache=True, audio=None, language=None, preview_model=PREVIEW_MODEL,
+                       threads=None):
+    """Post a quick draft from ``preview_model``, then refine it with ``model_name``.
+
+    Draft segments arrive as ``Segment(draft=True)`` and the refined ones as
+    plain Segments, which replace the drafts they cover. Both passes read
+    the same decoded, memory-mapped audio, and the refine pass finds the language the
+    draft detected in the language cache. Setting ``stop_evt`` during the refine pass keeps the draft:
+    the Stopped result holds the refined segments so far followed by the
+    rest of the draft.
+    """
+    if audio is None:
+        try:
+            audio = load_audio(audio_file)
+        except Exception as e:
+            q.put(Error(str(e)))
+            return
+    draft = _PassQueue(q, draft=True)
+    run_transcription(draft, stop_evt, preview_model, audio_file, device, precision, stream=True,
+                      use_cache=use_cache, audio=audio, language=language, threads=threads)
+    if draft.stopped is not None:
+        q.put(draft.stopped)
+        return
+
+    refine = _PassQueue(q, draft=False)
+    run_transcription(refine, stop_evt, model_name, audio_file, device, precision, stream=True,
+                      use_cache=use_cache, audio=audio, language=language, threads=threads)
+    if refine.stopped is not None:
+        segments = merge_refined(draft.segments, refine.segments)
+        q.put(Stopped({
+            "text": "".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": draft.result.get("language") if draft.result else language,
+            "streamed": True,
+            "draft_model": preview_model,
+        }))
+
 
-def transcribe(q, stop_event, model_name, selected_file):
+def transcribe(q, stop_event, model_name, selected_file, device=None, precision=None, language=None):
     stop_event.clear()
     ensure_model_folder()
     threading.Thread(
         target=run_transcription,
-        args=(q, stop_event, model_name, selected_file),
+        args=(q, stop_event, model_name, selected_file, device, precision),
+        kwargs={"language": language},
         daemon=True
     ).start()
 
 
-def download_model(model_name):
+def download_model(model_name, progress=None, stop_event=None):
     """Download the given Whisper model to MODEL_FOLDER."""
     ensure_model_folder()
-    whisper.load_model(model_name, device="cpu", download_root=MODEL_FOLDER)
+    return downloader.download_model(model_name, progress=progress, stop_event=stop_event)
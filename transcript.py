@@ -0,0 +1,229 @@
+"""Segment-backed transcript model.
+
+The UI used to keep the transcript only as text in a Tk widget and re-read
+all of it to count characters. TranscriptModel stores the segments, keeps
+character and word counts up to date as segments arrive, and finds the
+segment at a given time with a binary search, so nothing needs to touch the
+whole transcript after each update.
+
+Segments are grouped by the job they belong to, so jobs running side by
+side each get their own block instead of interleaving. Draft segments from
+a quick preview model are replaced in place as the refined segments of the
+same job arrive.
+"""
+import bisect
+import threading
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+def parse_timestamp(text):
+    """Seconds from 'SS', 'MM:SS' or 'HH:MM:SS'; raises ValueError."""
+    parts = text.strip().split(":")
+    if not parts or len(parts) > 3 or not all(p.strip() for p in parts):
+        raise ValueError(f"invalid time: {text!r}")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    if seconds < 0:
+        raise ValueError(f"invalid time: {text!r}")
+    return seconds
+
+
+class TranscriptModel:
+    """Ordered transcript segments with incremental counts.
+
+    ``char_count`` matches the displayed text: every non-empty segment
+    stripped and joined with a single space. ``version`` increases with
+    every change so views can tell when to redraw. Segments may carry a
+    ``key`` (the job they belong to) and a ``draft`` flag; the segments of
+    one key stay together, in the order their keys first appeared. A key's
+    drafts are always the last ``_drafts[key]`` segments of its block, so
+    they are found without a scan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._segments = []
+            # Per key, in block order: start times (kept sorted for
+            # index_at_time) and segment counts.
+            self._keys = []
+            self._starts = {}
+            self._sizes = {}
+            self._drafts = {}
+            self.char_count = 0
+            self.word_count = 0
+            self._chars = 0
+            self._non_empty = 0
+            self.version = getattr(self, "version", 0) + 1
+
+    def __len__(self):
+        return len(self._segments)
+
+    def __getitem__(self, index):
+        return self._segments[index]
+
+    def append(self, segment, key=None, draft=False):
+        self.extend([segment], key, draft)
+
+    def extend(self, segments, key=None, draft=False):
+        with self._lock:
+            for seg in segments:
+                pos = self._sizes.get(key, 0)
+                if not draft:
+                    pos -= self._drafts.get(key, 0)
+                self._insert(key, pos, seg, draft)
+            self.version += 1
+
+    def refine(self, key, segment):
+        """Add a refined segment of ``key`` in place of the drafts it covers.
+
+        Drafts of ``key`` that start before the refined segment ends are
+        removed and the segment takes the place of the first of them, or
+        goes before the remaining drafts. Without drafts it is appended.
+        """
+        with self._lock:
+            pos = self._sizes.get(key, 0) - self._drafts.get(key, 0)
+            if self._drafts.get(key):
+                # Drafts are in time order, so the covered ones come first.
+                offset, end = self._offset(key), float(segment.get("end", 0.0))
+                while self._drafts[key] and self._segments[offset + pos]["start"] < end:
+                    self._remove(key, pos)
+            self._insert(key, pos, segment, False)
+            self.version += 1
+
+    def drop_drafts(self, key):
+        """Remove the drafts of ``key`` no refined segment replaced."""
+        with self._lock:
+            count = self._drafts.get(key, 0)
+            for _ in range(count):
+                self._remove(key, self._sizes[key] - 1)
+            if count:
+                self.version += 1
+            return count
+
+    def keep_drafts(self, key):
+        """Turn the remaining drafts of ``key`` into final segments."""
+        with self._lock:
+            count = self._drafts.get(key, 0)
+            if count:
+                offset = self._offset(key) + self._sizes[key] - count
+                for index in range(offset, offset + count):
+                    self._segments[index] = {**self._segments[index], "draft": False}
+                self._drafts[key] = 0
+                self.version += 1
+            return count
+
+    def set_text(self, index, text):
+        """Replace the text of the segment at ``index`` (a manual edit)."""
+        with self._lock:
+            seg = self._segments[index]
+            self._count(seg, -1)
+            # A new dict, so copies handed out by segments() are unaffected.
+            self._segments[index] = seg = {**seg, "text": text}
+            self._count(seg, 1)
+            self.version += 1
+
+    def _offset(self, key):
+        """Index of the first segment of ``key``'s block."""
+        offset = 0
+        for k in self._keys:
+            if k == key:
+                return offset
+            offset += self._sizes[k]
+        return offset
+
+    def _key_at(self, index):
+        for key in self._keys:
+            if index < self._sizes[key]:
+                return key
+            index -= self._sizes[key]
+        return self._keys[-1]
+
+    def _insert(self, key, pos, seg, draft):
+        """Insert ``seg`` at position ``pos`` of ``key``'s block."""
+        if key not in self._sizes:
+            self._keys.append(key)
+            self._sizes[key] = 0
+            self._starts[key] = []
+        seg = {"start": float(seg.get("start", 0.0)), "end": float(seg.get("end", 0.0)),
+               "text": seg.get("text", ""), "key": key, "draft": draft}
+        # Keep start times sorted even if a segment arrives early.
+        starts = self._starts[key]
+        start = seg["start"]
+        if pos:
+            start = max(start, starts[pos - 1])
+        if pos < len(starts):
+            start = min(start, starts[pos])
+        self._segments.insert(self._offset(key) + pos, seg)
+        starts.insert(pos, start)
+        self._sizes[key] += 1
+        self._count(seg, 1)
+        if draft:
+            self._drafts[key] = self._drafts.get(key, 0) + 1
+
+    def _remove(self, key, pos):
+        seg = self._segments.pop(self._offset(key) + pos)
+        del self._starts[key][pos]
+        self._sizes[key] -= 1
+        self._count(seg, -1)
+        if seg["draft"]:
+            self._drafts[key] -= 1
+
+    def _count(self, seg, sign):
+        stripped = seg["text"].strip()
+        if stripped:
+            self._chars += sign * len(stripped)
+            self._non_empty += sign
+            self.word_count += sign * len(stripped.split())
+            self.char_count = self._chars + max(0, self._non_empty - 1)
+
+    def is_draft(self, index):
+        return self._segments[index]["draft"]
+
+    def add_result(self, result):
+        """Add a finished result that was not streamed segment by segment."""
+        segments = result.get("segments")
+        if segments:
+            self.extend(segments)
+        elif result.get("text", "").strip():
+            self.append({"start": 0.0, "end": 0.0, "text": result["text"]})
+
+    def index_at_time(self, seconds, index=None):
+        """Index of the segment playing at ``seconds`` (the last one starting before it).
+
+        Times are looked up in the job of the segment at ``index``, by
+        default the last job.
+        """
+        with self._lock:
+            if not self._segments:
+                return 0
+            key = self._key_at(len(self._segments) - 1 if index is None else index)
+            found = bisect.bisect_right(self._starts[key], seconds) - 1
+            return self._offset(key) + max(0, found)
+
+    def segments(self):
+        """A copy of the segment list, safe to hand to another thread."""
+        with self._lock:
+            return list(self._segments)
+
+    def line(self, index):
+        seg = self._segments[index]
+        return f"[{format_timestamp(seg['start'])}] {seg['text'].strip()}"
+
+    def lines(self, first, last):
+        return [self.line(i) for i in range(max(0, first), min(last, len(self._segments)))]
+
+    def text(self):
+        return "".join(seg["text"] for seg in self._segments).strip()
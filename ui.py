@@ -1,26 +1,34 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, simpledialog
 from tkinter import ttk
-import threading
-import queue
 import os
-import psutil
-import GPUtil
 import logging
-try:
-    import torch
-    GPU_AVAILABLE = torch.cuda.is_available()
-except Exception:
-    GPU_AVAILABLE = False
 from datetime import datetime
-from config import MODEL_LIST, TRANSCRIPT_FOLDER, MODEL_REQUIREMENTS
+import startup
+from startup import WarmUp
+from config import (
+    MODEL_LIST, TRANSCRIPT_FOLDER, MODEL_REQUIREMENTS, LOG_FILE, LIVE_EXPORT_FORMATS, PRELOAD_LAST_MODEL,
+    TRANSCRIBE_LANGUAGE, PREVIEW_MODEL,
+)
 from transcriber import (
     check_requirements,
     install_requirements,
-    transcribe,
     get_installed_models,
-    download_model,
 )
+from downloader import get_downloader, DownloadCancelled
+from model_registry import get_registry, preload_last_used
+from scheduler import JobScheduler, RUNNING, DONE, FINISHED_STATUSES
+from language import COMMON_LANGUAGES, normalize as normalize_language
+import events
+from events import EventQueue, EventPump
+from metrics import get_metrics, format_metrics
+from log_buffer import RingBufferHandler, LogFlusher, start_file_logging
+from transcript import TranscriptModel, parse_timestamp
+from exporters import ExportSession, export_segments
+from system_monitor import get_sampler, sparkline_points
+
+SPARKLINE_WIDTH = 180
+SPARKLINE_HEIGHT = 24
 
 # Dil cevirileri
 translations = {
@@ -61,7 +69,39 @@ translations = {
         "fpdf_error": "FPDF kütüphanesi yüklü mü?",
         "download_model": "Model İndir:",
         "download": "İndir",
+        "cancel_download": "İndirmeyi İptal Et",
+        "download_cancelled": "İndirme iptal edildi: {model}",
         "model_requirements": "Model Gereksinimleri",
+        "device": "Cihaz:",
+        "spoken_language": "Konuşma Dili:",
+        "cpu_int8": "CPU int8 niceleme",
+        "no_gpu_cpu_mode": "CUDA GPU bulunamadı, transkripsiyon CPU üzerinde çalışacak.",
+        "select_folder": "Klasör Seç",
+        "files_selected": "{count} dosya seçildi",
+        "queue": "Kuyruk",
+        "move_up": "Yukarı",
+        "move_down": "Aşağı",
+        "priority_up": "Öncelik +",
+        "cancel_job": "İptal",
+        "jobs_queued": "{count} iş kuyruğa eklendi",
+        "stopped_partial": "Transkripsiyon durduruldu, {count} segment korundu.",
+        "live_export": "Canlı altyazı (SRT/VTT)",
+        "preview": "Önce hızlı taslak ({model})",
+        "keep_draft": "Taslağı Koru",
+        "export_done": "Kaydedildi: {files}",
+        "export_failed": "{fmt} kaydedilemedi: {error}",
+        "job_problem": "{file}: {error}",
+        "jobs_problem_summary": "{count} iş hata veya uyarıyla bitti (ayrıntılar logda):\n{details}",
+        "window_ready": "Pencere {seconds:.2f} saniyede açıldı.",
+        "transcription_ready": "Transkripsiyon {seconds:.2f} saniyede hazır.",
+        "warm_up_failed": "Transkripsiyon kütüphaneleri yüklenemedi: {error}",
+        "preloading_model": "Son kullanılan model arka planda yükleniyor: {model} ({device})",
+        "metrics": "Ölçümler",
+        "metrics_waiting": "Henüz tamamlanan iş yok",
+        "metrics_total": "{jobs} iş, {audio:.0f} sn ses, {rate:.1f} segment/sn",
+        "go_to_time": "Zamana git",
+        "edit_segment": "Segmenti düzenle",
+        "invalid_time": "Zamanı SS, DD:SS veya SS:DD:SS biçiminde girin.",
     },
     "en": {
         "title": "Whisper GUI Transcriber",
@@ -100,7 +140,39 @@ translations = {
         "fpdf_error": "Is the FPDF library installed?",
         "download_model": "Download Model:",
         "download": "Download",
+        "cancel_download": "Cancel Download",
+        "download_cancelled": "Download cancelled: {model}",
         "model_requirements": "Model Requirements",
+        "device": "Device:",
+        "spoken_language": "Spoken Language:",
+        "cpu_int8": "CPU int8 quantization",
+        "no_gpu_cpu_mode": "No CUDA GPU found, transcription will run on the CPU.",
+        "select_folder": "Select Folder",
+        "files_selected": "{count} files selected",
+        "queue": "Queue",
+        "move_up": "Up",
+        "move_down": "Down",
+        "priority_up": "Priority +",
+        "cancel_job": "Cancel",
+        "jobs_queued": "{count} jobs queued",
+        "stopped_partial": "Transcription stopped, {count} segments kept.",
+        "live_export": "Live subtitles (SRT/VTT)",
+        "preview": "Quick draft first ({model})",
+        "keep_draft": "Keep Draft",
+        "export_done": "Saved: {files}",
+        "export_failed": "Could not save {fmt}: {error}",
+        "job_problem": "{file}: {error}",
+        "jobs_problem_summary": "{count} jobs ended with errors or warnings (details in the log):\n{details}",
+        "window_ready": "Window ready in {seconds:.2f} seconds.",
+        "transcription_ready": "Transcription ready in {seconds:.2f} seconds.",
+        "warm_up_failed": "Could not load the transcription libraries: {error}",
+        "preloading_model": "Loading the last used model in the background: {model} ({device})",
+        "metrics": "Metrics",
+        "metrics_waiting": "No finished job yet",
+        "metrics_total": "{jobs} jobs, {audio:.0f}s audio, {rate:.1f} seg/s",
+        "go_to_time": "Go to time",
+        "edit_segment": "Edit segment",
+        "invalid_time": "Enter the time as SS, MM:SS or HH:MM:SS.",
     },
 }
 
@@ -121,19 +193,128 @@ themes = {
 }
 
 
-class TextHandler(logging.Handler):
-    """Log handler to redirect logs to the Tk text widget."""
+class TranscriptView:
+    """Transcript that only draws the segments in view.
 
-    def __init__(self, text_widget):
-        super().__init__()
-        self.text_widget = text_widget
+    The Text widget holds about one screen of segments; the scrollbar and
+    mouse wheel move a window over the TranscriptModel instead of over the
+    widget's own content, so redraw cost does not grow with the transcript.
+    While scrolled to the end, new segments keep the view at the bottom.
+    Double-clicking a finished segment calls ``on_edit(index)``.
+    """
+
+    def __init__(self, parent, model, bg, fg):
+        self.model = model
+        self.frame = tk.Frame(parent, bg=bg)
+        self.scrollbar = tk.Scrollbar(self.frame, command=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(self.frame, wrap=tk.WORD, bg=bg, fg=fg, height=30)
+        self.text.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        self.text.tag_configure("current", underline=True)
+        self.text.tag_configure("draft", foreground="gray")
+        self.text.bind("<MouseWheel>", self._on_wheel)
+        self.text.bind("<Button-4>", self._on_wheel)
+        self.text.bind("<Button-5>", self._on_wheel)
+        self.text.bind("<Configure>", lambda e: self.refresh())
+        self.text.bind("<Double-Button-1>", self._on_double_click)
+        self.first = 0
+        self.follow = True
+        self.highlight = None
+        self.on_edit = None
+        self._pending = False
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def configure(self, **kwargs):
+        self.text.configure(**kwargs)
+
+    def visible_rows(self):
+        height = self.text.winfo_height()
+        line = self.text.dlineinfo("1.0")
+        if height > 1 and line:
+            return max(1, height // line[3])
+        return int(self.text.cget("height"))
+
+    def refresh(self):
+        """Redraw on the next idle moment; many updates collapse into one."""
+        if not self._pending:
+            self._pending = True
+            self.text.after_idle(self._render)
+
+    def _render(self):
+        self._pending = False
+        rows = self.visible_rows()
+        total = len(self.model)
+        if self.follow:
+            self.first = max(0, total - rows)
+        self.first = max(0, min(self.first, max(0, total - 1)))
+        lines = self.model.lines(self.first, self.first + rows)
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        # Draft lines are greyed until the refined segments replace them.
+        for row in range(len(lines)):
+            if self.model.is_draft(self.first + row):
+                self.text.tag_add("draft", f"{row + 1}.0", f"{row + 1}.end")
+        if self.highlight is not None and self.first <= self.highlight < self.first + len(lines):
+            row = self.highlight - self.first + 1
+            self.text.tag_add("current", f"{row}.0", f"{row}.end")
+        if self.follow:
+            self.text.see(tk.END)
+        self.text.configure(state=tk.DISABLED)
+        if total:
+            self.scrollbar.set(self.first / total, (self.first + len(lines)) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll_to(self, first):
+        rows = self.visible_rows()
+        total = len(self.model)
+        self.first = max(0, min(first, max(0, total - rows)))
+        self.follow = self.first + rows >= total
+        self.refresh()
+
+    def _on_scroll(self, *args):
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * len(self.model)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_rows()
+            self._scroll_to(self.first + step)
+
+    def _on_wheel(self, event):
+        up = getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0
+        self._scroll_to(self.first + (-3 if up else 3))
+        return "break"
+
+    def _on_double_click(self, event):
+        row = int(self.text.index(f"@{event.x},{event.y}").split(".")[0]) - 1
+        index = self.first + row
+        # Drafts are about to be replaced by the refine pass.
+        if self.on_edit is not None and index < len(self.model) and not self.model.is_draft(index):
+            self.on_edit(index)
+        return "break"
+
+    def go_to_time(self, seconds):
+        """Scroll so the segment playing at ``seconds`` is at the top.
+
+        The time is looked up in the job whose segments are at the top.
+        """
+        self.highlight = self.model.index_at_time(seconds, self.first)
+        self.first = self.highlight
+        self.follow = False
+        self.refresh()
+
+    def clear(self):
+        self.model.clear()
+        self.first = 0
+        self.follow = True
+        self.highlight = None
+        self.refresh()
 
-    def emit(self, record):
-        msg = self.format(record)
-        self.text_widget.insert(tk.END, msg + "\n")
-        self.text_widget.see(tk.END)
 
-
 def create_main_window():
     root = tk.Tk()
     language_var = tk.StringVar(value="en")
@@ -146,10 +327,13 @@ def create_main_window():
     # Logging setup
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
-    handler = TextHandler(None)  # placeholder, will assign widget later
+    # Records from any thread wait in a ring buffer until the Tk loop flushes them
+    handler = RingBufferHandler()
     formatter = logging.Formatter("%(message)s")
     handler.setFormatter(formatter)
     logger.addHandler(handler)
+    if LOG_FILE:
+        start_file_logging(LOG_FILE)
     
     missing_modules = check_requirements()
     if missing_modules:
@@ -157,14 +341,12 @@ def create_main_window():
         if "fpdf" in missing_modules:
             warn_msg += "\n" + lang["fpdf_missing"]
         messagebox.showwarning(lang["warning"], warn_msg)
-    global selected_file
-    selected_file = ""
-    global transcribe_thread
-    transcribe_thread = None
-    global stop_event
-    stop_event = threading.Event()
-    global q
-    q = queue.Queue()
+    global selected_files
+    selected_files = []
+    global q
+    q = EventQueue()
+    global scheduler
+    scheduler = JobScheduler(q)
 
     # Requirement info labels will be assigned later
     req_ram_label = None
@@ -173,83 +355,257 @@ def create_main_window():
     requirements_frame = None
     bottom_frame = None
 
-    def select_file():
-        global selected_file
-        selected_file = filedialog.askopenfilename(filetypes=[("Audio Files", "*.mp3 *.wav *.flac")])
-        if selected_file:
-            file_label.config(text=selected_file)
-        else:
+    def show_selection():
+        if not selected_files:
             file_label.config(text=lang["no_file_selected"])
+        elif len(selected_files) == 1:
+            file_label.config(text=selected_files[0])
+        else:
+            file_label.config(text=lang["files_selected"].format(count=len(selected_files)))
+
+    def select_file():
+        global selected_files
+        selected_files = list(filedialog.askopenfilenames(filetypes=[("Audio Files", "*.mp3 *.wav *.flac *.m4a *.ogg *.mp4")]))
+        show_selection()
+
+    def select_folder():
+        global selected_files
+        folder = filedialog.askdirectory()
+        selected_files = [folder] if folder else []
+        show_selection()
 
     def start_transcription():
-        if not selected_file:
+        if not selected_files:
             messagebox.showwarning(lang["warning"], lang["please_select_file"])
             return
         logging.info("Starting transcription")
-        transcribe(q, stop_event, model_var.get(), selected_file)
-        check_queue()
-
-    def check_queue():
+        device = device_var.get()
+        precision = "int8" if int8_var.get() and device != "cuda" else None
+        if precision == "int8":
+            device = "cpu"
         try:
-            while True:
-                msg = q.get_nowait()
-                timestamp = datetime.now().strftime("%H:%M:%S")
-                if isinstance(msg, tuple):
-                    if msg[0] == "Error":
-                        messagebox.showerror(lang["warning"], msg[1])
-                    elif msg[0] == "Warning":
-                        messagebox.showwarning(lang["warning"], msg[1])
-                    elif msg[0] == "Result":
-                        transcription_area.insert(tk.END, msg[1]["text"])
-                        update_transcription_char_count()
-                        logging.info(f"{timestamp} - " + lang["completion_time"].format(duration=msg[2]))
-                    elif msg[0] == "Log":
-                        logging.info(f"{timestamp} - {msg[1]}")
-                else:
-                    logging.info(f"{timestamp} - {msg}")
-        except queue.Empty:
-            pass
-        root.after(100, check_queue)
+            normalize_language(spoken_language_var.get())
+        except ValueError as e:
+            messagebox.showwarning(lang["warning"], str(e))
+            return
+        jobs = scheduler.add_many(selected_files, model_var.get(), device=device, precision=precision,
+                                  language=spoken_language_var.get(),
+                                  preview=PREVIEW_MODEL if preview_var.get() else None)
+        logging.info(lang["jobs_queued"].format(count=len(jobs)))
+        scheduler.start()
+
+    def refresh_queue():
+        jobs = scheduler.jobs()
+        queue_job_ids[:] = [job.id for job in jobs]
+        queue_list.delete(0, tk.END)
+        for job in jobs:
+            queue_list.insert(tk.END, f"[{job.status}] p{job.priority} {os.path.basename(job.path)}")
+
+    def selected_job_id():
+        selection = queue_list.curselection()
+        if not selection or selection[0] >= len(queue_job_ids):
+            return None
+        return queue_job_ids[selection[0]]
+
+    def queue_action(action):
+        job_id = selected_job_id()
+        if job_id is None:
+            return
+        if action == "up":
+            scheduler.move(job_id, -1)
+        elif action == "down":
+            scheduler.move(job_id, 1)
+        elif action == "priority":
+            scheduler.set_priority(job_id, scheduler.get(job_id).priority + 1)
+        elif action == "cancel":
+            scheduler.cancel(job_id)
+        refresh_queue()
+        if job_id in queue_job_ids:
+            queue_list.selection_set(queue_job_ids.index(job_id))
 
+    # Handlers for the event pump; each receives one typed event.
+    def log_event(text):
+        logging.info(f"{datetime.now().strftime('%H:%M:%S')} - {text}")
+
+    def export_done(session):
+        # Runs on the export thread; report through the event queue.
+        for fmt, error in session.errors.items():
+            q.put(events.Warn(lang["export_failed"].format(fmt=fmt.upper(), error=error)))
+        if session.paths:
+            q.put(events.Log(lang["export_done"].format(files=", ".join(session.paths.values()))))
+
+    def live_export(job_id):
+        """The live subtitle session of a job, opened on its first segment."""
+        if job_id not in live_exports:
+            job = scheduler.get(job_id) if job_id is not None else None
+            # The job id keeps same-named files from different folders apart.
+            if job:
+                name = f"{os.path.splitext(os.path.basename(job.path))[0]}_{job.id}"
+            else:
+                name = f"transcription_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            live_exports[job_id] = ExportSession(os.path.join(TRANSCRIPT_FOLDER, name), LIVE_EXPORT_FORMATS,
+                                                 on_done=export_done)
+        return live_exports[job_id]
+
+    def finish_live_export(event, result):
+        streamed = result is None or result.get("streamed")
+        if event.job_id not in live_exports and (streamed or not live_export_var.get()):
+            return
+        # Cached results arrive whole; they still get their subtitle files.
+        session = live_export(event.job_id)
+        del live_exports[event.job_id]
+        if not streamed:
+            session.extend(result.get("segments") or [])
+        session.close()
+
+    def on_segment(event):
+        if event.draft:
+            transcript.append(event.segment, key=event.job_id, draft=True)
+        else:
+            transcript.refine(event.job_id, event.segment)
+        transcription_area.refresh()
+        update_transcription_char_count()
+        # Subtitles only get final segments.
+        if not event.draft and (live_export_var.get() or event.job_id in live_exports):
+            live_export(event.job_id).add(event.segment)
+
+    # Per-job errors and warnings, shown in one dialog when the queue is done.
+    job_problems = []
+
+    def on_problem(event):
+        if event.job_id is None:
+            # Not tied to a job (an export, a download): tell the user now.
+            show = messagebox.showerror if isinstance(event, events.Error) else messagebox.showwarning
+            show(lang["warning"], event.text)
+            return
+        job = scheduler.get(event.job_id)
+        text = lang["job_problem"].format(file=os.path.basename(job.path) if job else event.job_id,
+                                          error=event.text)
+        job_problems.append(text)
+        log_event(text)
+
+    def show_problem_summary():
+        if not job_problems or scheduler.active_count():
+            return
+        details = "\n".join(job_problems[:10]) + ("\n…" if len(job_problems) > 10 else "")
+        messagebox.showwarning(lang["warning"], lang["jobs_problem_summary"].format(
+            count=len(job_problems), details=details))
+        job_problems.clear()
+
+    def on_job_status(event):
+        refresh_queue()
+        status = event.job["status"]
+        if status not in FINISHED_STATUSES:
+            return
+        # A finished refine pass replaces the whole draft; a stopped or
+        # failed one leaves the rest of the draft as the transcript.
+        if status == DONE:
+            changed = transcript.drop_drafts(event.job_id)
+        else:
+            changed = transcript.keep_drafts(event.job_id)
+        if changed:
+            transcription_area.refresh()
+            update_transcription_char_count()
+        show_problem_summary()
+
+    def keep_drafts():
+        # Stops the refine pass of running draft jobs; what is shown stays.
+        for job in scheduler.jobs():
+            if job.status == RUNNING and job.preview:
+                scheduler.cancel(job.id)
+
+    def on_result(event):
+        # Streamed results were already appended segment by segment.
+        if not event.result.get("streamed"):
+            transcript.add_result(event.result)
+            transcription_area.refresh()
+        update_transcription_char_count()
+        finish_live_export(event, event.result)
+        log_event(lang["completion_time"].format(duration=event.duration))
+
+    def on_stopped(event):
+        partial = event.result
+        if partial is None:
+            finish_live_export(event, None)
+            return
+        if not partial.get("streamed"):
+            transcript.add_result(partial)
+            transcription_area.refresh()
+        update_transcription_char_count()
+        finish_live_export(event, partial)
+        log_event(lang["stopped_partial"].format(count=len(partial["segments"])))
+
+    def show_metrics(job_metrics):
+        registry = get_metrics()
+        registry.record(job_metrics)
+        try:
+            registry.export()
+        except OSError as e:
+            logging.info(f"Metrics export failed: {e}")
+        summary = registry.summary()
+        metrics_label.config(text=format_metrics(job_metrics).replace(" | ", "\n") + "\n" + lang["metrics_total"].format(
+            jobs=summary["jobs"], audio=summary["totals"]["audio_seconds"], rate=summary["segments_per_second"]))
+        logging.info(format_metrics(job_metrics))
+
     def update_transcription_char_count():
-        text_content = transcription_area.get("1.0", tk.END).strip()
-        char_count_label.config(text=lang["character_count"].format(count=len(text_content)))
-        transcription_area.edit_modified(False)
+        char_count_label.config(text=lang["character_count"].format(count=transcript.char_count))
+
+    def edit_segment(index):
+        text = simpledialog.askstring(lang["edit_segment"], transcript.line(index),
+                                      initialvalue=transcript[index]["text"].strip(), parent=root)
+        if text is not None:
+            transcript.set_text(index, " " + text.strip())
+            transcription_area.refresh()
+            update_transcription_char_count()
+
+    def go_to_time(event=None):
+        try:
+            seconds = parse_timestamp(goto_var.get())
+        except ValueError:
+            messagebox.showwarning(lang["warning"], lang["invalid_time"])
+            return
+        transcription_area.go_to_time(seconds)
 
     def install_missing():
         install_requirements(missing_modules)
         messagebox.showinfo(lang["info"], lang["installation_complete"])
 
+    def draw_sparkline(canvas, values):
+        canvas.delete("line")
+        points = sparkline_points(values, SPARKLINE_WIDTH, SPARKLINE_HEIGHT)
+        if points:
+            canvas.create_line(*points, fill=themes[theme_var.get()]["progress"], tags="line")
+
     def update_system_info():
-        try:
-            cpu_usage = psutil.cpu_percent()
-            ram_usage = psutil.virtual_memory().percent
-
-            cpu_label.config(text=lang["cpu_usage"].format(value=cpu_usage))
-            cpu_bar['value'] = cpu_usage
-
-            ram_label.config(text=lang["ram_usage"].format(value=ram_usage))
-            ram_bar['value'] = ram_usage
-
-            gpus = GPUtil.getGPUs()
-            if gpus:
-                gpu = gpus[0]
-                gpu_label.config(text=f"GPU: {gpu.name}")
-                gpu_load = gpu.load * 100
-                gpu_mem = (gpu.memoryUsed / gpu.memoryTotal) * 100 if gpu.memoryTotal else 0
-                gpu_load_label.config(text=f"GPU Load: {gpu_load:.1f}%")
-                gpu_load_bar['value'] = gpu_load
-                gpu_mem_label.config(text=f"GPU Memory: {gpu.memoryUsed:.1f}/{gpu.memoryTotal:.1f} MB")
-                gpu_mem_bar['value'] = gpu_mem
+        # Only reads what the sampler thread recorded; never probes here.
+        sample = sampler.latest()
+        if sample is not None and sample.time != shown_sample[0]:
+            shown_sample[0] = sample.time
+            if sample.cpu_percent is not None:
+                cpu_label.config(text=lang["cpu_usage"].format(value=sample.cpu_percent))
+                cpu_bar['value'] = sample.cpu_percent
+                ram_label.config(text=lang["ram_usage"].format(value=sample.ram_percent))
+                ram_bar['value'] = sample.ram_percent
+            if sample.gpu_name is not None:
+                gpu_label.config(text=f"GPU: {sample.gpu_name}")
+                gpu_load_label.config(text=f"GPU Load: {sample.gpu_load:.1f}%")
+                gpu_load_bar['value'] = sample.gpu_load
+                gpu_mem_label.config(text=f"GPU Memory: {sample.gpu_mem_used:.1f}/{sample.gpu_mem_total:.1f} MB")
+                gpu_mem_bar['value'] = sample.gpu_mem_percent or 0
+            elif sample.error and "GPUtil" not in sample.error:
+                gpu_label.config(text=f"Error retrieving system info: {sample.error}")
             else:
                 gpu_label.config(text=lang["no_gpu"])
                 gpu_load_label.config(text=lang["gpu_load_na"])
                 gpu_load_bar['value'] = 0
                 gpu_mem_label.config(text=lang["gpu_mem_na"])
                 gpu_mem_bar['value'] = 0
-        except Exception as e:
-            gpu_label.config(text=f"Error retrieving system info: {str(e)}")
-        root.after(2000, update_system_info)
+            history = sampler.samples()
+            draw_sparkline(cpu_spark, [s.cpu_percent for s in history])
+            draw_sparkline(ram_spark, [s.ram_percent for s in history])
+            draw_sparkline(gpu_load_spark, [s.gpu_load for s in history])
+            draw_sparkline(gpu_mem_spark, [s.gpu_mem_percent for s in history])
+        root.after(1000, update_system_info)
 
     def update_requirements(selected_model=None):
         if req_ram_label is None:
@@ -267,30 +623,42 @@ def create_main_window():
     system_info_frame = tk.LabelFrame(left_frame, text=lang["system_info"], bg="#1E1E2E", fg="white", padx=5, pady=5)
     system_info_frame.pack(fill=tk.X, padx=5, pady=5)
 
+    def make_sparkline():
+        canvas = tk.Canvas(system_info_frame, width=SPARKLINE_WIDTH, height=SPARKLINE_HEIGHT,
+                           bg="#1E1E2E", highlightthickness=0)
+        canvas.pack(fill=tk.X, pady=(0, 5))
+        return canvas
+
     cpu_label = tk.Label(system_info_frame, text=lang["cpu_loading"], bg="#1E1E2E", fg="white")
     cpu_label.pack(anchor="w")
     cpu_bar = ttk.Progressbar(system_info_frame, orient="horizontal", length=180, mode="determinate")
-    cpu_bar.pack(fill=tk.X, pady=(0, 5))
+    cpu_bar.pack(fill=tk.X)
+    cpu_spark = make_sparkline()
 
     ram_label = tk.Label(system_info_frame, text=lang["ram_loading"], bg="#1E1E2E", fg="white")
     ram_label.pack(anchor="w")
     ram_bar = ttk.Progressbar(system_info_frame, orient="horizontal", length=180, mode="determinate")
-    ram_bar.pack(fill=tk.X, pady=(0, 5))
+    ram_bar.pack(fill=tk.X)
+    ram_spark = make_sparkline()
 
     gpu_label = tk.Label(system_info_frame, text=lang["gpu_loading"], bg="#1E1E2E", fg="white")
     gpu_label.pack(anchor="w")
     gpu_load_label = tk.Label(system_info_frame, text=lang["gpu_load_loading"], bg="#1E1E2E", fg="white")
     gpu_load_label.pack(anchor="w")
     gpu_load_bar = ttk.Progressbar(system_info_frame, orient="horizontal", length=180, mode="determinate")
-    gpu_load_bar.pack(fill=tk.X, pady=(0, 5))
+    gpu_load_bar.pack(fill=tk.X)
+    gpu_load_spark = make_sparkline()
     gpu_mem_label = tk.Label(system_info_frame, text=lang["gpu_mem_loading"], bg="#1E1E2E", fg="white")
     gpu_mem_label.pack(anchor="w")
     gpu_mem_bar = ttk.Progressbar(system_info_frame, orient="horizontal", length=180, mode="determinate")
-    gpu_mem_bar.pack(fill=tk.X, pady=(0, 5))
+    gpu_mem_bar.pack(fill=tk.X)
+    gpu_mem_spark = make_sparkline()
 
     # File Selection
     file_button = tk.Button(left_frame, text=lang["select_file"], command=select_file, width=20)
     file_button.pack(pady=5)
+    folder_button = tk.Button(left_frame, text=lang["select_folder"], command=select_folder, width=20)
+    folder_button.pack(pady=5)
     file_label = tk.Label(left_frame, text=lang["no_file_selected"], bg="#1E1E2E", fg="white", wraplength=200)
     file_label.pack(pady=5)
 
@@ -336,50 +704,106 @@ def create_main_window():
             f"'{model}' modeli (~{size}) indirilecek. Onaylıyor musunuz?",
         ):
             return
-        def worker():
-            logging.info(f"Downloading model: {model}")
-            try:
-                download_model(model)
-                logging.info(f"Model downloaded: {model}")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+        logging.info(f"Downloading model: {model}")
+        shown = [-1]
+
+        def progress(done, total):
+            # Post at most one update per percent (or per 16 MB without a size).
+            step = done * 100 // total if total else done >> 24
+            if step != shown[0]:
+                shown[0] = step
+                q.put(events.DownloadProgress(model, done, total))
+
+        def finished(future):
+            error = future.exception()
+            if error is None:
+                q.put(events.Log(f"Model downloaded: {model}"))
+            elif isinstance(error, DownloadCancelled):
+                q.put(events.Log(lang["download_cancelled"].format(model=model)))
+            else:
+                q.put(events.Error(str(error)))
+            q.put(events.DownloadProgress(model, 0, None, finished=True))
+
+        # Runs next to any other download; the partial file is resumed next time.
+        get_downloader().submit(model, progress).add_done_callback(finished)
+        cancel_download_button.config(state=tk.NORMAL)
+
+    def cancel_downloads():
+        # The partial files stay, so a later download resumes them.
+        downloader = get_downloader()
+        for model in downloader.active():
+            downloader.cancel(model)
+
+    def on_download_progress(event):
+        if event.finished:
+            download_progress.pop(event.model, None)
             refresh_model_lists()
-        threading.Thread(target=worker, daemon=True).start()
+        else:
+            download_progress[event.model] = (event.done, event.total)
+        if not download_progress:
+            download_status.config(text="")
+            download_bar['value'] = 0
+            cancel_download_button.config(state=tk.DISABLED)
+            return
+        parts = []
+        for model, (done, total) in download_progress.items():
+            parts.append(f"{model}: {done / total:.0%}" if total else f"{model}: {done >> 20} MB")
+        download_status.config(text=", ".join(parts))
+        totals = [t for _, t in download_progress.values()]
+        if all(totals):
+            download_bar['value'] = sum(d for d, _ in download_progress.values()) * 100 / sum(totals)
 
     download_button = tk.Button(left_frame, text=lang["download"], command=download_selected_model, width=20)
     download_button.pack(pady=5)
+    cancel_download_button = tk.Button(left_frame, text=lang["cancel_download"], command=cancel_downloads, width=20, state=tk.DISABLED)
+    cancel_download_button.pack(pady=(0, 5))
+    download_progress = {}
+    download_bar = ttk.Progressbar(left_frame, orient="horizontal", length=150, mode="determinate")
+    download_bar.pack(pady=(0, 2))
+    download_status = tk.Label(left_frame, text="", bg="#1E1E2E", fg="white")
+    download_status.pack()
     refresh_model_lists()
 
+    # Device Selection
+    device_label = tk.Label(left_frame, text=lang["device"], bg="#1E1E2E", fg="white")
+    device_label.pack(pady=5)
+    # The GPU check needs torch, so the choices are narrowed once warm-up ends.
+    device_var = tk.StringVar(value="auto")
+    device_menu = ttk.Combobox(left_frame, textvariable=device_var, values=["auto", "cuda", "cpu"], width=18, state="readonly")
+    device_menu.pack(pady=5)
+    # "auto" detects the language; any Whisper language code can be typed in.
+    spoken_language_label = tk.Label(left_frame, text=lang["spoken_language"], bg="#1E1E2E", fg="white")
+    spoken_language_label.pack(pady=5)
+    spoken_language_var = tk.StringVar(value=TRANSCRIBE_LANGUAGE)
+    spoken_language_menu = ttk.Combobox(left_frame, textvariable=spoken_language_var, values=COMMON_LANGUAGES, width=18)
+    spoken_language_menu.pack(pady=5)
+    int8_var = tk.BooleanVar(value=False)
+    int8_check = tk.Checkbutton(left_frame, text=lang["cpu_int8"], variable=int8_var, bg="#1E1E2E", fg="white", selectcolor="#282A36")
+    int8_check.pack(pady=5)
+    live_export_var = tk.BooleanVar(value=False)
+    live_export_check = tk.Checkbutton(left_frame, text=lang["live_export"], variable=live_export_var, bg="#1E1E2E", fg="white", selectcolor="#282A36")
+    live_export_check.pack(pady=5)
+    live_exports = {}
+    preview_var = tk.BooleanVar(value=False)
+    preview_check = tk.Checkbutton(left_frame, text=lang["preview"].format(model=PREVIEW_MODEL), variable=preview_var, bg="#1E1E2E", fg="white", selectcolor="#282A36")
+    preview_check.pack(pady=5)
+
     # Transcription Buttons
     transcribe_button = tk.Button(left_frame, text=lang["start_transcription"], command=start_transcription, width=20)
-    if not GPU_AVAILABLE:
-        transcribe_button.config(state=tk.DISABLED)
     transcribe_button.pack(pady=10)
-    stop_button = tk.Button(left_frame, text=lang["stop"], command=lambda: stop_event.set(), width=20)
+    stop_button = tk.Button(left_frame, text=lang["stop"], command=scheduler.cancel_all, width=20)
     stop_button.pack(pady=5)
+    keep_draft_button = tk.Button(left_frame, text=lang["keep_draft"], command=keep_drafts, width=20)
+    keep_draft_button.pack(pady=5)
     def save_transcription():
-        text = transcription_area.get("1.0", tk.END).strip()
-        if not text:
+        if not transcript.char_count:
             return
-        os.makedirs(TRANSCRIPT_FOLDER, exist_ok=True)
+        # Files are written on a background thread; export_done reports back.
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        txt_path = os.path.join(TRANSCRIPT_FOLDER, f"transcription_{timestamp}.txt")
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write(text)
-        pdf_path = os.path.join(TRANSCRIPT_FOLDER, f"transcription_{timestamp}.pdf")
-        try:
-            from fpdf import FPDF
-        except Exception:
-            messagebox.showerror("Error", lang["fpdf_error"])
-            return
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        for line in text.splitlines():
-            pdf.multi_cell(0, 10, line)
-        pdf.output(pdf_path)
-        messagebox.showinfo(lang["info"], "PDF ve TXT dosyaları program klasörüne kaydedildi")
+        # Drafts of running jobs are not final text yet.
+        segments = [seg for seg in transcript.segments() if not seg["draft"]]
+        export_segments(segments, os.path.join(TRANSCRIPT_FOLDER, f"transcription_{timestamp}"),
+                        on_done=export_done)
 
     save_transcription_button = tk.Button(left_frame, text=lang["save_transcription"], command=save_transcription, width=20)
     save_transcription_button.pack(pady=5)
@@ -409,8 +833,8 @@ def create_main_window():
         system_info_frame.configure(bg=theme["bg"], fg=theme["fg"])
 
         label_list = [cpu_label, ram_label, gpu_label, gpu_load_label, gpu_mem_label,
-                    file_label, model_label, download_label, transcription_label,
-                    char_count_label, log_label, theme_label]
+                    file_label, model_label, download_label, download_status, device_label, int8_check, live_export_check, transcription_label,
+                    char_count_label, log_label, theme_label, metrics_label]
         if req_ram_label is not None:
             label_list.extend([req_ram_label, req_notes_label, req_size_label])
         for lbl in label_list:
@@ -421,12 +845,21 @@ def create_main_window():
         if requirements_frame is not None:
             requirements_frame.configure(bg=theme["bg"], fg=theme["fg"])
         transcription_area.configure(bg=theme["text_bg"], fg=theme["fg"])
+        queue_frame.configure(bg=theme["bg"], fg=theme["fg"])
+        transcription_header.configure(bg=theme["bg"])
+        transcription_area.frame.configure(bg=theme["bg"])
+        metrics_frame.configure(bg=theme["bg"], fg=theme["fg"])
+        queue_buttons.configure(bg=theme["bg"])
+        queue_list.configure(bg=theme["text_bg"], fg=theme["fg"])
         log_area.configure(bg=theme["text_bg"], fg=theme["fg"])
 
         style.configure("Custom.Horizontal.TProgressbar",
                         troughcolor=theme["bg"], background=theme["progress"])
-        for bar in [cpu_bar, ram_bar, gpu_load_bar, gpu_mem_bar]:
+        for bar in [cpu_bar, ram_bar, gpu_load_bar, gpu_mem_bar, download_bar]:
             bar.configure(style="Custom.Horizontal.TProgressbar")
+        for spark in [cpu_spark, ram_spark, gpu_load_spark, gpu_mem_spark]:
+            spark.configure(bg=theme["bg"])
+            spark.itemconfigure("line", fill=theme["progress"])
 
     theme_menu.bind("<<ComboboxSelected>>", apply_theme)
 
@@ -436,20 +869,33 @@ def create_main_window():
         root.title(lang["title"])
         system_info_frame.configure(text=lang["system_info"])
         file_button.configure(text=lang["select_file"])
-        if not selected_file:
-            file_label.configure(text=lang["no_file_selected"])
+        folder_button.configure(text=lang["select_folder"])
+        show_selection()
         model_label.configure(text=lang["select_model"])
         download_label.configure(text=lang["download_model"])
         download_button.configure(text=lang["download"])
+        cancel_download_button.configure(text=lang["cancel_download"])
+        device_label.configure(text=lang["device"])
+        spoken_language_label.configure(text=lang["spoken_language"])
+        int8_check.configure(text=lang["cpu_int8"])
+        live_export_check.configure(text=lang["live_export"])
+        preview_check.configure(text=lang["preview"].format(model=PREVIEW_MODEL))
         transcribe_button.configure(text=lang["start_transcription"])
         stop_button.configure(text=lang["stop"])
+        keep_draft_button.configure(text=lang["keep_draft"])
         save_transcription_button.configure(text=lang["save_transcription"])
         if missing_modules:
             install_button.configure(text=lang["install_requirements"])
         theme_label.configure(text=lang["theme"])
         language_label.configure(text=lang["language"])
         transcription_label.configure(text=lang["transcription"])
-        char_count_label.configure(text=lang["character_count"].format(count=len(transcription_area.get("1.0", tk.END).strip())))
+        queue_frame.configure(text=lang["queue"])
+        queue_up_button.configure(text=lang["move_up"])
+        queue_down_button.configure(text=lang["move_down"])
+        queue_priority_button.configure(text=lang["priority_up"])
+        queue_cancel_button.configure(text=lang["cancel_job"])
+        goto_button.configure(text=lang["go_to_time"])
+        update_transcription_char_count()
         log_label.configure(text=lang["log"])
         cpu_label.configure(text=lang["cpu_loading"])
         ram_label.configure(text=lang["ram_loading"])
@@ -457,18 +903,47 @@ def create_main_window():
         gpu_load_label.configure(text=lang["gpu_load_loading"])
         gpu_mem_label.configure(text=lang["gpu_mem_loading"])
         requirements_frame.configure(text=lang["model_requirements"])
+        metrics_frame.configure(text=lang["metrics"])
+        if get_metrics().last is None:
+            metrics_label.configure(text=lang["metrics_waiting"])
 
     language_menu.bind("<<ComboboxSelected>>", apply_language)
 
     # Transcription Area
     right_frame = tk.Frame(root, bg="#1E1E2E")
     right_frame.pack(side=tk.RIGHT, expand=True, fill=tk.BOTH, padx=10, pady=10)
+
+    # Job Queue
+    queue_frame = tk.LabelFrame(right_frame, text=lang["queue"], bg="#1E1E2E", fg="white", padx=5, pady=5)
+    queue_frame.pack(fill=tk.X, pady=(0, 5))
+    queue_job_ids = []
+    queue_list = tk.Listbox(queue_frame, height=5, bg="#282A36", fg="white")
+    queue_list.pack(side=tk.LEFT, fill=tk.X, expand=True)
+    queue_buttons = tk.Frame(queue_frame, bg="#1E1E2E")
+    queue_buttons.pack(side=tk.LEFT, padx=5)
+    queue_up_button = tk.Button(queue_buttons, text=lang["move_up"], command=lambda: queue_action("up"), width=10)
+    queue_up_button.pack(pady=1)
+    queue_down_button = tk.Button(queue_buttons, text=lang["move_down"], command=lambda: queue_action("down"), width=10)
+    queue_down_button.pack(pady=1)
+    queue_priority_button = tk.Button(queue_buttons, text=lang["priority_up"], command=lambda: queue_action("priority"), width=10)
+    queue_priority_button.pack(pady=1)
+    queue_cancel_button = tk.Button(queue_buttons, text=lang["cancel_job"], command=lambda: queue_action("cancel"), width=10)
+    queue_cancel_button.pack(pady=1)
 
-    transcription_label = tk.Label(right_frame, text=lang["transcription"], bg="#1E1E2E", fg="white")
-    transcription_label.pack(anchor="w", pady=(0, 5))
-    transcription_area = tk.Text(right_frame, wrap=tk.WORD, bg="#282A36", fg="white", height=30)
-    transcription_area.pack(expand=True, fill=tk.BOTH)
-    transcription_area.bind("<<Modified>>", lambda e: update_transcription_char_count())
+    transcription_header = tk.Frame(right_frame, bg="#1E1E2E")
+    transcription_header.pack(fill=tk.X, pady=(0, 5))
+    transcription_label = tk.Label(transcription_header, text=lang["transcription"], bg="#1E1E2E", fg="white")
+    transcription_label.pack(side=tk.LEFT)
+    goto_button = tk.Button(transcription_header, text=lang["go_to_time"], command=go_to_time)
+    goto_button.pack(side=tk.RIGHT)
+    goto_var = tk.StringVar(value="00:00")
+    goto_entry = tk.Entry(transcription_header, textvariable=goto_var, width=10)
+    goto_entry.pack(side=tk.RIGHT, padx=5)
+    goto_entry.bind("<Return>", go_to_time)
+    transcript = TranscriptModel()
+    transcription_area = TranscriptView(right_frame, transcript, bg="#282A36", fg="white")
+    transcription_area.on_edit = edit_segment
+    transcription_area.pack(expand=True, fill=tk.BOTH)
 
     char_count_label = tk.Label(right_frame, text=lang["character_count"].format(count=0), bg="#1E1E2E", fg="white")
     char_count_label.pack(anchor="e", pady=(0, 5))
@@ -493,15 +968,72 @@ def create_main_window():
     req_size_label = tk.Label(requirements_frame, text="")
     req_size_label.pack(anchor="w")
 
-    # Logging handler now knows text widget
-    handler.text_widget = log_area
+    # Per-stage timings of the last job
+    metrics_frame = tk.LabelFrame(bottom_frame, text=lang["metrics"], bg="#1E1E2E", fg="white", padx=5, pady=5)
+    metrics_frame.pack(side=tk.LEFT, fill=tk.Y)
+    metrics_label = tk.Label(metrics_frame, text=lang["metrics_waiting"], justify=tk.LEFT, bg="#1E1E2E", fg="white")
+    metrics_label.pack(anchor="w")
+
+    # Flush buffered log lines into the log area once per frame
+    LogFlusher(log_area, handler).start()
 
     # Varsayilan temayi uygula
     apply_theme()
     apply_language()
     update_requirements()
 
-    # Start System Monitoring
+    # Heavy libraries load in the background once the window is up.
+    warm_up = WarmUp()
+
+    def on_window_shown():
+        logging.info(lang["window_ready"].format(seconds=startup.mark("window_shown")))
+        warm_up.start()
+        poll_warm_up()
+
+    def poll_warm_up():
+        if not warm_up.done():
+            root.after(100, poll_warm_up)
+            return
+        if warm_up.error is not None:
+            logging.info(lang["warm_up_failed"].format(error=warm_up.error))
+            return
+        if not warm_up.gpu_available:
+            device_menu['values'] = ["cpu"]
+            device_var.set("cpu")
+            logging.info(lang["no_gpu_cpu_mode"])
+        logging.info(lang["transcription_ready"].format(seconds=startup.marks["transcription_ready"]))
+        if PRELOAD_LAST_MODEL:
+            # The first job of the session then finds its model already loaded.
+            preloading = preload_last_used(get_registry(), gpu_available=warm_up.gpu_available)
+            if preloading is not None:
+                logging.info(lang["preloading_model"].format(model=preloading[0], device=preloading[1]))
+
+    root.after(0, on_window_shown)
+
+    # Start System Monitoring: samples are taken on a background thread and
+    # also go into the metrics export.
+    sampler = get_sampler().start()
+    get_metrics().sampler = sampler
+    shown_sample = [None]
     update_system_info()
 
+    # One pump handles every job's events; it runs only when events arrive.
+    pump = EventPump(root, q)
+    pump.on(events.Error, on_problem)
+    pump.on(events.Warn, on_problem)
+    pump.on(events.Segment, on_segment)
+    pump.on(events.Result, on_result)
+    pump.on(events.Stopped, on_stopped)
+    pump.on(events.Log, lambda e: log_event(e.text))
+    pump.on(events.JobStatus, on_job_status)
+    pump.on(events.Metrics, lambda e: show_metrics(e.metrics))
+    pump.on(events.DownloadProgress, on_download_progress)
+    pump.otherwise(log_event)
+    pump.start()
+
+    # Resume jobs left in the persisted queue
+    refresh_queue()
+    if scheduler.pending():
+        scheduler.start()
+
     return root
@@ -0,0 +1,158 @@
+"""Energy-based voice activity detection.
+
+Call recordings are often half silence or hold tones, and Whisper both
+wastes a full pass on such windows and tends to hallucinate text in them.
+speech_regions finds the spans that are loud enough to hold speech, working
+on whole blocks of frames with NumPy; SpeechAudio joins those spans end to
+end so the model only sees speech, and maps segment times back to the
+original recording.
+
+The detector only looks at frame energy, so steady music as loud as the
+speech is kept.
+"""
+from config import (
+    VAD_THRESHOLD_DB,
+    VAD_MARGIN_DB,
+    VAD_MIN_SPEECH_MS,
+    VAD_MIN_SILENCE_MS,
+    VAD_PAD_MS,
+)
+from startup import LazyModule
+
+np = LazyModule("numpy")
+
+FRAME_MS = 30
+BLOCK_SECONDS = 60
+
+
+def vad_settings():
+    """The detector's default parameters, part of result-cache keys.
+
+    Changing any of them changes which audio the model sees, so results
+    made with other settings must not be reused.
+    """
+    return {
+        "threshold_db": VAD_THRESHOLD_DB,
+        "margin_db": VAD_MARGIN_DB,
+        "min_speech_ms": VAD_MIN_SPEECH_MS,
+        "min_silence_ms": VAD_MIN_SILENCE_MS,
+        "pad_ms": VAD_PAD_MS,
+        "frame_ms": FRAME_MS,
+    }
+
+
+def frame_energy(audio, sample_rate=16000, frame_ms=FRAME_MS):
+    """Energy in dBFS of each ``frame_ms`` frame of ``audio``.
+
+    ``audio`` only needs ``len`` and float slicing (an array, PcmAudio or
+    SharedPcm); it is read a block at a time, never as a whole.
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    total = len(audio)
+    energies = np.empty(-(-total // frame), dtype=np.float32)
+    block = frame * int(BLOCK_SECONDS * 1000 / frame_ms)
+    for start in range(0, total, block):
+        chunk = np.asarray(audio[start:start + block], dtype=np.float32)
+        # A short last frame is padded with silence.
+        chunk = np.pad(chunk, (0, -len(chunk) % frame))
+        frames = chunk.reshape(-1, frame)
+        first = start // frame
+        energies[first:first + len(frames)] = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    return energies
+
+
+def _runs(mask):
+    """(starts, ends) of the runs of True in ``mask``; ends are exclusive."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return edges[0::2], edges[1::2]
+
+
+def _merge(starts, ends, min_gap):
+    """Join runs separated by fewer than ``min_gap`` frames."""
+    if len(starts) < 2:
+        return starts, ends
+    keep = (starts[1:] - ends[:-1]) >= min_gap
+    return starts[np.concatenate(([True], keep))], ends[np.concatenate((keep, [True]))]
+
+
+def speech_regions(audio, sample_rate=16000, threshold_db=VAD_THRESHOLD_DB, margin_db=VAD_MARGIN_DB,
+                   min_speech_ms=VAD_MIN_SPEECH_MS, min_silence_ms=VAD_MIN_SILENCE_MS, pad_ms=VAD_PAD_MS):
+    """Sample ranges ``[(start, end), ...]`` of ``audio`` that hold speech.
+
+    A frame counts as speech when it is louder than ``threshold_db`` and
+    ``margin_db`` above the recording's noise floor (its quietest tenth).
+    Pauses shorter than ``min_silence_ms`` stay inside a region, regions
+    shorter than ``min_speech_ms`` are dropped and the rest are widened by
+    ``pad_ms`` on both sides so word edges are not clipped.
+    """
+    energy = frame_energy(audio, sample_rate)
+    if not len(energy):
+        return []
+    frame = int(sample_rate * FRAME_MS / 1000)
+    floor = float(np.percentile(energy, 10))
+    starts, ends = _runs(energy > max(threshold_db, floor + margin_db))
+    starts, ends = _merge(starts, ends, min_silence_ms / FRAME_MS)
+    long_enough = (ends - starts) >= min_speech_ms / FRAME_MS
+    starts, ends = starts[long_enough], ends[long_enough]
+    pad = int(round(pad_ms / FRAME_MS))
+    starts, ends = _merge(np.maximum(starts - pad, 0), ends + pad, 1)
+    total = len(audio)
+    return [(int(s) * frame, min(int(e) * frame, total)) for s, e in zip(starts, ends)]
+
+
+class SpeechAudio:
+    """The speech regions of ``audio`` joined end to end.
+
+    Slicing returns float32 samples like the wrapped audio, so the result
+    can go wherever the full recording would.
+    """
+
+    def __init__(self, audio, regions, sample_rate=16000):
+        self.audio = audio
+        self.regions = list(regions)
+        self.sample_rate = sample_rate
+        self._starts = np.array([start for start, _ in self.regions], dtype=np.int64)
+        lengths = np.array([end - start for start, end in self.regions], dtype=np.int64)
+        # Position of each region inside the joined audio, plus the total.
+        self._offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def skipped_fraction(self):
+        total = len(self.audio)
+        return 1.0 - len(self) / total if total else 0.0
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("SpeechAudio only supports slices")
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            raise ValueError("SpeechAudio slices must be contiguous")
+        pieces = []
+        i = int(np.searchsorted(self._offsets, start, side="right")) - 1
+        while start < stop and i < len(self.regions):
+            take = min(stop, int(self._offsets[i + 1])) - start
+            source = self.regions[i][0] + start - int(self._offsets[i])
+            pieces.append(np.asarray(self.audio[source:source + take], dtype=np.float32))
+            start += take
+            i += 1
+        return np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+
+    def to_original(self, seconds, end=False):
+        """Map a time in the joined audio to the original recording.
+
+        A time on the border of two regions is the end of the earlier region
+        when ``end`` is set and the start of the later one otherwise.
+        """
+        if not self.regions:
+            return seconds
+        sample = seconds * self.sample_rate
+        i = int(np.searchsorted(self._offsets, sample, side="left" if end else "right")) - 1
+        i = min(max(i, 0), len(self.regions) - 1)
+        return float(self._starts[i] + sample - self._offsets[i]) / self.sample_rate
+
+    def remap(self, segment):
+        return dict(segment, start=self.to_original(segment["start"]),
+                    end=self.to_original(segment["end"], end=True))